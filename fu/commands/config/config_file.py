@@ -27,6 +27,10 @@ def init_config_file() -> None:
     # Write default config
     default_content = """[tmdb]
 api_key = "<your_api_key_here>"
+
+[viewer]
+# Program opening a whole batch of files at once, e.g. "feh --auto-zoom"
+# command = "feh"
 """
     path.write_text(default_content)
 
@@ -0,0 +1,170 @@
+import os
+
+from datetime import datetime
+
+from fu.index.hashing import (
+    DEFAULT_WORKERS,
+    HashAlgorithmError,
+    validate_algorithm
+)
+from fu.utils.path import is_dir, is_file
+from ..base_command import Command, RichConsoleLogger
+from .dedupe import (
+    METHOD_AUTO,
+    STATUS_DIFFERENT,
+    STATUS_FAILED,
+    STATUS_HARDLINKED,
+    STATUS_LINKED,
+    STATUS_MISSING,
+    STATUS_REFLINKED,
+    Deduplicator
+)
+from .dupes import find_duplicates, read_dupes_file, write_dupes_file
+
+
+class FindDupesCmd(Command):
+    """Finds duplicate files in a directory and writes them as groups \
+        into a text file usable by 'fu rm-indexed'
+    """
+
+    def __init__(
+        self,
+        path: str,
+        output: str = None,
+        recursive: bool = False,
+        algorithm: str = 'blake2b',
+        workers: int = DEFAULT_WORKERS,
+        walk_workers: int = 1,
+        logger=None
+    ):
+        super().__init__('dupes', logger or RichConsoleLogger())
+        self.path = path
+        self.output = output
+        self.recursive = recursive
+        self.algorithm = algorithm
+        self.workers = workers
+        self.walk_workers = walk_workers
+
+    def execute(self) -> None:
+        if not is_dir(self.path):
+            self.logger.error(f'Invalid path: { self.path }')
+            return None
+
+        try:
+            validate_algorithm(self.algorithm)
+        except HashAlgorithmError as e:
+            self.logger.error(str(e))
+            return None
+
+        output = self.output
+        if not output:
+            now = datetime.now()
+            output_fname = f'dupes-{ now.strftime("%Y%m%d-%H%M%S-%f") }.txt'
+            output = os.path.join(self.path, output_fname)
+
+        if os.path.exists(output):
+            self.logger.error(f'A file with same name already exists: { output }')
+            return None
+
+        self.logger.info(f'Looking for duplicate files in: { self.path } ...')
+        stats = find_duplicates(
+            self.path,
+            self.recursive,
+            self.algorithm,
+            self.workers,
+            self.walk_workers)
+
+        self.logger.info(
+            f'{ stats.scanned_files } file(s) scanned, '
+            f'{ stats.partial_files } partially hashed, '
+            f'{ stats.full_files } fully hashed')
+        self.logger.info(
+            f'Read { _mb(stats.read_bytes) } MB out of '
+            f'{ _mb(stats.scanned_bytes) } MB scanned')
+
+        if not stats.groups:
+            self.logger.warning('No duplicate files found')
+            return None
+
+        write_dupes_file(output, self.path, stats.groups)
+        self.logger.info(
+            f'{ len(stats.groups) } group(s) of duplicates found, '
+            f'{ _mb(stats.reclaimable_bytes) } MB can be reclaimed')
+        self.logger.info(f'Duplicates saved at { output }')
+
+
+class DedupeApplyCmd(Command):
+    """Replaces redundant copies listed in a duplicates file (as written \
+        by 'fu dupes') by reflinks or hardlinks to the kept file of each \
+        group
+    """
+
+    def __init__(
+        self,
+        dupes_file: str,
+        path: str,
+        method: str = METHOD_AUTO,
+        dry_run: bool = False,
+        verbose: bool = False,
+        logger=None
+    ):
+        super().__init__('dedupe-apply', logger or RichConsoleLogger())
+        self.dupes_file = dupes_file
+        self.path = path
+        self.method = method
+        self.dry_run = dry_run
+        self.verbose = verbose
+
+    def execute(self) -> None:
+        if not is_file(self.dupes_file):
+            self.logger.error(f'Invalid duplicates file: { self.dupes_file }')
+            return None
+
+        if not is_dir(self.path):
+            self.logger.error(f'Invalid path: { self.path }')
+            return None
+
+        try:
+            deduplicator = Deduplicator(self.path, self.method, self.dry_run)
+        except ValueError as e:
+            self.logger.error(str(e))
+            return None
+
+        counts = {
+            status: 0 for status in (
+                STATUS_REFLINKED,
+                STATUS_HARDLINKED,
+                STATUS_LINKED,
+                STATUS_DIFFERENT,
+                STATUS_MISSING,
+                STATUS_FAILED
+            )
+        }
+        reclaimed = 0
+
+        for result in deduplicator.apply(read_dupes_file(self.dupes_file)):
+            counts[result.status] += 1
+            reclaimed += result.size
+
+            if result.status == STATUS_FAILED:
+                self.logger.error(f'{ result.name }: { result.error }')
+            elif result.status == STATUS_DIFFERENT:
+                self.logger.warning(
+                    f'{ result.name } differs from { result.keep }, skipped')
+            elif self.verbose:
+                self.logger.info(
+                    f'{ result.status }: { result.name } -> { result.keep }')
+
+        prefix = 'Dry run: ' if self.dry_run else ''
+        self.logger.info(
+            f'{ prefix }{ counts[STATUS_REFLINKED] } reflinked, '
+            f'{ counts[STATUS_HARDLINKED] } hardlinked, '
+            f'{ counts[STATUS_LINKED] } already linked, '
+            f'{ counts[STATUS_DIFFERENT] } different, '
+            f'{ counts[STATUS_MISSING] } missing, '
+            f'{ counts[STATUS_FAILED] } failed')
+        self.logger.info(f'{ prefix }{ _mb(reclaimed) } MB reclaimed')
+
+
+def _mb(size: int) -> str:
+    return '{:.1f}'.format(size / 1024 / 1024)
@@ -0,0 +1,246 @@
+import errno
+import os
+import uuid
+
+from dataclasses import dataclass
+from typing import Iterable, Iterator
+
+from fu.commands.dupes.dupes import DupeGroup
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover (Windows)
+    fcntl = None
+
+
+#: Copy on write clone of a whole file (btrfs, XFS), from linux/fs.h
+FICLONE = 0x40049409
+
+#: Try reflink first, fall back to hardlink where unsupported
+METHOD_AUTO = 'auto'
+METHOD_REFLINK = 'reflink'
+METHOD_HARDLINK = 'hardlink'
+METHODS = (METHOD_AUTO, METHOD_REFLINK, METHOD_HARDLINK)
+
+#: Redundant copy was replaced (status is the method used)
+STATUS_REFLINKED = 'reflinked'
+STATUS_HARDLINKED = 'hardlinked'
+
+#: Redundant copy is already a hardlink of kept file
+STATUS_LINKED = 'linked'
+
+#: Content no longer matches kept file, file is left untouched
+STATUS_DIFFERENT = 'different'
+
+STATUS_MISSING = 'missing'
+STATUS_FAILED = 'failed'
+
+COMPARE_BUFFER_SIZE = 1024 * 1024
+
+# Errors meaning filesystem (or OS) can't clone files
+_REFLINK_UNSUPPORTED = {
+    errno.EOPNOTSUPP,
+    errno.ENOTTY,
+    errno.EINVAL,
+    errno.EXDEV,
+    errno.ENOSYS
+}
+
+
+class ReflinkUnsupportedError(OSError):
+    pass
+
+
+@dataclass
+class DedupeResult:
+    """Outcome of replacing a single redundant copy
+
+    Args:
+        name (str): Redundant file, relative to deduplicated dir
+        keep (str): Kept file it was linked to
+        status (str): One of the STATUS_* values
+        size (int): Bytes reclaimed (or to reclaim, on dry runs)
+        error (str): Reason of failure, if any
+    """
+
+    name: str
+    keep: str
+    status: str
+    size: int = 0
+    error: str = None
+
+
+def files_equal(
+    first: str,
+    second: str,
+    buffer_size: int = COMPARE_BUFFER_SIZE
+) -> bool:
+    """Compares content of two files byte by byte"""
+    with open(first, 'rb') as first_file, open(second, 'rb') as second_file:
+        if os.fstat(first_file.fileno()).st_size != \
+                os.fstat(second_file.fileno()).st_size:
+            return False
+
+        while True:
+            first_chunk = first_file.read(buffer_size)
+            if first_chunk != second_file.read(buffer_size):
+                return False
+            if not first_chunk:
+                return True
+
+
+def reflink(src: str, dst: str) -> None:
+    """Creates dst as a copy on write clone of src, sharing its extents
+
+    Raises:
+        ReflinkUnsupportedError: If filesystem doesn't support clones
+    """
+    if fcntl is None:
+        raise ReflinkUnsupportedError(
+            errno.EOPNOTSUPP,
+            'Reflinks are not supported on this platform')
+
+    with open(src, 'rb') as src_file, open(dst, 'xb') as dst_file:
+        try:
+            fcntl.ioctl(dst_file.fileno(), FICLONE, src_file.fileno())
+        except OSError as e:
+            if e.errno in _REFLINK_UNSUPPORTED:
+                raise ReflinkUnsupportedError(e.errno, e.strerror) from e
+            raise
+
+
+class Deduplicator:
+    """Replaces redundant copies of duplicate groups by links to the \
+        kept file of each group.
+
+        Every replacement is atomic: the link is created under a
+        temporary name in the same directory and then renamed over the
+        redundant copy with os.replace, so readers always see either the
+        old copy or the link, never a missing file. Content is compared
+        byte by byte right before the rename, files modified since
+        duplicates were found are left alone.
+    """
+
+    def __init__(
+        self,
+        root: str,
+        method: str = METHOD_AUTO,
+        dry_run: bool = False
+    ) -> None:
+        """
+        Args:
+            root (str): Directory file names are relative to
+            method (str, optional): One of METHODS. Reflinked copies keep \
+                its own metadata and diverge again on write, hardlinks   \
+                share metadata with kept file. Defaults to METHOD_AUTO.
+            dry_run (bool, optional): Only compare files, without     \
+                creating or replacing any. Results report the first \
+                method that would be tried. Defaults to False.
+        """
+        if method not in METHODS:
+            raise ValueError(
+                f'Invalid dedupe method: { method }. '
+                f'Valid methods are: { ", ".join(METHODS) }')
+
+        self.root = root
+        self.method = method
+        self.dry_run = dry_run
+
+        # Devices where reflinks already failed as unsupported
+        self._no_reflink = set()
+
+    def apply(self, groups: Iterable[DupeGroup]) -> Iterator[DedupeResult]:
+        for group in groups:
+            for name in group.redundant:
+                yield self.replace(group.keep, name)
+
+    def replace(self, keep: str, name: str) -> DedupeResult:
+        """Replaces a single redundant copy by a link to kept file"""
+        keep_path = os.path.join(self.root, keep)
+        path = os.path.join(self.root, name)
+
+        try:
+            keep_st = os.stat(keep_path)
+            st = os.stat(path)
+        except FileNotFoundError:
+            return DedupeResult(name, keep, STATUS_MISSING)
+        except OSError as e:
+            return DedupeResult(name, keep, STATUS_FAILED, error=e.strerror)
+
+        if (st.st_dev, st.st_ino) == (keep_st.st_dev, keep_st.st_ino):
+            return DedupeResult(name, keep, STATUS_LINKED)
+
+        if st.st_dev != keep_st.st_dev:
+            return DedupeResult(
+                name,
+                keep,
+                STATUS_FAILED,
+                error='Files are on different filesystems')
+
+        tmp_path = os.path.join(
+            os.path.dirname(path),
+            f'.{ os.path.basename(path) }.{ uuid.uuid4().hex[:8] }.dedupe')
+
+        try:
+            status = self._link(keep_path, tmp_path, st)
+
+            # Compared after link is ready, so the window for changes
+            # between the check and the swap is as short as possible
+            if not files_equal(keep_path, path) or \
+                    not _unchanged(path, st) or \
+                    not _unchanged(keep_path, keep_st):
+                return DedupeResult(name, keep, STATUS_DIFFERENT)
+
+            if not self.dry_run:
+                os.replace(tmp_path, path)
+
+        except FileNotFoundError:
+            return DedupeResult(name, keep, STATUS_MISSING)
+        except OSError as e:
+            return DedupeResult(name, keep, STATUS_FAILED, error=e.strerror)
+        finally:
+            if os.path.lexists(tmp_path):
+                os.unlink(tmp_path)
+
+        return DedupeResult(name, keep, status, st.st_size)
+
+    def _link(self, keep_path: str, tmp_path: str, st: os.stat_result) -> str:
+        """Creates link to kept file under temporary name (nothing is \
+            created on dry runs)
+
+        Returns:
+            str: Status of used method
+        """
+        try_reflink = self.method == METHOD_REFLINK or (
+            self.method == METHOD_AUTO and st.st_dev not in self._no_reflink)
+
+        if try_reflink:
+            try:
+                if not self.dry_run:
+                    reflink(keep_path, tmp_path)
+                    _copy_metadata(st, tmp_path)
+                return STATUS_REFLINKED
+
+            except ReflinkUnsupportedError:
+                if os.path.lexists(tmp_path):
+                    os.unlink(tmp_path)
+                if self.method == METHOD_REFLINK:
+                    raise
+                self._no_reflink.add(st.st_dev)
+
+        if not self.dry_run:
+            os.link(keep_path, tmp_path)
+
+        return STATUS_HARDLINKED
+
+
+def _copy_metadata(st: os.stat_result, path: str) -> None:
+    """Gives a clone the permissions and times of the copy it replaces"""
+    os.chmod(path, st.st_mode & 0o7777)
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns))
+
+
+def _unchanged(path: str, st: os.stat_result) -> bool:
+    current = os.stat(path)
+    return (current.st_ino, current.st_size, current.st_mtime_ns) == \
+        (st.st_ino, st.st_size, st.st_mtime_ns)
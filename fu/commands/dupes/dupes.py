@@ -0,0 +1,247 @@
+import os
+
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from functools import partial
+from typing import Dict, Iterator, List
+
+from fu.index.hashing import (
+    DEFAULT_WORKERS,
+    ParallelHasher,
+    hash_file_edges
+)
+from fu.index.idx_format import IndexEntry
+from fu.utils.fileio import open_file
+from fu.utils.walk import walk_files
+
+
+#: Bytes hashed at start and end of files during partial hash stage
+EDGE_SIZE = 64 * 1024
+
+
+@dataclass
+class DupeGroup:
+    """Files with identical content
+
+    Args:
+        size (int): Size in bytes of each file
+        hash (str): Content hash as '<algorithm>:<hex digest>'
+        names (List[str]): Sorted file names (relative to scanned dir), \
+            first one is the file to keep
+    """
+
+    size: int
+    hash: str
+    names: List[str]
+
+    @property
+    def keep(self) -> str:
+        return self.names[0]
+
+    @property
+    def redundant(self) -> List[str]:
+        return self.names[1:]
+
+
+@dataclass
+class DupesStats:
+    """Amount of files and bytes processed by each stage"""
+
+    scanned_files: int = 0
+    scanned_bytes: int = 0
+    partial_files: int = 0
+    partial_bytes: int = 0
+    full_files: int = 0
+    full_bytes: int = 0
+    groups: List[DupeGroup] = field(default_factory=list)
+
+    @property
+    def read_bytes(self) -> int:
+        return self.partial_bytes + self.full_bytes
+
+    @property
+    def reclaimable_bytes(self) -> int:
+        return sum(g.size * len(g.redundant) for g in self.groups)
+
+
+def find_duplicates(
+    path: str,
+    recursive: bool = False,
+    algorithm: str = 'blake2b',
+    workers: int = DEFAULT_WORKERS,
+    walk_workers: int = 1
+) -> DupesStats:
+    """Finds files with identical content in given directory, reading \
+        as few bytes as possible:
+
+        1. Files are bucketed by size (no reads at all), hard links \
+            to the same inode count as a single file
+        2. Files sharing a size are hashed by its first and last \
+            EDGE_SIZE bytes
+        3. Only files whose partial hashes still collide are fully hashed
+
+        Empty files are ignored.
+
+    Args:
+        path (str): Directory to scan
+        recursive (bool, optional): Include nested directories. \
+            Defaults to False.
+        algorithm (str, optional): Hash algorithm. Defaults to 'blake2b'.
+        workers (int, optional): Files hashed in parallel. \
+            Defaults to DEFAULT_WORKERS.
+        walk_workers (int, optional): Directories listed in parallel. \
+            Defaults to 1.
+
+    Returns:
+        DupesStats: Found duplicate groups and stages stats
+    """
+    stats = DupesStats()
+
+    # Stage 1. Bucket by size. Hard links share its data, so only one
+    # name per inode (first one by name) takes part in the search
+    by_size: Dict[int, List[str]] = defaultdict(list)
+    linked: Dict[tuple, tuple] = {}
+    root_prefix = os.path.join(path, '')
+    for entry in walk_files(path, recursive, walk_workers, stat=True):
+        try:
+            st = entry.stat()
+        except FileNotFoundError:
+            continue
+
+        stats.scanned_files += 1
+        stats.scanned_bytes += st.st_size
+        if st.st_size == 0:
+            continue
+
+        name = entry.path[len(root_prefix):]
+        if st.st_nlink > 1:
+            key = (st.st_dev, st.st_ino)
+            if key not in linked or name < linked[key][0]:
+                linked[key] = (name, st.st_size)
+        else:
+            by_size[st.st_size].append(name)
+
+    for name, size in linked.values():
+        by_size[size].append(name)
+    del linked
+
+    candidates = _colliding(by_size)
+    del by_size
+
+    # Stage 2. Bucket by partial hash
+    by_partial: Dict[tuple, List[str]] = defaultdict(list)
+    edges_hash = partial(_edges_hash, root=path, algorithm=algorithm)
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        names = [name for _, group in candidates for name in group]
+        sizes = [size for size, group in candidates for _ in group]
+
+        for name, size, partial_hash in zip(
+                names,
+                sizes,
+                executor.map(edges_hash, names)):
+            if partial_hash:
+                stats.partial_files += 1
+                stats.partial_bytes += min(size, EDGE_SIZE * 2)
+                by_partial[(size, partial_hash)].append(name)
+
+    # Stage 3. Full hash of remaining candidates, files small enough to
+    # be fully read by stage 2 are already known to be identical
+    by_full: Dict[tuple, List[str]] = defaultdict(list)
+    to_hash = []
+    for (size, partial_hash), group in _colliding(by_partial):
+        if size <= EDGE_SIZE * 2:
+            by_full[(size, partial_hash)].extend(group)
+        else:
+            to_hash.extend(IndexEntry(name, size) for name in group)
+
+    hasher = ParallelHasher(algorithm, workers)
+    for entry in hasher.hash_entries(to_hash, path):
+        if entry.hash:
+            by_full[(entry.size, entry.hash)].append(entry.name)
+
+    stats.full_files = hasher.stats.files
+    stats.full_bytes = hasher.stats.bytes
+
+    stats.groups = sorted(
+        (
+            DupeGroup(size, content_hash, sorted(group))
+            for (size, content_hash), group in _colliding(by_full)
+        ),
+        key=lambda g: g.keep)
+
+    return stats
+
+
+def write_dupes_file(output: str, path: str, groups: List[DupeGroup]) -> None:
+    """Writes duplicate groups into a text file. Within each group first \
+        file is commented out as the one to keep, so that resulting file \
+        can be directly used as index for 'fu rm-indexed' to remove all  \
+        redundant copies.
+
+    Args:
+        output (str): File to create
+        path (str): Directory where files were found
+        groups (List[DupeGroup]): Duplicate groups
+    """
+    redundant_count = sum(len(g.redundant) for g in groups)
+
+    with open_file(output, 'x') as dupes_file:
+        dupes_file.write(f'# Duplicate files in: { path }\n')
+        dupes_file.write(
+            f'# { len(groups) } group(s), { redundant_count } '
+            'redundant file(s). First file of each group is kept:\n')
+
+        for number, group in enumerate(groups, start=1):
+            dupes_file.write('\n')
+            dupes_file.write(
+                f'# group { number }: size={ group.size } { group.hash }\n')
+            dupes_file.write(f'# keep: { group.keep }\n')
+            for name in group.redundant:
+                dupes_file.write(f'{ name }\n')
+
+
+def read_dupes_file(dupes_path: str) -> Iterator[DupeGroup]:
+    """Reads duplicate groups from a file created by write_dupes_file. \
+        Files removed from groups (e.g. after manual review) are not   \
+        included, and groups left with a single file are skipped.
+
+    Args:
+        dupes_path (str): Path to duplicates file
+
+    Returns:
+        Iterator[DupeGroup]: Groups in file
+    """
+    group = None
+    with open_file(dupes_path) as dupes_file:
+        for line in dupes_file:
+            line = line.strip('\n')
+
+            if line.startswith('# group '):
+                if group and group.redundant:
+                    yield group
+
+                size, content_hash = line.split(': ', 1)[1].split(' ', 1)
+                group = DupeGroup(int(size[len('size='):]), content_hash, [])
+
+            elif line.startswith('# keep: ') and group:
+                group.names.insert(0, line[len('# keep: '):])
+
+            elif line and not line.startswith('#') and group:
+                group.names.append(line)
+
+    if group and group.redundant:
+        yield group
+
+
+def _colliding(buckets: dict) -> list:
+    """Buckets with more than one file"""
+    return [(key, group) for key, group in buckets.items() if len(group) > 1]
+
+
+def _edges_hash(name: str, root: str, algorithm: str) -> str:
+    try:
+        return hash_file_edges(os.path.join(root, name), algorithm, EDGE_SIZE)
+    except OSError:
+        return None
@@ -0,0 +1,88 @@
+import typer
+
+from .commands import HistoryAddCmd, HistoryListCmd, HistoryLogCmd, HistoryShowCmd
+
+
+app = typer.Typer()
+
+
+@app.command()
+def add(
+    store_dir: str = typer.Argument(
+        ...,
+        help='History store directory, created if it does not exist'
+    ),
+    idx: str = typer.Argument(
+        ...,
+        help='Sorted index file to add as newest snapshot'
+    ),
+    label: str = typer.Option(
+        None,
+        '--label',
+        '-l',
+        help='Snapshot description. Defaults to index file name'
+    ),
+    checkpoint_interval: int = typer.Option(
+        None,
+        '--checkpoint-interval',
+        help=(
+            'Snapshots between full checkpoints of a new store, existing '
+            'ones keep their own. Defaults to 30'
+        )
+    )
+):
+    """Stores an index as newest snapshot, as a delta against previous one
+    """
+    HistoryAddCmd(store_dir, idx, label, checkpoint_interval).execute()
+
+
+@app.command('list')
+def list_snapshots(
+    store_dir: str = typer.Argument(
+        ...,
+        help='History store directory'
+    )
+):
+    """Lists stored snapshots with its file counts and changes
+    """
+    HistoryListCmd(store_dir).execute()
+
+
+@app.command()
+def show(
+    store_dir: str = typer.Argument(
+        ...,
+        help='History store directory'
+    ),
+    snapshot_id: int = typer.Argument(
+        ...,
+        help='Snapshot number, as printed by "list"'
+    ),
+    output: str = typer.Option(
+        ...,
+        '--output',
+        '-o',
+        help='Index file to create'
+    )
+):
+    """Rebuilds a stored snapshot into an index file
+    """
+    HistoryShowCmd(store_dir, snapshot_id, output).execute()
+
+
+@app.command()
+def log(
+    store_dir: str = typer.Argument(
+        ...,
+        help='History store directory'
+    ),
+    name: str = typer.Argument(
+        ...,
+        help='File name, as listed in indexes'
+    )
+):
+    """Prints snapshots where given file was added (+), changed (~) or
+        removed (-). Exits with status 1 if file is not in history.
+    """
+    if not HistoryLogCmd(store_dir, name).execute():
+        raise typer.Exit(code=1)
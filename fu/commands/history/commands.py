@@ -0,0 +1,142 @@
+import os
+import sys
+
+from fu.index.diff import STATUS_SYMBOLS
+from fu.index.history import HistoryError, HistoryStore
+from fu.index.idx_format import (
+    FORMAT_TSV,
+    IndexFormatError,
+    IndexWriter,
+    read_sorted_entries
+)
+from fu.utils.path import is_dir, is_file
+from ..base_command import Command, RichConsoleLogger
+
+
+class HistoryAddCmd(Command):
+    """Adds an index file as the newest snapshot of a history store"""
+
+    def __init__(
+        self,
+        store_dir: str,
+        idx: str,
+        label: str = None,
+        checkpoint_interval: int = None,
+        logger=None
+    ):
+        super().__init__('index-history add', logger or RichConsoleLogger())
+        self.store_dir = store_dir
+        self.idx = idx
+        self.label = label
+        self.checkpoint_interval = checkpoint_interval
+
+    def execute(self) -> None:
+        if not is_file(self.idx):
+            self.logger.error(f'Invalid index file: { self.idx }')
+            return None
+
+        try:
+            store = HistoryStore(self.store_dir, self.checkpoint_interval)
+            snapshot = store.add(
+                read_sorted_entries(self.idx),
+                self.label or os.path.basename(self.idx))
+        except (HistoryError, IndexFormatError, ValueError) as e:
+            self.logger.error(str(e))
+            return None
+
+        kind = 'full checkpoint' if snapshot.full else 'delta'
+        self.logger.info(
+            f'Snapshot { snapshot.id } stored as { kind }: '
+            f'{ snapshot.files } file(s), { snapshot.added } added, '
+            f'{ snapshot.changed } changed, { snapshot.removed } removed')
+
+
+class HistoryListCmd(Command):
+    """Lists snapshots of a history store"""
+
+    def __init__(self, store_dir: str, logger=None):
+        super().__init__('index-history list', logger or RichConsoleLogger())
+        self.store_dir = store_dir
+
+    def execute(self) -> None:
+        if not is_dir(self.store_dir):
+            self.logger.error(f'Invalid history store: { self.store_dir }')
+            return None
+
+        for snapshot in HistoryStore(self.store_dir).snapshots:
+            kind = 'full' if snapshot.full else 'delta'
+            self.logger.info(
+                f'{ snapshot.id }\t{ snapshot.created_at }\t{ kind }\t'
+                f'{ snapshot.files }\t+{ snapshot.added } '
+                f'~{ snapshot.changed } -{ snapshot.removed }\t'
+                f'{ snapshot.label }')
+
+
+class HistoryShowCmd(Command):
+    """Rebuilds a snapshot of a history store into an index file"""
+
+    def __init__(
+        self,
+        store_dir: str,
+        snapshot_id: int,
+        output: str,
+        logger=None
+    ):
+        super().__init__('index-history show', logger or RichConsoleLogger())
+        self.store_dir = store_dir
+        self.snapshot_id = snapshot_id
+        self.output = output
+
+    def execute(self) -> None:
+        if not is_dir(self.store_dir):
+            self.logger.error(f'Invalid history store: { self.store_dir }')
+            return None
+
+        if os.path.exists(self.output):
+            self.logger.error(
+                f'A file with same name already exists: { self.output }')
+            return None
+
+        try:
+            entries = HistoryStore(self.store_dir).entries(self.snapshot_id)
+            with IndexWriter(
+                    self.output,
+                    FORMAT_TSV,
+                    [f'Snapshot { self.snapshot_id } of { self.store_dir }']
+            ) as idx_writer:
+                for entry in entries:
+                    idx_writer.write(entry)
+
+        # Partial output is removed, so it isn't taken for a valid index
+        except (HistoryError, IndexFormatError) as e:
+            try:
+                os.remove(self.output)
+            except FileNotFoundError:
+                pass
+            self.logger.error(str(e))
+            return None
+
+        self.logger.info(f'Index saved at { self.output }')
+
+
+class HistoryLogCmd(Command):
+    """Prints snapshots where a file was added, changed or removed"""
+
+    def __init__(self, store_dir: str, name: str, logger=None):
+        super().__init__('index-history log', logger or RichConsoleLogger())
+        self.store_dir = store_dir
+        self.name = name
+
+    def execute(self) -> int:
+        if not is_dir(self.store_dir):
+            self.logger.error(f'Invalid history store: { self.store_dir }')
+            return 0
+
+        events = 0
+        for event in HistoryStore(self.store_dir).file_log(self.name):
+            events += 1
+            sys.stdout.write(
+                f'{ STATUS_SYMBOLS[event.status] }\t{ event.snapshot.id }\t'
+                f'{ event.snapshot.created_at }\t{ event.snapshot.label }\n')
+
+        return events
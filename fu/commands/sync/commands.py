@@ -0,0 +1,140 @@
+import os
+
+from fu.index.hashing import (
+    DEFAULT_WORKERS,
+    HashAlgorithmError,
+    validate_algorithm
+)
+from fu.utils.path import is_dir
+from ..base_command import Command, RichConsoleLogger
+from .sync import (
+    ACTION_COPY,
+    ACTION_DELETE,
+    ACTION_SYMBOLS,
+    ACTION_UPDATE,
+    apply_sync,
+    plan_sync
+)
+
+
+class SyncCmd(Command):
+    """Makes a destination tree mirror a source tree, copying only files \
+        missing or different in destination
+    """
+
+    def __init__(
+        self,
+        src_dir: str,
+        dst_dir: str,
+        delete: bool = False,
+        hash_algorithm: str = None,
+        dry_run: bool = False,
+        verbose: bool = False,
+        workers: int = DEFAULT_WORKERS,
+        walk_workers: int = 1,
+        logger=None
+    ):
+        super().__init__('sync', logger or RichConsoleLogger())
+        self.src_dir = src_dir
+        self.dst_dir = dst_dir
+        self.delete = delete
+        self.hash_algorithm = hash_algorithm
+        self.dry_run = dry_run
+        self.verbose = verbose
+        self.workers = workers
+        self.walk_workers = walk_workers
+
+    def execute(self) -> None:
+        for path in (self.src_dir, self.dst_dir):
+            if not is_dir(path):
+                self.logger.error(f'Invalid path: { path }')
+                return None
+
+        if not self._check_not_nested():
+            return None
+
+        if self.hash_algorithm:
+            try:
+                validate_algorithm(self.hash_algorithm)
+            except HashAlgorithmError as e:
+                self.logger.error(str(e))
+                return None
+
+        self.logger.info(
+            f'Comparing { self.src_dir } with { self.dst_dir } ...')
+        actions = plan_sync(
+            self.src_dir,
+            self.dst_dir,
+            self.delete,
+            self.hash_algorithm,
+            self.workers,
+            self.walk_workers)
+
+        counts = {action: 0 for action in ACTION_SYMBOLS}
+        failed = 0
+        copied_bytes = 0
+
+        if self.dry_run:
+            results = ((action, None) for action in actions)
+        else:
+            results = (
+                (result.action, result.error)
+                for result in apply_sync(
+                    actions,
+                    self.src_dir,
+                    self.dst_dir,
+                    self.workers)
+            )
+
+        for action, error in results:
+            if error:
+                failed += 1
+                self.logger.error(f'{ action.name }: { error }')
+                continue
+
+            counts[action.action] += 1
+            if action.action != ACTION_DELETE:
+                copied_bytes += action.size
+            if self.dry_run or self.verbose:
+                self.logger.info(
+                    f'{ ACTION_SYMBOLS[action.action] } { action.name }')
+
+        prefix = 'Dry run: ' if self.dry_run else ''
+        self.logger.info(
+            f'{ prefix }{ counts[ACTION_COPY] } copied, '
+            f'{ counts[ACTION_UPDATE] } updated, '
+            f'{ counts[ACTION_DELETE] } deleted, { failed } failed file(s), '
+            f'{ _mb(copied_bytes) } MB copied')
+
+    def _check_not_nested(self) -> bool:
+        """Rejects trees inside one another, otherwise a destination in \
+            source would be copied into itself on every run
+
+        Returns:
+            bool: False (after logging an error) if both are the same \
+                directory or one of them is nested inside the other
+        """
+        src = os.path.realpath(self.src_dir)
+        dst = os.path.realpath(self.dst_dir)
+        common = os.path.commonpath([src, dst])
+
+        if src == dst:
+            self.logger.error('Source and destination are the same directory')
+            return False
+
+        if common == src:
+            self.logger.error(
+                f'Destination { self.dst_dir } is inside source '
+                f'{ self.src_dir }')
+            return False
+
+        if common == dst:
+            self.logger.error(
+                f'Source { self.src_dir } is inside destination '
+                f'{ self.dst_dir }')
+            return False
+
+        return True
+
+def _mb(size: int) -> str:
+    return '{:.1f}'.format(size / 1024 / 1024)
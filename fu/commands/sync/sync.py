@@ -0,0 +1,252 @@
+import errno
+import os
+import shutil
+import uuid
+
+from dataclasses import dataclass
+from functools import partial
+from typing import Iterable, Iterator
+
+from fu.index.diff import (
+    STATUS_ADDED,
+    STATUS_CHANGED,
+    STATUS_REMOVED,
+    diff_entries
+)
+from fu.index.extsort import DEFAULT_MEM_BUDGET, ExternalSorter
+from fu.index.hashing import DEFAULT_WORKERS, ParallelHasher
+from fu.index.idx_format import (
+    IndexEntry,
+    format_tsv_line,
+    parse_tsv_line,
+    tsv_line_name
+)
+from fu.utils.concurrency import bounded_map
+from fu.utils.walk import walk_files
+
+
+#: File only in source, copied to destination
+ACTION_COPY = 'copy'
+
+#: File in both trees but different, destination is overwritten
+ACTION_UPDATE = 'update'
+
+#: File only in destination, removed when extraneous files are deleted
+ACTION_DELETE = 'delete'
+
+#: Symbol used for each action in sync plans
+ACTION_SYMBOLS = {
+    ACTION_COPY: '+',
+    ACTION_UPDATE: '~',
+    ACTION_DELETE: '-'
+}
+
+#: Max bytes copied per copy_file_range/sendfile call
+COPY_CHUNK_SIZE = 64 * 1024 * 1024
+
+# Errors meaning zero-copy is not possible between given files
+_ZERO_COPY_UNSUPPORTED = {
+    errno.EXDEV,
+    errno.ENOSYS,
+    errno.EINVAL,
+    errno.EOPNOTSUPP,
+    errno.EBADF
+}
+
+
+@dataclass
+class SyncAction:
+    """A single step to make destination tree match source tree
+
+    Args:
+        action (str): One of ACTION_COPY, ACTION_UPDATE or ACTION_DELETE
+        name (str): File name relative to both trees
+        size (int): Bytes to copy (or to remove, on deletes)
+    """
+
+    action: str
+    name: str
+    size: int = 0
+
+
+@dataclass
+class SyncResult:
+    action: SyncAction
+    error: str = None
+
+
+def scan_entries(
+    path: str,
+    walk_workers: int = 1,
+    mem_budget: int = DEFAULT_MEM_BUDGET
+) -> Iterator[IndexEntry]:
+    """Rich entries of all files in a tree, sorted by name (same as \
+        'fu index --recursive --format tsv' would list them)
+    """
+    root_prefix = os.path.join(path, '')
+
+    with ExternalSorter(mem_budget, tsv_line_name) as sorter:
+        for entry in walk_files(path, True, walk_workers, stat=True):
+            try:
+                idx_entry = IndexEntry.from_stat(
+                    entry.path[len(root_prefix):],
+                    entry.stat())
+            except FileNotFoundError:
+                continue
+            sorter.add(format_tsv_line(idx_entry))
+
+        for line in sorter.sorted():
+            yield parse_tsv_line(line)
+
+
+def plan_sync(
+    src: str,
+    dst: str,
+    delete: bool = False,
+    hash_algorithm: str = None,
+    workers: int = DEFAULT_WORKERS,
+    walk_workers: int = 1,
+    mem_budget: int = DEFAULT_MEM_BUDGET
+) -> Iterator[SyncAction]:
+    """Indexes both trees and merge-joins them by name, yielding the \
+        actions needed for destination to match source, in name order.
+
+    Args:
+        src (str): Source directory
+        dst (str): Destination directory
+        delete (bool, optional): Also plan removal of files only in \
+            destination. Defaults to False.
+        hash_algorithm (str, optional): If given, files are compared by \
+            content hash instead of size and mtime (every file on both  \
+            sides is read). Defaults to None.
+        workers (int, optional): Files hashed in parallel. \
+            Defaults to DEFAULT_WORKERS.
+        walk_workers (int, optional): Directories listed in parallel. \
+            Defaults to 1.
+        mem_budget (int, optional): Approx. max bytes of names kept in \
+            memory while sorting each tree. Defaults to DEFAULT_MEM_BUDGET.
+
+    Returns:
+        Iterator[SyncAction]: Actions to apply
+    """
+    dst_entries = scan_entries(dst, walk_workers, mem_budget // 2)
+    src_entries = scan_entries(src, walk_workers, mem_budget // 2)
+
+    if hash_algorithm:
+        dst_entries = ParallelHasher(hash_algorithm, workers).hash_entries(
+            dst_entries,
+            dst)
+        src_entries = ParallelHasher(hash_algorithm, workers).hash_entries(
+            src_entries,
+            src)
+
+    for change in diff_entries(dst_entries, src_entries):
+        if change.status == STATUS_ADDED:
+            yield SyncAction(ACTION_COPY, change.name, change.new.size)
+        elif change.status == STATUS_CHANGED:
+            yield SyncAction(ACTION_UPDATE, change.name, change.new.size)
+        elif change.status == STATUS_REMOVED and delete:
+            yield SyncAction(ACTION_DELETE, change.name, change.old.size)
+
+
+def apply_sync(
+    actions: Iterable[SyncAction],
+    src: str,
+    dst: str,
+    workers: int = DEFAULT_WORKERS
+) -> Iterator[SyncResult]:
+    """Applies actions on a bounded pool of threads, results are yielded \
+        in same order as actions
+    """
+    return bounded_map(
+        partial(_apply_action, src=src, dst=dst),
+        actions,
+        workers)
+
+
+def copy_file(src: str, dst: str) -> None:
+    """Copies content, permissions and times of a file. Data is written \
+        into a temporary file next to dst which is then renamed over it, \
+        so dst is never seen partially written.
+    """
+    tmp_path = os.path.join(
+        os.path.dirname(dst),
+        f'.{ os.path.basename(dst) }.{ uuid.uuid4().hex[:8] }.sync')
+
+    try:
+        with open(src, 'rb') as src_file, open(tmp_path, 'xb') as tmp_file:
+            copy_data(src_file, tmp_file)
+
+        shutil.copystat(src, tmp_path)
+        os.replace(tmp_path, dst)
+
+    finally:
+        if os.path.lexists(tmp_path):
+            os.unlink(tmp_path)
+
+
+def copy_data(src_file, dst_file) -> int:
+    """Copies all data of src_file into dst_file, using zero-copy \
+        syscalls where available: copy_file_range (data stays in     \
+        kernel, or is even reflinked by some filesystems), then      \
+        sendfile, falling back to a regular read/write loop.
+
+    Returns:
+        int: Copied bytes
+    """
+    src_fd = src_file.fileno()
+    dst_fd = dst_file.fileno()
+
+    for zero_copy in (_copy_file_range, _sendfile):
+        try:
+            return zero_copy(src_fd, dst_fd)
+        except OSError as e:
+            if e.errno not in _ZERO_COPY_UNSUPPORTED:
+                raise
+
+            # Nothing was copied, so next method can start over
+            if os.lseek(dst_fd, 0, os.SEEK_CUR):
+                raise
+
+    shutil.copyfileobj(src_file, dst_file)
+    return dst_file.tell()
+
+
+def _copy_file_range(src_fd: int, dst_fd: int) -> int:
+    if not hasattr(os, 'copy_file_range'):
+        raise OSError(errno.ENOSYS, 'copy_file_range is not available')
+
+    copied = 0
+    while True:
+        count = os.copy_file_range(src_fd, dst_fd, COPY_CHUNK_SIZE)
+        if not count:
+            return copied
+        copied += count
+
+
+def _sendfile(src_fd: int, dst_fd: int) -> int:
+    if not hasattr(os, 'sendfile'):
+        raise OSError(errno.ENOSYS, 'sendfile is not available')
+
+    copied = 0
+    while True:
+        count = os.sendfile(dst_fd, src_fd, None, COPY_CHUNK_SIZE)
+        if not count:
+            return copied
+        copied += count
+
+
+def _apply_action(action: SyncAction, src: str, dst: str) -> SyncResult:
+    dst_path = os.path.join(dst, action.name)
+
+    try:
+        if action.action == ACTION_DELETE:
+            os.unlink(dst_path)
+        else:
+            os.makedirs(os.path.dirname(dst_path), exist_ok=True)
+            copy_file(os.path.join(src, action.name), dst_path)
+
+    except OSError as e:
+        return SyncResult(action, e.strerror or str(e))
+
+    return SyncResult(action)
@@ -0,0 +1,69 @@
+import os
+
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+
+from fu.utils.path import is_dir, path_files
+from ..base_command import Command, RichConsoleLogger
+from .thumbnails import (
+    IMG_EXTENSIONS,
+    STATUS_CREATED,
+    STATUS_FAILED,
+    STATUS_FRESH,
+    THUMB_SIZES,
+    make_thumbnails
+)
+
+
+class ThumbsCmd(Command):
+    """Generates freedesktop thumbnails for all images in a directory \
+        using a pool of worker processes
+    """
+
+    def __init__(self, src_dir: str, size_names: tuple, workers: int = None,
+                 logger=None):
+        super().__init__('thumbs', logger or RichConsoleLogger())
+        self.src_dir = src_dir
+        self.size_names = size_names
+        self.workers = workers or os.cpu_count() or 1
+
+    def execute(self) -> None:
+        if not is_dir(self.src_dir):
+            self.logger.error(f'Invalid path: { self.src_dir }')
+            return None
+
+        for size_name in self.size_names:
+            if size_name not in THUMB_SIZES:
+                self.logger.error(
+                    f'Invalid thumbnail size: { size_name }. '
+                    f'Valid sizes are: { ", ".join(THUMB_SIZES) }')
+                return None
+
+        images = list(path_files(self.src_dir, IMG_EXTENSIONS))
+        if not images:
+            self.logger.warning(f'No images found at { self.src_dir }')
+            return None
+
+        self.logger.info(
+            f'Generating thumbnails for { len(images) } image(s) '
+            f'using { self.workers } worker(s) ...')
+
+        counts = {STATUS_CREATED: 0, STATUS_FRESH: 0, STATUS_FAILED: 0}
+        make_fn = partial(make_thumbnails, size_names=tuple(self.size_names))
+
+        with ProcessPoolExecutor(max_workers=self.workers) as executor:
+            chunksize = max(1, len(images) // (self.workers * 8))
+
+            for results in executor.map(make_fn, images, chunksize=chunksize):
+                for result in results:
+                    counts[result.status] += 1
+
+                    if result.status == STATUS_FAILED:
+                        self.logger.warning(
+                            f'Thumbnail failed for { result.src_file }: '
+                            f'{ result.error }')
+
+        self.logger.info(
+            f'{ counts[STATUS_CREATED] } thumbnail(s) created, '
+            f'{ counts[STATUS_FRESH] } already fresh, '
+            f'{ counts[STATUS_FAILED] } failed')
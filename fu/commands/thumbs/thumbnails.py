@@ -0,0 +1,266 @@
+import hashlib
+import io
+import os
+
+from dataclasses import dataclass
+from exif import Image as ExifImage
+from pathlib import Path
+from PIL import Image, ImageOps, UnidentifiedImageError
+from PIL.PngImagePlugin import PngInfo
+
+from fu.exif.models import IMG_EXTENSIONS as EXIF_IMG_EXTENSIONS
+from fu.imgresize.resizer import resize_contain
+
+
+THUMB_SIZES = {
+    'normal': 128,
+    'large': 256
+}
+
+IMG_EXTENSIONS = [
+    '.jpg', '.jpeg', '.png', '.webp', '.gif', '.bmp', '.tif', '.tiff'
+]
+
+#: Thumbnail status after a generation attempt
+STATUS_CREATED = 'created'
+STATUS_FRESH = 'fresh'
+STATUS_FAILED = 'failed'
+
+
+@dataclass
+class ThumbResult:
+    src_file: str
+    size_name: str
+    status: str
+    error: str = None
+
+
+def thumbnails_dir() -> Path:
+    """Base directory for thumbnails as defined by freedesktop \
+        thumbnail spec: $XDG_CACHE_HOME/thumbnails
+
+    Returns:
+        Path: Thumbnails base directory
+    """
+    cache_home = os.environ.get('XDG_CACHE_HOME')
+    if not cache_home:
+        cache_home = os.path.join(Path.home(), '.cache')
+
+    return Path(cache_home) / 'thumbnails'
+
+
+def file_uri(path: str) -> str:
+    """Canonical 'file://' URI for given file, used as thumbnail key
+
+    Args:
+        path (str): Path to source file
+
+    Returns:
+        str: Percent encoded absolute file URI
+    """
+    return Path(os.path.abspath(path)).as_uri()
+
+
+def thumbnail_path(src_file: str, size_name: str, base_dir: Path = None) -> Path:
+    """Path where thumbnail for given file and size is stored. \
+        File name is the md5 of source file URI.
+
+    Args:
+        src_file (str): Path to source image
+        size_name (str): 'normal' or 'large'
+        base_dir (Path, optional): Thumbnails base directory. \
+            Defaults to thumbnails_dir().
+
+    Returns:
+        Path: Thumbnail file path
+    """
+    base_dir = base_dir or thumbnails_dir()
+    uri_md5 = hashlib.md5(file_uri(src_file).encode('utf-8')).hexdigest()
+
+    return base_dir / size_name / f'{ uri_md5 }.png'
+
+
+def is_fresh(src_file: str, thumb_file: Path, src_mtime: int = None) -> bool:
+    """Verifies if thumbnail exists and was generated from current \
+        version of source file (Same URI and 'Thumb::MTime')
+
+    Args:
+        src_file (str): Path to source image
+        thumb_file (Path): Path to thumbnail
+        src_mtime (int, optional): Source modification time in seconds. \
+            Will be read from filesystem if not provided.
+
+    Returns:
+        bool: True if thumbnail is up to date
+    """
+    if src_mtime is None:
+        src_mtime = int(os.stat(src_file).st_mtime)
+
+    try:
+        # Only png header and text chunks are parsed here, pixel data
+        # is not decoded
+        with Image.open(thumb_file) as thumb:
+            thumb_mtime = thumb.info.get('Thumb::MTime')
+            thumb_uri = thumb.info.get('Thumb::URI')
+    except (OSError, SyntaxError):
+        return False
+
+    return thumb_uri == file_uri(src_file) and thumb_mtime == str(src_mtime)
+
+
+def make_thumbnails(src_file: str, size_names: tuple,
+                    base_dir: str = None) -> list:
+    """Creates thumbnails for given image in each of requested sizes. \
+        Sizes with a fresh thumbnail already in cache are skipped.
+
+        Source image is decoded at most once for all sizes, and if    \
+        image has an embedded exif thumbnail large enough for a size, \
+        it is used instead of decoding the full image.
+
+        This function is executed on worker processes, hence it only  \
+        receives and returns picklable values.
+
+    Args:
+        src_file (str): Path to source image
+        size_names (tuple): Thumbnail size names, e.g. ('normal', 'large')
+        base_dir (str, optional): Thumbnails base directory. \
+            Defaults to thumbnails_dir().
+
+    Returns:
+        list[ThumbResult]: One result per requested size
+    """
+    base_dir = Path(base_dir) if base_dir else thumbnails_dir()
+    results = []
+
+    try:
+        src_stat = os.stat(src_file)
+        src_mtime = int(src_stat.st_mtime)
+
+        pending = []
+        for size_name in size_names:
+            thumb_file = thumbnail_path(src_file, size_name, base_dir)
+            if is_fresh(src_file, thumb_file, src_mtime):
+                results.append(
+                    ThumbResult(src_file, size_name, STATUS_FRESH))
+            else:
+                pending.append((size_name, thumb_file))
+
+        if not pending:
+            return results
+
+        # Biggest size goes first, so that jpeg draft decoding of source
+        # image is still good enough for smaller sizes
+        pending.sort(key=lambda p: THUMB_SIZES[p[0]], reverse=True)
+
+        exif_thumb = _embedded_thumbnail(src_file)
+        img = None
+        img_size = None
+        try:
+            for size_name, thumb_file in pending:
+                size = THUMB_SIZES[size_name]
+
+                if exif_thumb and max(exif_thumb.size) >= size:
+                    source = exif_thumb
+                else:
+                    if img is None:
+                        img = Image.open(src_file)
+                        img_size = img.size
+                    source = img
+
+                thumb = ImageOps.exif_transpose(
+                    resize_contain(source, size, size))
+                _save_thumbnail(
+                    thumb,
+                    thumb_file,
+                    src_file,
+                    src_stat,
+                    img_size)
+
+                results.append(
+                    ThumbResult(src_file, size_name, STATUS_CREATED))
+        finally:
+            if img:
+                img.close()
+
+    except (OSError, SyntaxError, ValueError) as e:
+        done = {r.size_name for r in results}
+        for size_name in size_names:
+            if size_name not in done:
+                results.append(
+                    ThumbResult(src_file, size_name, STATUS_FAILED, str(e)))
+
+    return results
+
+
+def _embedded_thumbnail(src_file: str) -> Image.Image:
+    """Reads thumbnail embedded into exif metadata of given image (if any)
+
+    Args:
+        src_file (str): Path to image
+
+    Returns:
+        Image.Image: Decoded embedded thumbnail, or None if image has no \
+            exif thumbnail or it can't be read
+    """
+    if Path(src_file).suffix.lower() not in EXIF_IMG_EXTENSIONS:
+        return None
+
+    try:
+        with open(src_file, 'rb') as raw_img:
+            exif_img = ExifImage(raw_img)
+            if not exif_img.has_exif:
+                return None
+
+            thumb_bytes = exif_img.get_thumbnail()
+            orientation = exif_img.get('orientation')
+    except Exception:
+        # Malformed exif data is common, it just means embedded
+        # thumbnail can't be used
+        return None
+
+    try:
+        thumb = Image.open(io.BytesIO(thumb_bytes))
+        thumb.load()
+    except (OSError, UnidentifiedImageError):
+        # Corrupt or truncated thumbnail, full image is decoded instead
+        return None
+
+    # Embedded thumbnails don't carry exif data, so orientation of main
+    # image is copied over to have it applied by exif_transpose
+    if orientation:
+        exif = thumb.getexif()
+        exif[0x0112] = int(orientation)
+        thumb.info['exif'] = exif.tobytes()
+
+    return thumb
+
+
+def _save_thumbnail(thumb: Image.Image, thumb_file: Path, src_file: str,
+                    src_stat: os.stat_result, src_size: tuple) -> None:
+    """Writes thumbnail png with freedesktop required metadata. File is \
+        written to a temporary name and then atomically moved in place, \
+        so that readers never find a partially written thumbnail.
+    """
+    thumb_file.parent.mkdir(mode=0o700, parents=True, exist_ok=True)
+
+    meta = PngInfo()
+    meta.add_text('Thumb::URI', file_uri(src_file))
+    meta.add_text('Thumb::MTime', str(int(src_stat.st_mtime)))
+    meta.add_text('Thumb::Size', str(src_stat.st_size))
+    if src_size:
+        meta.add_text('Thumb::Image::Width', str(src_size[0]))
+        meta.add_text('Thumb::Image::Height', str(src_size[1]))
+    meta.add_text('Software', 'futils')
+
+    if thumb.mode not in ('RGB', 'RGBA', 'L', 'LA'):
+        thumb = thumb.convert('RGBA' if 'A' in thumb.getbands() else 'RGB')
+
+    tmp_file = thumb_file.with_name(f'.{ thumb_file.name }.{ os.getpid() }')
+    try:
+        with open(tmp_file, 'wb') as tmp:
+            os.chmod(tmp_file, 0o600)
+            thumb.save(tmp, 'PNG', pnginfo=meta)
+        os.replace(tmp_file, thumb_file)
+    finally:
+        if tmp_file.exists():
+            tmp_file.unlink()
@@ -54,4 +54,12 @@ def tmdb(config_key: str) -> Optional[str]:
     if not isinstance(value, str):
         return None
 
-    return value
\ No newline at end of file
+    return value
+
+def viewer(config_key: str) -> Optional[str]:
+    section = _get_config("viewer")
+    value = section.get(config_key)
+    if not isinstance(value, str):
+        return None
+
+    return value
@@ -35,8 +35,32 @@ def inspect_from_pathsfile(
         '--display',
         '-d',
         help='Indicates if each image should be displyed in system viewer'
+    ),
+    from_line: int = typer.Option(
+        None,
+        '--from-line',
+        help='Line number to start from, jumped to without reading previous lines'
+    ),
+    resume: bool = typer.Option(
+        False,
+        '--resume',
+        help=(
+            'Start from line where previous inspection stopped, and save '
+            'progress next to paths file'
+        )
+    ),
+    save_cursor: bool = typer.Option(
+        False,
+        '--save-cursor',
+        help='Save progress next to paths file, to --resume it later'
     )
 ):
     """Inspects exif datetime metadata for all file paths contained in a specific text file
     """
-    inspect_datetime.inspect_from_file(path, step, display)
+    inspect_datetime.inspect_from_file(
+        path,
+        step,
+        display,
+        from_line,
+        resume,
+        save_cursor)
@@ -5,6 +5,7 @@ from rich.prompt import Confirm
 from rich.table import Table
 from fu.common.errors import InvalidPathError
 from fu.utils.path import path_files
+from fu.utils.pathsfile import PathsFile
 from fu.utils.console import console
 
 
@@ -89,16 +90,34 @@ def inspect_dir(path: str, step: int = 100) -> None:
     console.print(meta_table)
 
 
-def inspect_from_file(filepath: str, step=1, display_img=False) -> None:
+def inspect_from_file(
+    filepath: str,
+    step=1,
+    display_img=False,
+    from_line: int = None,
+    resume: bool = False,
+    save_cursor: bool = False
+) -> None:
     """Inspect metadata for every file path provided at given \
         file. Each line of file (non empty and not starting with '#') \
-        will be read as a file path.
+        will be read as a file path. When resuming or asked to, number \
+        of next line is saved as a cursor next to given file after each \
+        inspected batch.
 
     Args:
         filepath (str): Path to file with paths to inspect.
         step (int): Indicates how many images (lines) inspect at a time.
         display_img (bool, optional): If images should be open in default \
             system viewer. Defaults to False.
+        from_line (int, optional): Line number (starting at 1) to start \
+            from, reached with a seek instead of reading previous lines. \
+            Defaults to None (first line).
+        resume (bool, optional): Start from line saved as cursor by a \
+            previous inspection (first line if there is none), ignored \
+            if from_line is given, and keep saving cursor. \
+            Defaults to False.
+        save_cursor (bool, optional): Save cursor after each batch even \
+            if not resuming. Defaults to False.
     """
     if not os.path.isfile(filepath):
         console.print(
@@ -106,43 +125,46 @@ def inspect_from_file(filepath: str, step=1, display_img=False) -> None:
             style='error')
         raise InvalidPathError()
 
-    meta_table = _empty_exif_table()
-
-    with open(filepath) as pathsfile:
-        curr_open_count = 0
-
-        for filepath in pathsfile:
-            filepath = filepath.strip("\n")
+    paths_file = PathsFile(filepath)
+    start = paths_file.start_line(from_line, resume)
+    save_cursor = save_cursor or resume
 
-            if filepath and not filepath.startswith('#'):
-
-                # Read exif metadata
-                with open(filepath, 'rb') as raw_img:
-                    img = ExifImage(Image(raw_img))
+    meta_table = _empty_exif_table()
+    curr_open_count = 0
 
-                    meta_table.add_row(
-                        os.path.basename(filepath),
-                        img.datetime,
-                        img.datetime_original,
-                        img.datetime_digitized)
+    for line_number, img_path in paths_file.paths(start):
 
-                # Open image in system viewer if required by user
-                if display_img:
-                    typer.launch(filepath)
+        # Read exif metadata
+        with open(img_path, 'rb') as raw_img:
+            img = ExifImage(Image(raw_img))
 
-                curr_open_count += 1
+            meta_table.add_row(
+                os.path.basename(img_path),
+                img.datetime,
+                img.datetime_original,
+                img.datetime_digitized)
 
-                # Pause opening files if step has been reached
-                if curr_open_count == step:
-                    console.print(meta_table)
-                    meta_table = _empty_exif_table()
+        # Open image in system viewer if required by user
+        if display_img:
+            typer.launch(img_path)
 
-                    curr_open_count = 0
-                    if not Confirm.ask('Open next {} file(s)'.format(step)):
-                        break
+        curr_open_count += 1
 
-        if curr_open_count > 0:
+        # Pause opening files if step has been reached
+        if curr_open_count == step:
             console.print(meta_table)
+            meta_table = _empty_exif_table()
+            if save_cursor:
+                paths_file.save_cursor(line_number + 1)
+
+            curr_open_count = 0
+            if not Confirm.ask('Open next {} file(s)'.format(step)):
+                break
+
+    if curr_open_count > 0:
+        console.print(meta_table)
+        if save_cursor:
+            paths_file.save_cursor(line_number + 1)
 
 def _empty_exif_table() -> Table:
     meta_table = Table()
@@ -1,18 +1,29 @@
+import sys
 import typer
 
+from typing import List
+
+from fu.common.errors import ConfigError
 from fu.imgresize.resizer import resize_images
 from fu.index import idx_svc
+from fu.index.query import QueryFilter
 from fu.iterate_files import iterate_and_open, iterate_from_file
 from fu.movie.fixname import rename_movies
+from fu.utils.console import console
 
 from fu.exif import app as exif_app
+from fu.commands.history import app as history_app
 from fu.commands.movie import app as movie_app
 from fu.commands.tv_show import app as tvshow_app
 from fu.commands.config.commands import ViewConfigCmd, InitConfigCmd, EditConfigCmd
+from fu.commands.dupes.commands import DedupeApplyCmd, FindDupesCmd
+from fu.commands.sync.commands import SyncCmd
+from fu.commands.thumbs.commands import ThumbsCmd
 
 
 app = typer.Typer()
 app.add_typer(exif_app.app, name='exif')
+app.add_typer(history_app.app, name='index-history')
 app.add_typer(movie_app.app, name='movie')
 app.add_typer(tvshow_app.app, name='tv-show')
 
@@ -72,6 +83,32 @@ def imgresize(
     resize_images(src_dir, tgt_width, tgt_height, dst_dir)
 
 
+@app.command()
+def thumbs(
+    src_dir: str = typer.Argument(
+        "./",
+        help="Directory containing images to generate thumbnails for"
+    ),
+    sizes: List[str] = typer.Option(
+        ['normal', 'large'],
+        "--size",
+        "-z",
+        help="Thumbnail size to generate: 'normal' (128px) or 'large' (256px)"
+    ),
+    workers: int = typer.Option(
+        None,
+        "--workers",
+        "-j",
+        help="Number of worker processes. Defaults to CPU count"
+    )
+):
+    """Generates freedesktop thumbnails (~/.cache/thumbnails) for all
+    images in given directory, so file managers and viewers don't
+    have to
+    """
+    ThumbsCmd(src_dir, tuple(sizes), workers).execute()
+
+
 @app.command()
 def moviefixname(src_dir: str = typer.Argument(
     "./",
@@ -93,12 +130,40 @@ def iterate(
         "--step",
         "-s",
         help="Number of files to open at a time"
+    ),
+    prefetch: int = typer.Option(
+        1,
+        '--prefetch',
+        '-p',
+        help=(
+            'Batches of files read ahead into cache while current one is '
+            'reviewed, 0 disables it'
+        )
+    ),
+    viewer: str = typer.Option(
+        None,
+        '--viewer',
+        help=(
+            'Program opening each batch with a single process, e.g. '
+            '"feh --auto-zoom". Paths are appended as arguments'
+        )
+    ),
+    batch: bool = typer.Option(
+        False,
+        '--batch',
+        '-b',
+        help='Open each batch in viewer from [viewer] section of config file'
     )
 ):
     """Iterates all files in given path and opens them
-    in default system application
+    in default system application, or in a viewer with
+    a single process per batch (--viewer, --batch)
     """
-    iterate_and_open(path, step)
+    try:
+        iterate_and_open(path, step, prefetch, viewer, batch)
+    except ConfigError as e:
+        console.print(str(e), style='error')
+        raise typer.Exit(code=1)
 
 @app.command()
 def iteratefrom(
@@ -111,15 +176,74 @@ def iteratefrom(
         '--step',
         '-s',
         help='Number of files to open at a time'
+    ),
+    prefetch: int = typer.Option(
+        1,
+        '--prefetch',
+        '-p',
+        help=(
+            'Batches of files read ahead into cache while current one is '
+            'reviewed, 0 disables it'
+        )
+    ),
+    from_line: int = typer.Option(
+        None,
+        '--from-line',
+        help=(
+            'Line number to start from, jumped to without reading '
+            'previous lines'
+        )
+    ),
+    resume: bool = typer.Option(
+        False,
+        '--resume',
+        help=(
+            'Start from line where previous iteration stopped, and save '
+            'progress next to paths file'
+        )
+    ),
+    save_cursor: bool = typer.Option(
+        False,
+        '--save-cursor',
+        help='Save progress next to paths file, to --resume it later'
+    ),
+    viewer: str = typer.Option(
+        None,
+        '--viewer',
+        help=(
+            'Program opening each batch with a single process, e.g. '
+            '"feh --auto-zoom". Paths are appended as arguments'
+        )
+    ),
+    batch: bool = typer.Option(
+        False,
+        '--batch',
+        '-b',
+        help='Open each batch in viewer from [viewer] section of config file'
     )
 ):
     """Will iterate each line of given file as a path
     and will open it in default system program.
 
     Empty lines or lines starting with '#' will be
-    ignored.
+    ignored. With --resume (or --save-cursor) progress
+    is saved next to given file, so a later --resume
+    continues from there. With --viewer or --batch,
+    each batch opens in a single viewer process.
     """
-    iterate_from_file(path, step)
+    try:
+        iterate_from_file(
+            path,
+            step,
+            prefetch,
+            from_line,
+            resume,
+            viewer,
+            batch,
+            save_cursor)
+    except ConfigError as e:
+        console.print(str(e), style='error')
+        raise typer.Exit(code=1)
 
 @app.command()
 def index(
@@ -133,14 +257,112 @@ def index(
         '-o',
         help=(
             'Name for generated index file. '
-            'Defaults to "idx-<date>-<time>-<microseconds>.txt"'
+            'Defaults to "idx-<date>-<time>-<microseconds>.<ext>"'
+        )
+    ),
+    recursive: bool = typer.Option(
+        False,
+        '--recursive',
+        '-r',
+        help=(
+            'Include files in nested directories, indexed by its '
+            'path relative to given directory'
+        )
+    ),
+    mem_budget: int = typer.Option(
+        64,
+        '--mem-budget',
+        help=(
+            'Max MB of file names kept in memory while sorting, '
+            'beyond it sorted runs are spilled to temporary files'
+        )
+    ),
+    fmt: str = typer.Option(
+        None,
+        '--format',
+        '-f',
+        help=(
+            'Index format: "plain" (file names only), "tsv" or "bin" '
+            '(file names plus size, mtime and inode). Defaults to "tsv" '
+            'when --hash is used, "plain" otherwise'
+        )
+    ),
+    hash_algorithm: str = typer.Option(
+        None,
+        '--hash',
+        help='Include content hash of each file: "blake2b" or "sha256"'
+    ),
+    workers: int = typer.Option(
+        4,
+        '--workers',
+        '-j',
+        help='Number of files hashed in parallel'
+    ),
+    per_device: int = typer.Option(
+        None,
+        '--per-device',
+        help=(
+            'Max files hashed in parallel from the same device, '
+            'use 1 for spinning disks'
+        )
+    ),
+    update: str = typer.Option(
+        None,
+        '--update',
+        '-u',
+        help=(
+            'Previous index of same path, hashes of files not modified '
+            'since then are reused instead of computed again'
+        )
+    ),
+    catalog: bool = typer.Option(
+        False,
+        '--catalog',
+        '-c',
+        help=(
+            'Also store indexed files in the catalog searched by '
+            '"catalog-search", replacing previous files of same path'
+        )
+    ),
+    bloom: bool = typer.Option(
+        False,
+        '--bloom',
+        help=(
+            'Write a bloom filter of indexed names next to index '
+            '("<index>.bloom"), used by "index-contains"'
+        )
+    ),
+    bloom_fp_rate: float = typer.Option(
+        0.01,
+        '--bloom-fp',
+        help='False positive rate of bloom filter'
+    ),
+    walk_workers: int = typer.Option(
+        1,
+        '--walk-workers',
+        help=(
+            'Number of directories listed in parallel, raise it '
+            'for network mounts (NFS, SMB)'
         )
     )
 ):
     """Creates a text file listing all files at given path
-        in ascending order. Only direct children files.
+        in ascending order. Only direct children files unless
+        --recursive is used.
     """
-    idx_svc.index_dir(path, output)
+    idx_svc.index_dir(
+        path,
+        output,
+        recursive,
+        mem_budget * 1024 * 1024,
+        fmt,
+        hash_algorithm,
+        workers,
+        per_device,
+        update,
+        catalog,
+        bloom_fp_rate if bloom else None,
+        walk_workers)
 
 
 @app.command('index-removed')
@@ -161,12 +383,390 @@ def index_removed(
             'Name for generated index file of not found '
             'items. Defaults to "idx-removed-<date>-<time>-<microseconds>.txt"'
         )
+    ),
+    detect_moves: bool = typer.Option(
+        False,
+        '--detect-moves',
+        '-m',
+        help=(
+            'List files that are still in path under another name '
+            '(same inode and size) as moves instead of removed files. '
+            'Requires an index in "tsv" or "bin" format'
+        )
     )
 ):
     """Creates a text file listing all files that are present in a given
         index but doesn't exists in specified path anymore.
     """
-    idx_svc.index_deleted_from(path, idx, output)
+    idx_svc.index_deleted_from(path, idx, output, detect_moves)
+
+
+@app.command('index-diff')
+def index_diff(
+    idxs: List[str] = typer.Argument(
+        ...,
+        help='Two or more sorted index files, oldest first'
+    ),
+    output: str = typer.Option(
+        None,
+        '--output',
+        '-o',
+        help=(
+            'Name for generated diff file. Defaults to '
+            '"idx-diff-<date>-<time>-<microseconds>.txt" next to last index'
+        )
+    ),
+    detect_moves: bool = typer.Option(
+        False,
+        '--detect-moves',
+        '-m',
+        help=(
+            'List files removed and added with same inode and size '
+            '(and hash, if known) as moved'
+        )
+    )
+):
+    """Creates a text file listing files added, removed or changed
+        between given indexes. Changes are detected from size and
+        mtime (or hash) when indexes are in a rich format.
+    """
+    idx_svc.index_diff(idxs, output, detect_moves)
+
+
+@app.command('index-contains')
+def index_contains(
+    idx: str = typer.Argument(
+        ...,
+        help='Sorted index file'
+    ),
+    names: List[str] = typer.Argument(
+        None,
+        help='File names to look up, read from stdin (one per line) if omitted'
+    ),
+    missing: bool = typer.Option(
+        False,
+        '--missing',
+        '-m',
+        help='Print names that are not in index instead'
+    )
+):
+    """Prints which of given file names are in a sorted index. Names
+        are checked against index bloom filter first (see index --bloom)
+        and only confirmed in index when filter can't rule them out.
+        Exits with status 1 if no name was printed.
+    """
+    if not names:
+        names = (line.rstrip('\n') for line in sys.stdin)
+
+    if not idx_svc.index_contains(idx, names, missing):
+        raise typer.Exit(code=1)
+
+
+@app.command('archive-indexed')
+def archive_indexed(
+    idx: str = typer.Argument(
+        ...,
+        help='Index file listing files to archive'
+    ),
+    path: str = typer.Argument(
+        ...,
+        help='Directory containing indexed files'
+    ),
+    output: str = typer.Argument(
+        ...,
+        help='Archive to create: .tar, .tar.gz, .tar.xz or .tar.bz2'
+    ),
+    hash_algorithm: str = typer.Option(
+        'blake2b',
+        '--hash',
+        help='Hash algorithm of manifest: "blake2b" or "sha256"'
+    )
+):
+    """Streams files listed in an index into a tar archive, in index
+        order, plus a manifest ("<archive>.manifest.tsv") with hashes
+        computed while archiving.
+    """
+    idx_svc.archive_indexed(idx, path, output, hash_algorithm)
+
+
+@app.command('catalog-search')
+def catalog_search(
+    term: str = typer.Argument(
+        ...,
+        help=(
+            'Text contained in file names, or a glob pattern '
+            'like "*.jpg" matching whole file names'
+        )
+    ),
+    limit: int = typer.Option(
+        100,
+        '--limit',
+        '-l',
+        help='Max number of files to print'
+    )
+):
+    """Searches files by name across all directories indexed with
+        --catalog, printing absolute paths one per line. Exits with
+        status 1 if nothing was found.
+    """
+    if not idx_svc.search_catalog(term, limit):
+        raise typer.Exit(code=1)
+
+
+@app.command('index-verify')
+def index_verify(
+    idx: str = typer.Argument(
+        ...,
+        help='Sorted index with hashes (see index --hash)'
+    ),
+    path: str = typer.Argument(
+        ...,
+        help='Indexed directory'
+    ),
+    output: str = typer.Option(
+        None,
+        '--output',
+        '-o',
+        help=(
+            'Name for generated report file. Defaults to '
+            '"idx-verify-<date>-<time>-<microseconds>.txt" next to index'
+        )
+    ),
+    workers: int = typer.Option(
+        4,
+        '--workers',
+        '-j',
+        help='Number of files verified in parallel'
+    ),
+    per_device: int = typer.Option(
+        None,
+        '--per-device',
+        help=(
+            'Max files read in parallel from the same device, '
+            'use 1 for spinning disks'
+        )
+    ),
+    max_rate: float = typer.Option(
+        None,
+        '--max-rate',
+        help='Max MB read per second, across all workers'
+    ),
+    checkpoint: str = typer.Option(
+        None,
+        '--checkpoint',
+        help=(
+            'Progress checkpoint file, used to resume an interrupted '
+            'verification. Defaults to "<index>.verify-checkpoint"'
+        )
+    ),
+    restart: bool = typer.Option(
+        False,
+        '--restart',
+        help='Ignore existing checkpoint and verify from the beginning'
+    )
+):
+    """Re-reads indexed files and verifies its content still matches
+        hashes stored in index, reporting corrupt, modified, missing
+        and unreadable files. Resumes from last checkpoint if any.
+    """
+    idx_svc.verify_index(
+        idx,
+        path,
+        output,
+        workers,
+        per_device,
+        max_rate * 1024 * 1024 if max_rate else None,
+        checkpoint,
+        restart)
+
+
+@app.command('index-du')
+def index_du(
+    idx: str = typer.Argument(
+        ...,
+        help='Sorted rich index file ("tsv" or "bin" format)'
+    ),
+    max_depth: int = typer.Option(
+        None,
+        '--max-depth',
+        '-d',
+        help='Only print directories up to this depth, 0 for indexed dir'
+    ),
+    top: int = typer.Option(
+        None,
+        '--top',
+        '-n',
+        help='Only print this many largest directories, largest first'
+    ),
+    human: bool = typer.Option(
+        False,
+        '--human-readable',
+        '-h',
+        help='Print sizes in powers of 1024 (e.g. 1.5G)'
+    )
+):
+    """Prints total size and files count of each directory of an
+        index, children before parents, like "du" but without touching
+        indexed files.
+    """
+    if not idx_svc.index_du(idx, max_depth, top, human):
+        raise typer.Exit(code=1)
+
+
+@app.command('index-query')
+def index_query(
+    idx: str = typer.Argument(
+        ...,
+        help='Sorted index file'
+    ),
+    name: str = typer.Option(
+        None,
+        '--name',
+        '-n',
+        help='Exact file name to look up'
+    ),
+    prefix: str = typer.Option(
+        None,
+        '--prefix',
+        '-p',
+        help='List files whose name starts with prefix'
+    ),
+    glob: str = typer.Option(
+        None,
+        '--glob',
+        '-g',
+        help='List files matching shell style pattern, e.g. "2020/*.jpg"'
+    ),
+    regex: str = typer.Option(
+        None,
+        '--regex',
+        '-e',
+        help='List files whose name contains a match of regular expression'
+    ),
+    min_size: int = typer.Option(
+        None,
+        '--min-size',
+        help='Min file size in bytes (requires a rich index)'
+    ),
+    max_size: int = typer.Option(
+        None,
+        '--max-size',
+        help='Max file size in bytes (requires a rich index)'
+    ),
+    base: str = typer.Option(
+        None,
+        '--base',
+        '-b',
+        help='Directory prepended to printed file names'
+    ),
+    output: str = typer.Option(
+        None,
+        '--output',
+        '-o',
+        help='Write paths into this file instead of stdout'
+    )
+):
+    """Prints files of a sorted index matching given name or filters,
+        one per line. Exact and prefix lookups binary search the index
+        instead of reading it whole. Exits with status 1 if nothing matched.
+    """
+    query_filter = QueryFilter(prefix, glob, regex, min_size, max_size)
+    if not idx_svc.index_query(idx, name, query_filter, base, output):
+        raise typer.Exit(code=1)
+
+
+@app.command()
+def dupes(
+    path: str = typer.Argument(
+        ...,
+        help='Directory to look for duplicate files'
+    ),
+    output: str = typer.Option(
+        None,
+        '--output',
+        '-o',
+        help=(
+            'Name for generated duplicates file. '
+            'Defaults to "dupes-<date>-<time>-<microseconds>.txt"'
+        )
+    ),
+    recursive: bool = typer.Option(
+        False,
+        '--recursive',
+        '-r',
+        help='Include files in nested directories'
+    ),
+    hash_algorithm: str = typer.Option(
+        'blake2b',
+        '--hash',
+        help='Hash algorithm: "blake2b" or "sha256"'
+    ),
+    workers: int = typer.Option(
+        4,
+        '--workers',
+        '-j',
+        help='Number of files hashed in parallel'
+    ),
+    walk_workers: int = typer.Option(
+        1,
+        '--walk-workers',
+        help=(
+            'Number of directories listed in parallel, raise it '
+            'for network mounts (NFS, SMB)'
+        )
+    )
+):
+    """Finds duplicate files comparing sizes first, then partial
+        hashes and finally full hashes of still colliding files.
+        Generated file can be used with 'rm-indexed' to remove all
+        redundant copies.
+    """
+    FindDupesCmd(
+        path,
+        output,
+        recursive,
+        hash_algorithm,
+        workers,
+        walk_workers).execute()
+
+
+@app.command('dedupe-apply')
+def dedupe_apply(
+    dupes_file: str = typer.Argument(
+        ...,
+        help='Duplicates file generated by "dupes"'
+    ),
+    path: str = typer.Argument(
+        ...,
+        help='Directory where duplicates were found'
+    ),
+    method: str = typer.Option(
+        'auto',
+        '--method',
+        help=(
+            'How redundant copies are replaced: "reflink" (copy on write '
+            'clone, btrfs/XFS), "hardlink" or "auto" (reflink where '
+            'supported, hardlink otherwise)'
+        )
+    ),
+    verbose: bool = typer.Option(
+        False,
+        '--verbose',
+        '-v',
+        help='If true, will log each replaced file'
+    ),
+    dry_run: bool = typer.Option(
+        False,
+        '--dry-run',
+        '-n',
+        help='Compare files and report space to reclaim, without linking'
+    )
+):
+    """Replaces redundant copies of each group of a duplicates file
+        by links to the kept file. Files are compared byte by byte
+        right before being atomically replaced.
+    """
+    DedupeApplyCmd(dupes_file, path, method, dry_run, verbose).execute()
 
 
 @app.command('rm-indexed')
@@ -188,11 +788,88 @@ def remove_indexed(
         '--verbose',
         '-v',
         help='If true, will log each deleted/skipped file'
+    ),
+    dry_run: bool = typer.Option(
+        False,
+        '--dry-run',
+        '-n',
+        help='Report how many files would be removed, without removing them'
+    ),
+    workers: int = typer.Option(
+        8,
+        '--workers',
+        '-j',
+        help='Number of files removed in parallel'
     )
 ):
     """Permanently removes all files listed in a given index
     """
-    idx_svc.remove_indexed(idx, path, verbose)
+    idx_svc.remove_indexed(idx, path, verbose, dry_run, workers)
+
+
+@app.command()
+def sync(
+    src_dir: str = typer.Argument(
+        ...,
+        help='Source directory'
+    ),
+    dst_dir: str = typer.Argument(
+        ...,
+        help='Destination directory, made to mirror source'
+    ),
+    delete: bool = typer.Option(
+        False,
+        '--delete',
+        help='Remove files in destination that are not in source'
+    ),
+    hash_algorithm: str = typer.Option(
+        None,
+        '--hash',
+        help=(
+            'Compare files by content hash ("blake2b" or "sha256") '
+            'instead of size and mtime, reading all files'
+        )
+    ),
+    dry_run: bool = typer.Option(
+        False,
+        '--dry-run',
+        '-n',
+        help='Print planned changes without copying or removing files'
+    ),
+    verbose: bool = typer.Option(
+        False,
+        '--verbose',
+        '-v',
+        help='If true, will log each copied/removed file'
+    ),
+    workers: int = typer.Option(
+        4,
+        '--workers',
+        '-j',
+        help='Number of files copied (or hashed) in parallel'
+    ),
+    walk_workers: int = typer.Option(
+        1,
+        '--walk-workers',
+        help=(
+            'Number of directories listed in parallel, raise it '
+            'for network mounts (NFS, SMB)'
+        )
+    )
+):
+    """Copies files missing or different (by size and mtime) in
+        destination from source. Files are copied through a temp file
+        renamed into place once complete.
+    """
+    SyncCmd(
+        src_dir,
+        dst_dir,
+        delete,
+        hash_algorithm,
+        dry_run,
+        verbose,
+        workers,
+        walk_workers).execute()
 
 
 if __name__ == "__main__":
@@ -161,6 +161,28 @@ def _resize(src_file: str, tgt_width: int, tgt_height: int, dst_dir: str):
     return dst_file
 
 
+def resize_contain(img: Image.Image, max_width: int, max_height: int):
+    """Resizes given image to fit into max_width and max_height keeping \
+    its aspect ratio, same effect as css 'contain'. Images already      \
+    smaller than given size are not upscaled.
+
+    For JPEG images decoder is switched to draft mode first, so that    \
+    big photos are decoded at a reduced scale (much faster).
+
+    Args:
+        img (Image.Image): Opened image to resize
+        max_width (int): Max width in pixels
+        max_height (int): Max height in pixels
+
+    Returns:
+        Image.Image: Resized copy of given image
+    """
+    if img.format == 'JPEG':
+        img.draft('RGB', (max_width, max_height))
+
+    return resizeimage.resize_thumbnail(img, [max_width, max_height])
+
+
 def _preview_resize(resize_order: ResizeOrder) -> ResizeOrder:
     """Verify if resize operation will be possible with provided
     parameters. Resize operations will NOT be done by this method.
@@ -0,0 +1,120 @@
+"""Streaming tar archives of indexed files.
+
+Files are added to the archive in index order through a streaming tar
+writer (no seeks, so output can be compressed on the fly), and each file
+is hashed while its content is copied into the archive, so a manifest
+with content hashes is produced without reading any file twice. Memory
+usage is constant: a single copy buffer, no matter how many files or
+how big they are.
+"""
+import hashlib
+import os
+import tarfile
+
+from dataclasses import dataclass, replace
+from typing import BinaryIO, Iterable, Iterator
+
+from fu.index.idx_format import IndexEntry
+from fu.utils.fileio import COMPRESSED_EXTENSIONS, IO_BUFFER_SIZE
+
+
+#: Valid archive extensions, compressed by extension as any other file
+ARCHIVE_EXTENSIONS = ('.tar',) + tuple(
+    f'.tar{ ext }' for ext in COMPRESSED_EXTENSIONS)
+
+MANIFEST_EXTENSION = '.manifest.tsv'
+
+
+@dataclass
+class ArchiveStats:
+    files: int = 0
+    bytes: int = 0
+    missing: int = 0
+
+
+def is_archive_path(path: str) -> bool:
+    return path.lower().endswith(ARCHIVE_EXTENSIONS)
+
+
+def manifest_path(archive: str) -> str:
+    """Path of manifest written next to given archive"""
+    return f'{ archive }{ MANIFEST_EXTENSION }'
+
+
+class _HashingReader:
+    """Read-only file wrapper hashing all data read through it"""
+
+    def __init__(self, src_file: BinaryIO, algorithm: str) -> None:
+        self._file = src_file
+        self._hasher = hashlib.new(algorithm)
+        self.algorithm = algorithm
+
+    def read(self, size: int = -1) -> bytes:
+        data = self._file.read(size)
+        self._hasher.update(data)
+        return data
+
+    def hexdigest(self) -> str:
+        return self._hasher.hexdigest()
+
+
+def archive_entries(
+    entries: Iterable[IndexEntry],
+    root: str,
+    out_file: BinaryIO,
+    algorithm: str,
+    stats: ArchiveStats = None
+) -> Iterator[IndexEntry]:
+    """Writes files of given entries into a tar stream, in same order
+
+    Args:
+        entries (Iterable[IndexEntry]): Files to archive, names are \
+            used as member names
+        root (str): Directory entry names are relative to
+        out_file (BinaryIO): Binary stream archive is written into
+        algorithm (str): Hash algorithm of manifest entries
+        stats (ArchiveStats, optional): Counters updated while archiving. \
+            Defaults to None.
+
+    Raises:
+        OSError: If a file shrinks while being archived (tar header with \
+            its size is already written)
+
+    Returns:
+        Iterator[IndexEntry]: Entry of each archived file as found while \
+            archiving it (size, mtime, inode), with content hash. Files  \
+            that can't be opened are skipped.
+    """
+    stats = stats if stats is not None else ArchiveStats()
+
+    with tarfile.open(
+            fileobj=out_file,
+            mode='w|',
+            bufsize=IO_BUFFER_SIZE,
+            format=tarfile.PAX_FORMAT) as tar:
+        tar.copybufsize = IO_BUFFER_SIZE
+
+        for entry in entries:
+            try:
+                src_file = open(
+                    os.path.join(root, entry.name),
+                    'rb',
+                    buffering=0)
+            except OSError:
+                stats.missing += 1
+                continue
+
+            with src_file:
+                # Stat from open file, so header matches data being read
+                tar_info = tar.gettarinfo(arcname=entry.name, fileobj=src_file)
+                st = os.fstat(src_file.fileno())
+
+                reader = _HashingReader(src_file, algorithm)
+                tar.addfile(tar_info, reader)
+
+            stats.files += 1
+            stats.bytes += tar_info.size
+
+            yield replace(
+                IndexEntry.from_stat(entry.name, st),
+                hash=f'{ algorithm }:{ reader.hexdigest() }')
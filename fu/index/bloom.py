@@ -0,0 +1,169 @@
+"""Bloom filter sidecars of index files.
+
+A Bloom filter answers "is this name in the index?" with no false
+negatives and a configurable rate of false positives, using ~1.2 bytes
+per name at 1% false positive rate. Filters are stored next to its index
+as '<index file>.bloom'.
+"""
+import hashlib
+import math
+import os
+import struct
+
+from fu.utils.fileio import ENCODING, ENCODING_ERRORS
+
+
+DEFAULT_FP_RATE = 0.01
+
+BLOOM_EXTENSION = '.bloom'
+BLOOM_MAGIC = b'FUBLOOM\x01'
+
+# bits count, hash functions count, names count, fp rate, index file size
+_BLOOM_HEADER = struct.Struct('<QBQdQ')
+
+
+class BloomFormatError(Exception):
+    """Bloom filter file content is not valid"""
+
+
+class BloomFilter:
+    """Set membership filter with no false negatives.
+
+    Usage:
+        bloom = BloomFilter(len(names), fp_rate=0.01)
+        for name in names:
+            bloom.add(name)
+
+        'some/file.jpg' in bloom  # False means name was never added
+    """
+
+    def __init__(self, capacity: int, fp_rate: float = DEFAULT_FP_RATE):
+        """
+        Args:
+            capacity (int): Expected number of names to add
+            fp_rate (float, optional): Target false positive rate once \
+                capacity names are added. Defaults to DEFAULT_FP_RATE.
+        """
+        if not 0 < fp_rate < 1:
+            raise ValueError(
+                f'False positive rate must be between 0 and 1: { fp_rate }')
+
+        capacity = max(1, capacity)
+        bits_count = math.ceil(
+            -capacity * math.log(fp_rate) / (math.log(2) ** 2))
+
+        self.fp_rate = fp_rate
+        self.bits_count = max(8, bits_count + (-bits_count % 8))
+        self.hashes_count = max(
+            1,
+            round(self.bits_count / capacity * math.log(2)))
+        self.count = 0
+        self._bits = bytearray(self.bits_count // 8)
+
+    def __contains__(self, name: str) -> bool:
+        bits = self._bits
+        for position in self._positions(name):
+            if not bits[position >> 3] & (1 << (position & 7)):
+                return False
+
+        return True
+
+    def __len__(self) -> int:
+        return self.count
+
+    @property
+    def nbytes(self) -> int:
+        return len(self._bits)
+
+    def add(self, name: str) -> None:
+        for position in self._positions(name):
+            self._bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def save(self, path: str, idx_size: int = 0) -> None:
+        """Writes filter into a new file
+
+        Args:
+            path (str): File to create
+            idx_size (int, optional): Size of filtered index file, used \
+                to detect stale filters. Defaults to 0 (unknown).
+        """
+        with open(path, 'xb') as bloom_file:
+            bloom_file.write(BLOOM_MAGIC)
+            bloom_file.write(_BLOOM_HEADER.pack(
+                self.bits_count,
+                self.hashes_count,
+                self.count,
+                self.fp_rate,
+                idx_size))
+            bloom_file.write(self._bits)
+
+    @classmethod
+    def load(cls, path: str) -> tuple:
+        """Reads a filter file written by save()
+
+        Raises:
+            BloomFormatError: If file is not a valid filter
+
+        Returns:
+            tuple: (BloomFilter, size of filtered index file)
+        """
+        with open(path, 'rb') as bloom_file:
+            if bloom_file.read(len(BLOOM_MAGIC)) != BLOOM_MAGIC:
+                raise BloomFormatError(f'Not a bloom filter file: { path }')
+
+            header = bloom_file.read(_BLOOM_HEADER.size)
+            if len(header) != _BLOOM_HEADER.size:
+                raise BloomFormatError(f'Truncated bloom filter: { path }')
+
+            bits_count, hashes_count, count, fp_rate, idx_size = \
+                _BLOOM_HEADER.unpack(header)
+            bits = bytearray(bloom_file.read())
+
+        if len(bits) * 8 != bits_count or not hashes_count:
+            raise BloomFormatError(f'Truncated bloom filter: { path }')
+
+        bloom = cls.__new__(cls)
+        bloom.fp_rate = fp_rate
+        bloom.bits_count = bits_count
+        bloom.hashes_count = hashes_count
+        bloom.count = count
+        bloom._bits = bits
+
+        return bloom, idx_size
+
+    def _positions(self, name: str):
+        """Bit positions of given name, derived from a single hash by \
+            double hashing (Kirsch-Mitzenmacher)
+        """
+        digest = hashlib.blake2b(
+            name.encode(ENCODING, ENCODING_ERRORS),
+            digest_size=16).digest()
+        first = int.from_bytes(digest[:8], 'little')
+        second = int.from_bytes(digest[8:], 'little') | 1
+
+        for idx in range(self.hashes_count):
+            yield (first + idx * second) % self.bits_count
+
+
+def bloom_path(idx: str) -> str:
+    """Path of bloom filter sidecar of given index file"""
+    return f'{ idx }{ BLOOM_EXTENSION }'
+
+
+def load_sidecar(idx: str) -> BloomFilter:
+    """Loads bloom filter sidecar of given index, if there is an up to \
+        date one (index size must match the one recorded in filter).
+
+    Returns:
+        BloomFilter: Filter, or None if index has no valid sidecar
+    """
+    try:
+        bloom, idx_size = BloomFilter.load(bloom_path(idx))
+    except (FileNotFoundError, BloomFormatError):
+        return None
+
+    if idx_size and idx_size != os.path.getsize(idx):
+        return None
+
+    return bloom
@@ -0,0 +1,305 @@
+"""Persistent catalog of indexed directory trees.
+
+Catalog is a SQLite database in the user data dir holding every tree
+indexed with 'fu index --catalog', so that files across all indexed
+drives can be searched at once. File names are indexed by an FTS5 table
+using the trigram tokenizer (when available), hence substring searches
+don't need to scan all files.
+"""
+import os
+import sqlite3
+
+from contextlib import contextmanager
+from dataclasses import dataclass
+from datetime import datetime
+from pathlib import Path
+from typing import Iterable, Iterator, List
+
+from platformdirs import user_data_dir
+
+from fu.index.idx_format import IndexEntry
+
+
+#: Rows inserted per executemany call
+CATALOG_BATCH_SIZE = 10000
+
+DEFAULT_SEARCH_LIMIT = 100
+
+# Trigram tokenizer is available since SQLite 3.34
+_TRIGRAM_MIN_VERSION = (3, 34, 0)
+
+# Chars with special meaning in GLOB patterns
+_GLOB_SPECIAL = '*?['
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS roots (
+    id INTEGER PRIMARY KEY,
+    path TEXT NOT NULL UNIQUE,
+    indexed_at TEXT NOT NULL,
+    files INTEGER NOT NULL DEFAULT 0
+);
+
+CREATE TABLE IF NOT EXISTS dirs (
+    id INTEGER PRIMARY KEY,
+    root_id INTEGER NOT NULL REFERENCES roots (id) ON DELETE CASCADE,
+    path TEXT NOT NULL,
+    UNIQUE (root_id, path)
+);
+
+CREATE TABLE IF NOT EXISTS files (
+    id INTEGER PRIMARY KEY,
+    dir_id INTEGER NOT NULL REFERENCES dirs (id) ON DELETE CASCADE,
+    name TEXT NOT NULL,
+    size INTEGER,
+    mtime_ns INTEGER,
+    inode INTEGER,
+    hash TEXT
+);
+
+CREATE INDEX IF NOT EXISTS files_dir_id ON files (dir_id);
+
+CREATE VIRTUAL TABLE IF NOT EXISTS files_fts USING fts5 (
+    name,
+    content='files',
+    content_rowid='id',
+    tokenize='{ tokenizer }'
+);
+
+CREATE TRIGGER IF NOT EXISTS files_fts_insert AFTER INSERT ON files BEGIN
+    INSERT INTO files_fts (rowid, name) VALUES (new.id, new.name);
+END;
+
+CREATE TRIGGER IF NOT EXISTS files_fts_delete AFTER DELETE ON files BEGIN
+    INSERT INTO files_fts (files_fts, rowid, name)
+        VALUES ('delete', old.id, old.name);
+END;
+"""
+
+_SEARCH_SELECT = """
+SELECT roots.path, dirs.path, files.name, files.size
+FROM files
+    JOIN dirs ON dirs.id = files.dir_id
+    JOIN roots ON roots.id = dirs.root_id
+"""
+
+
+@dataclass
+class CatalogRoot:
+    path: str
+    indexed_at: str
+    files: int
+
+
+@dataclass
+class CatalogMatch:
+    """A file found in catalog
+
+    Args:
+        path (str): Absolute file path
+        size (int): File size in bytes, None if unknown
+    """
+
+    path: str
+    size: int = None
+
+
+def catalog_path() -> Path:
+    """Default catalog database location, inside user data dir"""
+    return Path(user_data_dir('futils')) / 'catalog.db'
+
+
+class Catalog:
+    """SQLite catalog of indexed trees.
+
+    Usage:
+        with Catalog() as catalog:
+            catalog.replace_root('/mnt/disk', entries)
+            for match in catalog.search('holidays'):
+                ...
+    """
+
+    def __init__(self, db_path: str = None) -> None:
+        """
+        Args:
+            db_path (str, optional): Database file. \
+                Defaults to catalog_path().
+        """
+        self.db_path = str(db_path or catalog_path())
+        self.trigram = sqlite3.sqlite_version_info >= _TRIGRAM_MIN_VERSION
+        self._conn: sqlite3.Connection = None
+
+    def __enter__(self) -> 'Catalog':
+        self.open()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def open(self) -> None:
+        Path(self.db_path).parent.mkdir(parents=True, exist_ok=True)
+
+        # Transactions are explicitly managed
+        self._conn = sqlite3.connect(self.db_path, isolation_level=None)
+        self._conn.execute('PRAGMA journal_mode = WAL')
+        self._conn.execute('PRAGMA synchronous = NORMAL')
+        self._conn.execute('PRAGMA foreign_keys = ON')
+
+        tokenizer = 'trigram' if self.trigram else 'unicode61'
+        self._conn.executescript(
+            _SCHEMA.replace('{ tokenizer }', tokenizer))
+
+    def close(self) -> None:
+        if self._conn:
+            self._conn.close()
+            self._conn = None
+
+    def replace_root(self, root: str, entries: Iterable[IndexEntry]) -> int:
+        """Stores given entries as the content of root directory, \
+            replacing anything previously cataloged for it. Whole   \
+            replacement happens in a single transaction, with rows  \
+            inserted in batches of CATALOG_BATCH_SIZE.
+
+        Args:
+            root (str): Indexed directory
+            entries (Iterable[IndexEntry]): Files in directory, with \
+                names relative to it
+
+        Returns:
+            int: Number of cataloged files
+        """
+        root = os.path.abspath(root)
+        files_count = 0
+
+        with self._transaction() as cursor:
+            cursor.execute('DELETE FROM roots WHERE path = ?', (root,))
+            cursor.execute(
+                'INSERT INTO roots (path, indexed_at) VALUES (?, ?)',
+                (root, datetime.now().isoformat(timespec='seconds')))
+            root_id = cursor.lastrowid
+
+            dir_ids = {}
+            batch = []
+            for entry in entries:
+                dir_path, name = os.path.split(entry.name)
+                dir_id = dir_ids.get(dir_path)
+                if dir_id is None:
+                    cursor.execute(
+                        'INSERT INTO dirs (root_id, path) VALUES (?, ?)',
+                        (root_id, dir_path))
+                    dir_id = dir_ids[dir_path] = cursor.lastrowid
+
+                batch.append((
+                    dir_id,
+                    name,
+                    entry.size,
+                    entry.mtime_ns,
+                    entry.inode,
+                    entry.hash
+                ))
+                if len(batch) >= CATALOG_BATCH_SIZE:
+                    files_count += self._insert_files(cursor, batch)
+                    batch = []
+
+            files_count += self._insert_files(cursor, batch)
+            cursor.execute(
+                'UPDATE roots SET files = ? WHERE id = ?',
+                (files_count, root_id))
+
+        return files_count
+
+    def remove_root(self, root: str) -> bool:
+        """Removes given directory and all its files from catalog
+
+        Returns:
+            bool: False if directory was not in catalog
+        """
+        with self._transaction() as cursor:
+            cursor.execute(
+                'DELETE FROM roots WHERE path = ?',
+                (os.path.abspath(root),))
+            return cursor.rowcount > 0
+
+    def roots(self) -> List[CatalogRoot]:
+        rows = self._conn.execute(
+            'SELECT path, indexed_at, files FROM roots ORDER BY path')
+        return [CatalogRoot(*row) for row in rows]
+
+    def search(
+        self,
+        term: str,
+        limit: int = DEFAULT_SEARCH_LIMIT
+    ) -> Iterator[CatalogMatch]:
+        """Finds files by name across all cataloged trees.
+
+            Terms with glob wildcards (*, ? or [) are matched against \
+            whole file names (case sensitive), any other term matches \
+            files whose name contains it (case insensitive).
+
+        Args:
+            term (str): Substring or glob pattern of file names
+            limit (int, optional): Max files returned. \
+                Defaults to DEFAULT_SEARCH_LIMIT.
+
+        Returns:
+            Iterator[CatalogMatch]: Found files
+        """
+        is_glob = any(char in term for char in _GLOB_SPECIAL)
+
+        # Trigram index can only serve patterns with 3+ literal chars
+        if self.trigram and _longest_literal(term) >= 3:
+            if is_glob:
+                where = 'files_fts.name GLOB ?'
+            else:
+                where = 'files_fts MATCH ?'
+                term = '"' + term.replace('"', '""') + '"'
+
+            query = (
+                f'{ _SEARCH_SELECT } JOIN files_fts '
+                f'ON files_fts.rowid = files.id WHERE { where } LIMIT ?'
+            )
+
+        else:
+            if is_glob:
+                where = 'files.name GLOB ?'
+            else:
+                where = "files.name LIKE ? ESCAPE '\\'"
+                term = '%' + term \
+                    .replace('\\', '\\\\') \
+                    .replace('%', '\\%') \
+                    .replace('_', '\\_') + '%'
+
+            query = f'{ _SEARCH_SELECT } WHERE { where } LIMIT ?'
+
+        for root, dir_path, name, size in self._conn.execute(
+                query,
+                (term, limit)):
+            yield CatalogMatch(os.path.join(root, dir_path, name), size)
+
+    def _insert_files(self, cursor: sqlite3.Cursor, batch: list) -> int:
+        cursor.executemany(
+            'INSERT INTO files (dir_id, name, size, mtime_ns, inode, hash) '
+            'VALUES (?, ?, ?, ?, ?, ?)',
+            batch)
+        return len(batch)
+
+    @contextmanager
+    def _transaction(self) -> Iterator[sqlite3.Cursor]:
+        cursor = self._conn.cursor()
+        cursor.execute('BEGIN')
+        try:
+            yield cursor
+        except BaseException:
+            cursor.execute('ROLLBACK')
+            raise
+
+        cursor.execute('COMMIT')
+
+
+def _longest_literal(term: str) -> int:
+    """Length of longest run of chars without glob wildcards"""
+    longest = current = 0
+    for char in term:
+        current = 0 if char in _GLOB_SPECIAL else current + 1
+        longest = max(longest, current)
+
+    return longest
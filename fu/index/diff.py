@@ -0,0 +1,245 @@
+import heapq
+import itertools
+
+from collections import defaultdict
+from dataclasses import dataclass
+from typing import Callable, Dict, Iterable, Iterator, List, Tuple
+
+from fu.index.idx_format import IndexEntry, read_sorted_entries
+
+
+STATUS_ADDED = 'added'
+STATUS_REMOVED = 'removed'
+STATUS_CHANGED = 'changed'
+STATUS_MOVED = 'moved'
+
+#: Symbol used for each status in diff files
+STATUS_SYMBOLS = {
+    STATUS_ADDED: '+',
+    STATUS_REMOVED: '-',
+    STATUS_CHANGED: '~',
+    STATUS_MOVED: '>'
+}
+
+
+@dataclass
+class IndexChange:
+    """A difference found for a file between two consecutive indexes
+
+    Args:
+        status (str): One of 'added', 'removed', 'changed' or 'moved'
+        name (str): File name (as listed in indexes), new name of \
+            moved files
+        snapshot (int): Position of the index where the change is \
+            observed (compared against the index before it)
+        old (IndexEntry): Entry in previous index, None for added files
+        new (IndexEntry): Entry in index at snapshot, None for removed files
+    """
+
+    status: str
+    name: str
+    snapshot: int
+    old: IndexEntry = None
+    new: IndexEntry = None
+
+
+def is_modified(old: IndexEntry, new: IndexEntry) -> bool:
+    """Test whether file changed between two entries with same name. \
+        Content hash is used when both entries have it, otherwise size \
+        and mtime are compared. Plain entries are never modified.
+    """
+    if old.hash and new.hash:
+        return old.hash != new.hash
+
+    if old.is_rich() and new.is_rich():
+        return old.size != new.size or old.mtime_ns != new.mtime_ns
+
+    return False
+
+
+def diff_entries(
+    *snapshots: Iterable[IndexEntry],
+    modified: Callable[[IndexEntry, IndexEntry], bool] = is_modified
+) -> Iterator[IndexChange]:
+    """Merge-joins given sorted streams of entries in a single pass and \
+        yields changes between each pair of consecutive streams, in name \
+        order. Only one entry per stream is held in memory at a time.
+
+    Args:
+        snapshots (Iterable[IndexEntry]): Two or more streams of entries \
+            sorted by name, oldest first
+        modified (Callable[[IndexEntry, IndexEntry], bool], optional): \
+            Tells whether an entry present in two consecutive streams  \
+            changed. Defaults to is_modified.
+
+    Returns:
+        Iterator[IndexChange]: Changes found, sorted by name
+    """
+    tagged = [
+        zip(entries, itertools.repeat(snapshot))
+        for snapshot, entries in enumerate(snapshots)
+    ]
+    merged = heapq.merge(*tagged, key=_tagged_name)
+
+    for name, group in itertools.groupby(merged, key=_tagged_name):
+        present: List[IndexEntry] = [None] * len(snapshots)
+        for entry, snapshot in group:
+            present[snapshot] = entry
+
+        for snapshot in range(1, len(snapshots)):
+            old = present[snapshot - 1]
+            new = present[snapshot]
+
+            if old is None and new is not None:
+                yield IndexChange(STATUS_ADDED, name, snapshot, None, new)
+            elif old is not None and new is None:
+                yield IndexChange(STATUS_REMOVED, name, snapshot, old, None)
+            elif old is not None and modified(old, new):
+                yield IndexChange(STATUS_CHANGED, name, snapshot, old, new)
+
+
+def match_moves(
+    removed: Iterable[IndexEntry],
+    added: Iterable[IndexEntry],
+    hash_of: Callable[[IndexEntry, str], str] = None
+) -> Iterator[Tuple[IndexEntry, IndexEntry]]:
+    """Pairs removed and added entries of the same file, i.e. entries \
+        with same inode and size. Removed entries are held in a hash map \
+        by inode and size, so matching is linear.
+
+        Content hash is used as tie breaker when several removed entries \
+        match an added one (e.g. hard links), and to rule out a match     \
+        when both hashes are known and differ (inode reused by another    \
+        file). Entries without inode or size are never matched.
+
+    Args:
+        removed (Iterable[IndexEntry]): Entries no longer present
+        added (Iterable[IndexEntry]): New entries, consumed lazily
+        hash_of (Callable[[IndexEntry, str], str], optional): Computes \
+            hash of an added entry with given algorithm, only called to \
+            break ties. Defaults to None (ties go to first candidate).
+
+    Returns:
+        Iterator[Tuple[IndexEntry, IndexEntry]]: (removed, added) pairs
+    """
+    candidates: Dict[tuple, List[IndexEntry]] = {}
+    for entry in removed:
+        key = _move_key(entry)
+        if key:
+            candidates.setdefault(key, []).append(entry)
+
+    for entry in added:
+        if not candidates:
+            break
+
+        key = _move_key(entry)
+        if key not in candidates:
+            continue
+
+        matched = _pick_candidate(candidates[key], entry, hash_of)
+        if matched is None:
+            continue
+
+        old = candidates[key].pop(matched)
+        if not candidates[key]:
+            del candidates[key]
+
+        yield old, entry
+
+
+def collapse_moves(changes: Iterable[IndexChange]) -> List[IndexChange]:
+    """Replaces each pair of removed and added changes of the same file \
+        in the same snapshot (see match_moves) by a single moved change.
+
+    Args:
+        changes (Iterable[IndexChange]): Changes sorted by name
+
+    Returns:
+        List[IndexChange]: Changes sorted by name, moved files are sorted \
+            by their new name
+    """
+    changes = list(changes)
+    moved: Dict[int, IndexChange] = {}
+    matched_removed = set()
+
+    removed = defaultdict(list)
+    added = defaultdict(list)
+    for change in changes:
+        if change.status == STATUS_REMOVED:
+            removed[change.snapshot].append(change.old)
+        elif change.status == STATUS_ADDED:
+            added[change.snapshot].append(change.new)
+
+    for snapshot in removed:
+        for old, new in match_moves(removed[snapshot], added[snapshot]):
+            moved[id(new)] = IndexChange(
+                STATUS_MOVED,
+                new.name,
+                snapshot,
+                old,
+                new)
+            matched_removed.add(id(old))
+
+    return [
+        moved.get(id(change.new), change) for change in changes
+        if change.status != STATUS_REMOVED
+        or id(change.old) not in matched_removed
+    ]
+
+
+def diff_indexes(idx_paths: List[str]) -> Iterator[IndexChange]:
+    """Streams changes between given index files (see diff_entries). \
+        Index files can be in any format but must be sorted by name.
+
+    Args:
+        idx_paths (List[str]): Paths to two or more index files, oldest first
+
+    Raises:
+        IndexNotSortedError: If any of the indexes is not sorted
+
+    Returns:
+        Iterator[IndexChange]: Changes found, sorted by name
+    """
+    return diff_entries(*[read_sorted_entries(p) for p in idx_paths])
+
+
+def _tagged_name(tagged_entry: tuple) -> str:
+    return tagged_entry[0].name
+
+
+def _move_key(entry: IndexEntry) -> tuple:
+    if entry.inode is None or entry.size is None:
+        return None
+
+    return entry.inode, entry.size
+
+
+def _pick_candidate(
+    candidates: List[IndexEntry],
+    entry: IndexEntry,
+    hash_of: Callable[[IndexEntry, str], str]
+) -> int:
+    """Position of candidate matching given entry, None if none matches"""
+    if len(candidates) == 1 and not (entry.hash and candidates[0].hash):
+        return 0
+
+    hashed = [c.hash for c in candidates if c.hash]
+    if not hashed:
+        return 0
+
+    entry_hash = entry.hash
+    if not entry_hash and hash_of:
+        entry_hash = hash_of(entry, hashed[0].split(':', 1)[0])
+    if not entry_hash:
+        return 0
+
+    for position, candidate in enumerate(candidates):
+        if candidate.hash == entry_hash:
+            return position
+
+    # Candidates without hash can't be ruled out
+    for position, candidate in enumerate(candidates):
+        if not candidate.hash:
+            return position
+
+    return None
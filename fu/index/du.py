@@ -0,0 +1,115 @@
+"""Disk usage rollups computed from sorted rich indexes.
+
+Names sharing a directory prefix are contiguous in a sorted index, so a
+single streaming pass with a stack of open directories (one per level of
+current path) is enough to total every directory: each entry is added to
+all open directories, and once an entry leaves a directory its totals are
+final. Memory only depends on tree depth, never on number of files or
+directories.
+"""
+import heapq
+
+from dataclasses import dataclass
+from typing import Iterable, Iterator, List
+
+from fu.index.idx_format import IndexEntry
+
+
+#: Path of indexed directory itself in rollups
+ROOT_DIR = '.'
+
+_SIZE_UNITS = ('B', 'K', 'M', 'G', 'T', 'P')
+
+
+@dataclass
+class DirUsage:
+    """Totals of a directory, including all nested directories
+
+    Args:
+        path (str): Directory path relative to indexed dir, ROOT_DIR for \
+            indexed dir itself
+        size (int): Bytes of all files
+        files (int): Number of files
+        depth (int): Nesting level, 0 for indexed dir
+    """
+
+    path: str
+    size: int = 0
+    files: int = 0
+    depth: int = 0
+
+
+def dir_usage(
+    entries: Iterable[IndexEntry],
+    max_depth: int = None
+) -> Iterator[DirUsage]:
+    """Totals size and files count of every directory, in a single pass \
+        over entries sorted by name. Directories are yielded once all    \
+        its files are counted, children before parents (as 'du' does).
+
+    Args:
+        entries (Iterable[IndexEntry]): Entries sorted by name, with size
+        max_depth (int, optional): Only yield directories up to this  \
+            nesting level (deeper files are still counted in parents). \
+            Defaults to None (all directories).
+
+    Raises:
+        ValueError: If an entry has no size (not a rich index)
+
+    Returns:
+        Iterator[DirUsage]: Totals of each directory
+    """
+    # Currently open directories, from root to deepest
+    stack: List[DirUsage] = [DirUsage(ROOT_DIR)]
+
+    for entry in entries:
+        if entry.size is None:
+            raise ValueError(
+                f'Entry has no size, a rich index is required: { entry.name }')
+
+        parts = entry.name.split('/')[:-1]
+
+        # Close directories current entry is not in
+        common = 0
+        while common < min(len(parts), len(stack) - 1) and \
+                stack[common + 1].path.rsplit('/', 1)[-1] == parts[common]:
+            common += 1
+
+        while len(stack) - 1 > common:
+            yield from _close(stack, max_depth)
+
+        for depth in range(common, len(parts)):
+            stack.append(DirUsage('/'.join(parts[:depth + 1]), depth=depth + 1))
+
+        for usage in stack:
+            usage.size += entry.size
+            usage.files += 1
+
+    while stack:
+        yield from _close(stack, max_depth)
+
+
+def top_usage(usages: Iterable[DirUsage], count: int) -> List[DirUsage]:
+    """Largest directories by size, keeping only count of them in memory"""
+    return heapq.nlargest(count, usages, key=lambda usage: usage.size)
+
+
+def format_size(size: int) -> str:
+    """Human readable size using powers of 1024, e.g. '1.5G'"""
+    value = float(size)
+    for unit in _SIZE_UNITS:
+        if value < 1024 or unit == _SIZE_UNITS[-1]:
+            break
+        value /= 1024
+
+    if unit == _SIZE_UNITS[0]:
+        return f'{ size }{ unit }'
+
+    return '{:.1f}{}'.format(value, unit)
+
+
+def _close(stack: List[DirUsage], max_depth: int) -> Iterator[DirUsage]:
+    usage = stack.pop()
+    if max_depth is None or usage.depth <= max_depth:
+        yield usage
+
@@ -0,0 +1,197 @@
+import heapq
+import os
+import sys
+import tempfile
+
+from typing import Callable, Iterable, Iterator, List
+
+from fu.index.frontcoded import FrontCodedList
+
+
+#: Default memory budget for in memory lines before spilling them to disk
+DEFAULT_MEM_BUDGET = 64 * 1024 * 1024
+
+#: Max number of run files merged at once
+MAX_FAN_IN = 128
+
+_IO_BUFFER_SIZE = 1024 * 1024
+
+# Lines in run files are NUL separated, NUL is the only char that can't
+# be part of a file name (or path) so any name can be sorted
+_RUN_SEP = '\0'
+
+
+class ExternalSorter:
+    """Sorts an arbitrary number of lines keeping memory usage bounded.
+
+    Lines are accumulated in memory until given memory budget is reached,
+    then they're sorted and packed into a front coded in memory run (see
+    FrontCodedList), a fraction of the size of the original strings. Once
+    packed runs take half of the budget, they're merged into a temporary
+    'run' file. Once all lines were added, runs are k-way merged while
+    being iterated, so sorted lines are streamed instead of materialized.
+
+    If all lines fit in memory budget, no temporary files are created at all.
+
+    Usage:
+        with ExternalSorter() as sorter:
+            for name in names:
+                sorter.add(name)
+
+            for name in sorter.sorted():
+                ...
+    """
+
+    def __init__(
+        self,
+        mem_budget: int = DEFAULT_MEM_BUDGET,
+        key: Callable = None,
+        tmp_dir: str = None
+    ) -> None:
+        """
+        Args:
+            mem_budget (int, optional): Approx. max bytes used by in memory \
+                lines. Defaults to DEFAULT_MEM_BUDGET.
+            key (Callable, optional): Sort key function applied to lines. \
+                Defaults to None (lines are compared directly).
+            tmp_dir (str, optional): Where to create temporary run files. \
+                Defaults to system temp dir.
+        """
+        self.mem_budget = mem_budget
+        self.key = key
+        self.tmp_dir = tmp_dir
+
+        self._lines: List[str] = []
+        self._lines_size = 0
+        self._count = 0
+
+        self._mem_runs: List[FrontCodedList] = []
+        self._mem_runs_size = 0
+
+        self._runs_dir: tempfile.TemporaryDirectory = None
+        self._runs: List[str] = []
+        self._runs_created = 0
+
+    def __enter__(self) -> 'ExternalSorter':
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def __len__(self) -> int:
+        return self._count
+
+    @property
+    def runs_count(self) -> int:
+        """Number of run files spilled to disk so far"""
+        return len(self._runs)
+
+    def add(self, line: str) -> None:
+        self._lines.append(line)
+        self._lines_size += sys.getsizeof(line) + 8
+        self._count += 1
+
+        if self._lines_size + self._mem_runs_size >= self.mem_budget:
+            self._pack()
+
+    def sorted(self) -> Iterator[str]:
+        """Iterates all added lines in ascending order
+
+        Returns:
+            Iterator[str]: Sorted lines
+        """
+        self._lines.sort(key=self.key)
+
+        if not self._runs and not self._mem_runs:
+            yield from self._lines
+            return
+
+        # Reduce number of runs so that merge doesn't exhaust open
+        # file descriptors
+        while len(self._runs) > MAX_FAN_IN:
+            merge_runs = self._runs[:MAX_FAN_IN]
+            self._runs = self._runs[MAX_FAN_IN:]
+            self._write_run(self._merge(merge_runs))
+            for run in merge_runs:
+                os.remove(run)
+
+        yield from self._merge(self._runs, [self._lines, *self._mem_runs])
+
+    def close(self) -> None:
+        """Removes temporary run files (if any)"""
+        self._lines = []
+        self._mem_runs = []
+        self._runs = []
+        if self._runs_dir:
+            self._runs_dir.cleanup()
+            self._runs_dir = None
+
+    def _pack(self) -> None:
+        self._lines.sort(key=self.key)
+        mem_run = FrontCodedList(self._lines, self.key)
+        self._mem_runs.append(mem_run)
+        self._mem_runs_size += mem_run.nbytes
+
+        self._lines = []
+        self._lines_size = 0
+
+        if self._mem_runs_size >= self.mem_budget // 2:
+            self._write_run(self._merge([], self._mem_runs))
+            self._mem_runs = []
+            self._mem_runs_size = 0
+
+    def _write_run(self, lines) -> None:
+        if not self._runs_dir:
+            self._runs_dir = tempfile.TemporaryDirectory(
+                prefix='fu-sort-',
+                dir=self.tmp_dir)
+
+        run_path = os.path.join(
+            self._runs_dir.name,
+            f'{ self._runs_created }.run')
+        self._runs_created += 1
+
+        with _open_run(run_path, 'w') as run_file:
+            for line in lines:
+                run_file.write(line)
+                run_file.write(_RUN_SEP)
+
+        self._runs.append(run_path)
+
+    def _merge(
+        self,
+        runs: List[str],
+        mem_runs: List[Iterable[str]] = ()
+    ) -> Iterator[str]:
+        run_files = [_open_run(run, 'r') for run in runs]
+        try:
+            yield from heapq.merge(
+                *[_read_run(run_file) for run_file in run_files],
+                *mem_runs,
+                key=self.key)
+        finally:
+            for run_file in run_files:
+                run_file.close()
+
+
+def _open_run(path: str, mode: str):
+    return open(
+        path,
+        mode,
+        encoding='utf-8',
+        errors='surrogateescape',
+        newline='',
+        buffering=_IO_BUFFER_SIZE)
+
+
+def _read_run(run_file) -> Iterator[str]:
+    """Iterates lines of a NUL separated run file"""
+    pending = ''
+    while True:
+        chunk = run_file.read(_IO_BUFFER_SIZE)
+        if not chunk:
+            break
+
+        lines = (pending + chunk).split(_RUN_SEP)
+        pending = lines.pop()
+        yield from lines
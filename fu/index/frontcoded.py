@@ -0,0 +1,214 @@
+"""Compact in-memory list of sorted strings.
+
+Names are stored front coded in a single contiguous buffer: strings are
+grouped in blocks of block_size, the first one of each block is stored in
+full and every other one only as the length of the prefix it shares with
+previous string plus the remaining suffix. Sorted file paths share long
+prefixes (directories), so this takes a fraction of the memory of a list
+of str, where each string is a separate object of ~50 bytes overhead.
+
+An array of offsets to the start of each block allows binary search by
+decoding only block heads, plus a short scan within a single block.
+"""
+from array import array
+from typing import Callable, Iterable, Iterator
+
+from fu.utils.fileio import ENCODING, ENCODING_ERRORS
+
+
+#: Strings per block, only first string of each block is stored in full
+DEFAULT_BLOCK_SIZE = 16
+
+
+class FrontCodedList:
+    """Append-only list of strings in ascending order.
+
+    Usage:
+        names = FrontCodedList(sorted_names)
+        if 'some/file.jpg' in names:
+            ...
+    """
+
+    def __init__(
+        self,
+        names: Iterable[str] = (),
+        key: Callable = None,
+        block_size: int = DEFAULT_BLOCK_SIZE
+    ) -> None:
+        """
+        Args:
+            names (Iterable[str], optional): Strings in ascending order. \
+                Defaults to empty list.
+            key (Callable, optional): Sort key function strings are \
+                ordered by. Defaults to None (strings are compared).
+            block_size (int, optional): Strings per block. \
+                Defaults to DEFAULT_BLOCK_SIZE.
+        """
+        self.key = key
+        self.block_size = block_size
+
+        self._data = bytearray()
+        self._offsets = array('Q')
+        self._count = 0
+        self._last = b''
+        self._last_key = None
+
+        for name in names:
+            self.append(name)
+
+    def __len__(self) -> int:
+        return self._count
+
+    def __iter__(self) -> Iterator[str]:
+        for block in range(len(self._offsets)):
+            for encoded in self._block(block):
+                yield _decode(encoded)
+
+    def __getitem__(self, index: int) -> str:
+        if index < 0:
+            index += self._count
+        if not 0 <= index < self._count:
+            raise IndexError('FrontCodedList index out of range')
+
+        block, position = divmod(index, self.block_size)
+        for block_pos, encoded in enumerate(self._block(block)):
+            if block_pos == position:
+                return _decode(encoded)
+
+    def __contains__(self, name: str) -> bool:
+        return self._search(name)[1]
+
+    @property
+    def nbytes(self) -> int:
+        """Bytes used by encoded strings and block offsets"""
+        return len(self._data) + self._offsets.itemsize * len(self._offsets)
+
+    def append(self, name: str) -> None:
+        """Adds a string at the end of list
+
+        Raises:
+            ValueError: If string is less than last one in list
+        """
+        name_key = self.key(name) if self.key else name
+        if self._count and name_key < self._last_key:
+            raise ValueError(
+                f'Strings must be added in ascending order, "{ name }" '
+                'is less than previous string')
+
+        encoded = name.encode(ENCODING, ENCODING_ERRORS)
+        if self._count % self.block_size == 0:
+            self._offsets.append(len(self._data))
+            shared = 0
+        else:
+            shared = _shared_prefix_len(self._last, encoded)
+
+        _write_varint(self._data, shared)
+        _write_varint(self._data, len(encoded) - shared)
+        self._data += memoryview(encoded)[shared:]
+
+        self._count += 1
+        self._last = encoded
+        self._last_key = name_key
+
+    def bisect_left(self, name: str) -> int:
+        """Index where given string would be inserted to keep list sorted, \
+            before any equal string (same as bisect.bisect_left)
+        """
+        return self._search(name)[0]
+
+    def _search(self, name: str) -> tuple:
+        """Binary searches block heads, then scans the single block that \
+            may hold given string
+
+        Returns:
+            tuple: (bisect left index, whether string is in list)
+        """
+        name_key = self.key(name) if self.key else name
+
+        # First block whose head is not less than name
+        low, high = 0, len(self._offsets)
+        while low < high:
+            middle = (low + high) // 2
+            if self._key_of(self._head(middle)) < name_key:
+                low = middle + 1
+            else:
+                high = middle
+
+        if low == 0:
+            if not self._count:
+                return 0, False
+            return 0, _decode(self._head(0)) == name
+
+        # Name is either within previous block or is head of found block
+        block = low - 1
+        index = block * self.block_size
+        for encoded in self._block(block):
+            decoded = _decode(encoded)
+            if self._key_of(encoded, decoded) >= name_key:
+                return index, decoded == name
+            index += 1
+
+        found = low < len(self._offsets) and _decode(self._head(low)) == name
+        return index, found
+
+    def _key_of(self, encoded: bytes, decoded: str = None):
+        decoded = decoded if decoded is not None else _decode(encoded)
+        return self.key(decoded) if self.key else decoded
+
+    def _head(self, block: int) -> bytes:
+        pos = self._offsets[block]
+        _, pos = _read_varint(self._data, pos)
+        length, pos = _read_varint(self._data, pos)
+
+        return bytes(self._data[pos:pos + length])
+
+    def _block(self, block: int) -> Iterator[bytes]:
+        pos = self._offsets[block]
+        end = self._offsets[block + 1] \
+            if block + 1 < len(self._offsets) else len(self._data)
+
+        prev = b''
+        while pos < end:
+            shared, pos = _read_varint(self._data, pos)
+            length, pos = _read_varint(self._data, pos)
+            prev = prev[:shared] + self._data[pos:pos + length]
+            pos += length
+            yield prev
+
+
+def _decode(encoded: bytes) -> str:
+    return encoded.decode(ENCODING, ENCODING_ERRORS)
+
+
+def _shared_prefix_len(first: bytes, second: bytes) -> int:
+    """Length of common prefix, found by binary search over slice \
+        comparisons (done in C) instead of comparing byte by byte
+    """
+    low, high = 0, min(len(first), len(second))
+    while low < high:
+        middle = (low + high + 1) // 2
+        if first[:middle] == second[:middle]:
+            low = middle
+        else:
+            high = middle - 1
+
+    return low
+
+
+def _write_varint(data: bytearray, value: int) -> None:
+    while value >= 0x80:
+        data.append((value & 0x7F) | 0x80)
+        value >>= 7
+    data.append(value)
+
+
+def _read_varint(data: bytearray, pos: int) -> tuple:
+    value = 0
+    shift = 0
+    while True:
+        byte = data[pos]
+        pos += 1
+        value |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            return value, pos
+        shift += 7
@@ -0,0 +1,325 @@
+import hashlib
+import os
+import threading
+import time
+
+from dataclasses import dataclass, replace
+from functools import partial
+from typing import Callable, Iterable, Iterator
+
+from fu.index.idx_format import IndexEntry
+from fu.utils.concurrency import bounded_map, device_map
+from fu.utils.ratelimit import TokenBucket
+
+
+HASH_ALGORITHMS = ('blake2b', 'sha256')
+
+DEFAULT_BUFFER_SIZE = 1024 * 1024
+DEFAULT_WORKERS = 4
+
+
+class HashAlgorithmError(Exception):
+    pass
+
+
+@dataclass
+class HashStats:
+    files: int = 0
+    bytes: int = 0
+    errors: int = 0
+    seconds: float = 0.0
+
+    @property
+    def gb_per_sec(self) -> float:
+        if not self.seconds:
+            return 0.0
+
+        return self.bytes / 1e9 / self.seconds
+
+    def summary(self) -> str:
+        gigabytes = '{:.2f}'.format(self.bytes / 1e9)
+        seconds = '{:.1f}'.format(self.seconds)
+        rate = '{:.2f}'.format(self.gb_per_sec)
+
+        return (
+            f'{ self.files } file(s) hashed, { gigabytes } GB in '
+            f'{ seconds }s ({ rate } GB/s)'
+        )
+
+
+def validate_algorithm(algorithm: str) -> None:
+    if algorithm not in HASH_ALGORITHMS:
+        raise HashAlgorithmError(
+            f'Unsupported hash algorithm: { algorithm }. '
+            f'Valid algorithms are: { ", ".join(HASH_ALGORITHMS) }')
+
+
+def hash_file(
+    path: str,
+    algorithm: str,
+    buffer_size: int = DEFAULT_BUFFER_SIZE
+) -> str:
+    """Computes content hash of given file.
+
+        File is read in big chunks into a single reusable buffer, both \
+        reads and hash updates of big chunks release the GIL, so this  \
+        function scales across threads.
+
+    Args:
+        path (str): File to hash
+        algorithm (str): One of HASH_ALGORITHMS
+        buffer_size (int, optional): Read size in bytes. \
+            Defaults to DEFAULT_BUFFER_SIZE.
+
+    Returns:
+        str: File hash as '<algorithm>:<hex digest>'
+    """
+    validate_algorithm(algorithm)
+
+    with open(path, 'rb', buffering=0) as src_file:
+        digest = _hash_stream(src_file, algorithm, buffer_size)
+
+    return f'{ algorithm }:{ digest }'
+
+
+def hash_file_edges(path: str, algorithm: str, edge_size: int) -> str:
+    """Computes hash of first and last edge_size bytes of given file. \
+        Files up to 2 * edge_size bytes are fully hashed, so result is \
+        the same as hash_file for them.
+
+    Args:
+        path (str): File to hash
+        algorithm (str): One of HASH_ALGORITHMS
+        edge_size (int): Bytes to read at start and end of file
+
+    Returns:
+        str: Partial hash as '<algorithm>:<hex digest>'
+    """
+    validate_algorithm(algorithm)
+
+    with open(path, 'rb', buffering=0) as src_file:
+        size = os.fstat(src_file.fileno()).st_size
+        if size <= edge_size * 2:
+            digest = _hash_stream(src_file, algorithm, DEFAULT_BUFFER_SIZE)
+        else:
+            hasher = hashlib.new(algorithm)
+            hasher.update(_read_at(src_file, 0, edge_size))
+            hasher.update(_read_at(src_file, size - edge_size, edge_size))
+            digest = hasher.hexdigest()
+
+    return f'{ algorithm }:{ digest }'
+
+
+class ParallelHasher:
+    """Hashes index entries content on a pool of threads.
+
+        Optionally, a max number of files read concurrently from the   \
+        same device can be set, so that spinning disks don't thrash    \
+        seeking between many files. Files are then queued per device   \
+        (found with a stat of each file on the dispatching thread) and  \
+        only handed to a worker when its device has a free slot, so     \
+        idle workers keep hashing files of other devices. Reads can     \
+        also be limited to a global rate, and hashed files can be       \
+        dropped from page cache once read, so that background scans     \
+        don't evict data of other processes.
+    """
+
+    def __init__(
+        self,
+        algorithm: str,
+        workers: int = DEFAULT_WORKERS,
+        per_device: int = None,
+        buffer_size: int = DEFAULT_BUFFER_SIZE,
+        rate_limiter: TokenBucket = None,
+        drop_cache: bool = False
+    ) -> None:
+        """
+        Args:
+            algorithm (str): One of HASH_ALGORITHMS
+            workers (int, optional): Max files hashed at a time. \
+                Defaults to DEFAULT_WORKERS.
+            per_device (int, optional): Max files hashed at a time from \
+                the same device. Defaults to None (no limit).
+            buffer_size (int, optional): Read size in bytes. \
+                Defaults to DEFAULT_BUFFER_SIZE.
+            rate_limiter (TokenBucket, optional): Bucket of bytes shared \
+                by all workers. Defaults to None (no limit).
+            drop_cache (bool, optional): Advise kernel to drop each file \
+                from page cache after hashing it. Defaults to False.
+        """
+        validate_algorithm(algorithm)
+
+        self.algorithm = algorithm
+        self.workers = max(1, workers)
+        self.per_device = per_device
+        self.buffer_size = buffer_size
+        self.rate_limiter = rate_limiter
+        self.drop_cache = drop_cache
+        self.stats = HashStats()
+
+        self._lock = threading.Lock()
+
+    def hash_entries(
+        self,
+        entries: Iterable[IndexEntry],
+        root: str
+    ) -> Iterator[IndexEntry]:
+        """Computes hash for each given entry. Entries are yielded in \
+            same order they're received, and only a bounded number of \
+            them is in flight at a time, so streams of any size can be \
+            hashed. Entries that already have a hash are not hashed again.
+
+        Args:
+            entries (Iterable[IndexEntry]): Entries to hash
+            root (str): Directory entry names are relative to
+
+        Returns:
+            Iterator[IndexEntry]: Entries with hash assigned. Hash is None \
+                if file could not be read.
+        """
+        started = time.monotonic()
+        try:
+            yield from self.map(
+                partial(self._hash_entry, root=root),
+                entries,
+                partial(_unhashed_path, root=root))
+        finally:
+            self.stats.seconds += time.monotonic() - started
+
+    def map(
+        self,
+        fn: Callable,
+        items: Iterable,
+        path_of: Callable
+    ) -> Iterator:
+        """Applies fn to each item on hasher workers, honoring per device \
+            limit, with results in same order as items. Lets callers     \
+            doing more than hashing per file (e.g. verification) share   \
+            the same scheduling.
+
+        Args:
+            fn (Callable): Function to apply to each item, usually \
+                calling hash_path
+            items (Iterable): Items to process
+            path_of (Callable): File read by fn for an item, None if it \
+                won't read any
+
+        Returns:
+            Iterator: fn result for each item
+        """
+        if not self.per_device:
+            return bounded_map(fn, items, self.workers)
+
+        return device_map(
+            fn,
+            items,
+            partial(_device_of, path_of=path_of),
+            self.workers,
+            self.per_device)
+
+    def hash_path(self, path: str) -> str:
+        """Hashes a single file, honoring rate limit and cache dropping \
+            settings. Can be called from many threads, per device limit \
+            only applies to files dispatched by map or hash_entries.
+
+        Raises:
+            OSError: If file can't be read
+
+        Returns:
+            str: File hash as '<algorithm>:<hex digest>'
+        """
+        with open(path, 'rb', buffering=0) as src_file:
+            fd = src_file.fileno()
+            _advise(fd, 'POSIX_FADV_SEQUENTIAL')
+            digest = _hash_stream(
+                src_file,
+                self.algorithm,
+                self.buffer_size,
+                self._on_read)
+
+            if self.drop_cache:
+                _advise(fd, 'POSIX_FADV_DONTNEED')
+
+        with self._lock:
+            self.stats.files += 1
+
+        return f'{ self.algorithm }:{ digest }'
+
+    def _hash_entry(self, entry: IndexEntry, root: str) -> IndexEntry:
+        if entry.hash:
+            return entry
+
+        try:
+            content_hash = self.hash_path(os.path.join(root, entry.name))
+        except OSError:
+            with self._lock:
+                self.stats.errors += 1
+            return entry
+
+        return replace(entry, hash=content_hash)
+
+    def _on_read(self, count: int) -> None:
+        with self._lock:
+            self.stats.bytes += count
+
+        if self.rate_limiter:
+            self.rate_limiter.consume(count)
+
+
+def _unhashed_path(entry: IndexEntry, root: str) -> str:
+    return None if entry.hash else os.path.join(root, entry.name)
+
+
+def _device_of(item, path_of: Callable) -> int:
+    """Device of file read for item, None if unknown (e.g. missing file, \
+        which fails fast without reading anything)
+    """
+    path = path_of(item)
+    if path is None:
+        return None
+
+    try:
+        return os.stat(path).st_dev
+    except OSError:
+        return None
+
+
+def _hash_stream(src_file, algorithm: str, buffer_size: int,
+                 on_read=None) -> str:
+    hasher = hashlib.new(algorithm)
+    buffer = bytearray(buffer_size)
+    view = memoryview(buffer)
+
+    while True:
+        read_count = src_file.readinto(buffer)
+        if not read_count:
+            break
+
+        hasher.update(view[:read_count])
+        if on_read:
+            on_read(read_count)
+
+    return hasher.hexdigest()
+
+
+def _advise(fd: int, advice: str) -> None:
+    """Gives access pattern advice to kernel, where supported"""
+    if hasattr(os, 'posix_fadvise') and hasattr(os, advice):
+        try:
+            os.posix_fadvise(fd, 0, 0, getattr(os, advice))
+        except OSError:
+            pass
+
+
+def _read_at(src_file, offset: int, size: int) -> bytes:
+    src_file.seek(offset)
+    chunks = []
+    while size > 0:
+        chunk = src_file.read(size)
+        if not chunk:
+            break
+        chunks.append(chunk)
+        size -= len(chunk)
+
+    return b''.join(chunks)
+
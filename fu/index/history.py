@@ -0,0 +1,428 @@
+"""Versioned store of index snapshots of the same tree.
+
+Consecutive snapshots of a tree are mostly identical, so only the first
+one is stored in full and every later one as a sorted delta against the
+previous snapshot: '+' lines set an entry (added file, or any of its
+fields changed) and '-' lines remove it. A full checkpoint is also stored every
+checkpoint_interval snapshots, so rebuilding any snapshot only streams
+its closest checkpoint plus a bounded number of deltas, merge-joining
+them in a single pass.
+
+Every stored file has a bloom filter sidecar of the names in it, so the
+history of a single file is found by checking filters first and only
+decompressing the few deltas that may mention it.
+
+Store layout:
+    history.json           Snapshots manifest
+    full-00000.tsv.gz      Full snapshots (first one, then checkpoints)
+    delta-00001.tsv.gz     Changes since previous snapshot
+    *.bloom                Bloom filter of names in each file above
+"""
+import json
+import operator
+import os
+
+from contextlib import nullcontext
+from dataclasses import asdict, dataclass
+from datetime import datetime
+from typing import Iterable, Iterator, List, Tuple
+
+from fu.index.bloom import BloomFilter, bloom_path, load_sidecar
+from fu.index.diff import (
+    STATUS_ADDED,
+    STATUS_CHANGED,
+    STATUS_REMOVED,
+    diff_entries,
+    is_modified
+)
+from fu.index.idx_format import (
+    FORMAT_TSV,
+    IndexEntry,
+    IndexFormatError,
+    IndexWriter,
+    format_tsv_line,
+    parse_tsv_line,
+    read_entries
+)
+from fu.utils.fileio import open_file
+
+
+#: Snapshots between full checkpoints
+DEFAULT_CHECKPOINT_INTERVAL = 30
+
+HISTORY_MANIFEST = 'history.json'
+
+#: Delta line prefixes: entry is set (added or changed) or removed
+DELTA_SET = '+'
+DELTA_REMOVE = '-'
+
+_FULL_FNAME = 'full-{}.tsv.gz'
+_DELTA_FNAME = 'delta-{}.tsv.gz'
+_ID_DIGITS = 5
+_BLOOM_FP_RATE = 0.01
+
+
+class HistoryError(Exception):
+    pass
+
+
+@dataclass
+class Snapshot:
+    """A stored snapshot
+
+    Args:
+        id (int): Position in history, starting at 0
+        label (str): Description, e.g. name of the index file it came from
+        created_at (str): When snapshot was added (ISO format)
+        files (int): Number of files in snapshot
+        added (int): Files added since previous snapshot
+        changed (int): Files changed since previous snapshot
+        removed (int): Files removed since previous snapshot
+        full (bool): Whether snapshot is stored in full (checkpoint)
+    """
+
+    id: int
+    label: str
+    created_at: str
+    files: int = 0
+    added: int = 0
+    changed: int = 0
+    removed: int = 0
+    full: bool = False
+
+
+@dataclass
+class FileEvent:
+    """A change of a single file in history
+
+    Args:
+        snapshot (Snapshot): Snapshot where the change is observed
+        status (str): 'added', 'changed' or 'removed'
+        entry (IndexEntry): Entry in snapshot, only name for removals
+    """
+
+    snapshot: Snapshot
+    status: str
+    entry: IndexEntry
+
+
+class HistoryStore:
+    """Delta compressed store of snapshots of a tree.
+
+    Usage:
+        store = HistoryStore('/backups/photos-history')
+        store.add(read_sorted_entries('idx-20230101.tsv'), 'idx-20230101')
+        for entry in store.entries(0):
+            ...
+        for event in store.file_log('2020/img_001.jpg'):
+            ...
+    """
+
+    def __init__(
+        self,
+        path: str,
+        checkpoint_interval: int = None
+    ) -> None:
+        """
+        Args:
+            path (str): Store directory, created on first add
+            checkpoint_interval (int, optional): Snapshots between full \
+                checkpoints, only for new stores as existing ones keep  \
+                the interval they were created with. Defaults to None   \
+                (stored interval, or DEFAULT_CHECKPOINT_INTERVAL).
+
+        Raises:
+            HistoryError: If given interval differs from the stored one
+        """
+        if checkpoint_interval is not None and checkpoint_interval < 1:
+            raise ValueError(
+                f'Invalid checkpoint interval: { checkpoint_interval }')
+
+        self.path = path
+        stored_interval, self.snapshots = self._load_manifest()
+
+        if stored_interval is None:
+            self.checkpoint_interval = (
+                checkpoint_interval or DEFAULT_CHECKPOINT_INTERVAL)
+
+        elif checkpoint_interval in (None, stored_interval):
+            self.checkpoint_interval = stored_interval
+
+        else:
+            raise HistoryError(
+                f'History { path } uses a checkpoint interval of '
+                f'{ stored_interval }, not { checkpoint_interval }')
+
+    def add(self, entries: Iterable[IndexEntry], label: str) -> Snapshot:
+        """Stores a new snapshot, as delta against the last one (and in \
+            full too, on checkpoints)
+
+        Args:
+            entries (Iterable[IndexEntry]): Entries sorted by name
+            label (str): Snapshot description
+
+        Returns:
+            Snapshot: Added snapshot
+        """
+        os.makedirs(self.path, exist_ok=True)
+
+        snapshot = Snapshot(
+            len(self.snapshots),
+            label,
+            datetime.now().isoformat(timespec='seconds'))
+        snapshot.full = snapshot.id % self.checkpoint_interval == 0
+
+        full_path = self._full_path(snapshot.id)
+
+        # Leftovers of an add interrupted before saving manifest
+        for stale in (full_path, self._delta_path(snapshot.id)):
+            for stale_path in (stale, bloom_path(stale)):
+                if os.path.exists(stale_path):
+                    os.remove(stale_path)
+
+        if snapshot.full:
+            full_writer = IndexWriter(
+                full_path,
+                FORMAT_TSV,
+                [f'Snapshot { snapshot.id }: { label }'])
+        else:
+            full_writer = nullcontext()
+
+        with full_writer:
+            def counted(entries):
+                for entry in entries:
+                    snapshot.files += 1
+                    if snapshot.full:
+                        full_writer.write(entry)
+                    yield entry
+
+            if snapshot.id == 0:
+                for _ in counted(entries):
+                    pass
+                snapshot.added = snapshot.files
+            else:
+                self._write_delta(
+                    snapshot,
+                    self.entries(snapshot.id - 1),
+                    counted(entries))
+
+        if snapshot.full:
+            _write_bloom(
+                full_path,
+                (entry.name for entry in read_entries(full_path)),
+                snapshot.files)
+
+        self.snapshots.append(snapshot)
+        self._save_manifest()
+
+        return snapshot
+
+    def entries(self, snapshot_id: int) -> Iterator[IndexEntry]:
+        """Rebuilds a snapshot by streaming its closest full checkpoint \
+            through all deltas after it
+
+        Raises:
+            HistoryError: If there is no such snapshot
+
+        Returns:
+            Iterator[IndexEntry]: Entries of snapshot, sorted by name
+        """
+        self._snapshot(snapshot_id)
+
+        base_id = snapshot_id
+        while not self.snapshots[base_id].full:
+            base_id -= 1
+
+        entries = read_entries(self._full_path(base_id))
+        for delta_id in range(base_id + 1, snapshot_id + 1):
+            entries = _apply_delta(entries, self._read_delta(delta_id))
+
+        return entries
+
+    def file_log(self, name: str) -> Iterator[FileEvent]:
+        """Changes of a single file across all snapshots, oldest first. \
+            Only files whose bloom filter may contain name are read.
+
+        Args:
+            name (str): File name, as listed in indexes
+
+        Returns:
+            Iterator[FileEvent]: Additions, changes and removals of file
+        """
+        if not self.snapshots:
+            return
+
+        # Entry of file in last read snapshot, None while not present
+        current = None
+        first = self.snapshots[0]
+        if _may_contain(self._full_path(first.id), name):
+            for entry in read_entries(self._full_path(first.id)):
+                if entry.name >= name:
+                    if entry.name == name:
+                        current = entry
+                        yield FileEvent(first, STATUS_ADDED, entry)
+                    break
+
+        for snapshot in self.snapshots[1:]:
+            delta_path = self._delta_path(snapshot.id)
+            if not _may_contain(delta_path, name):
+                continue
+
+            for op, entry in self._read_delta(snapshot.id):
+                if entry.name < name:
+                    continue
+
+                if entry.name == name:
+                    if op == DELTA_REMOVE:
+                        status = STATUS_REMOVED
+                    elif current is None:
+                        status = STATUS_ADDED
+                    elif is_modified(current, entry):
+                        status = STATUS_CHANGED
+                    else:
+                        # Only metadata changed (e.g. mtime or inode)
+                        status = None
+
+                    current = entry if op == DELTA_SET else None
+                    if status:
+                        yield FileEvent(snapshot, status, entry)
+                break
+
+    def _write_delta(
+        self,
+        snapshot: Snapshot,
+        prev: Iterable[IndexEntry],
+        entries: Iterable[IndexEntry]
+    ) -> None:
+        """Writes changes between given entries. Any difference in stored \
+            fields (e.g. mtime or inode of a file with same content) gets \
+            a line, so rebuilt snapshots match stored indexes exactly,   \
+            while only content changes are counted as changed files.
+        """
+        delta_path = self._delta_path(snapshot.id)
+        lines = 0
+        with open_file(delta_path, 'x') as delta_file:
+            for change in diff_entries(prev, entries, modified=operator.ne):
+                lines += 1
+                if change.status == STATUS_REMOVED:
+                    snapshot.removed += 1
+                    line = format_tsv_line(IndexEntry(change.name))
+                    delta_file.write(f'{ DELTA_REMOVE }\t{ line }\n')
+                else:
+                    if change.status == STATUS_ADDED:
+                        snapshot.added += 1
+                    elif is_modified(change.old, change.new):
+                        snapshot.changed += 1
+                    line = format_tsv_line(change.new)
+                    delta_file.write(f'{ DELTA_SET }\t{ line }\n')
+
+        _write_bloom(
+            delta_path,
+            (entry.name for _, entry in _read_delta_file(delta_path)),
+            lines)
+
+    def _read_delta(self, snapshot_id: int) -> Iterator[Tuple[str, IndexEntry]]:
+        return _read_delta_file(self._delta_path(snapshot_id))
+
+    def _snapshot(self, snapshot_id: int) -> Snapshot:
+        if not 0 <= snapshot_id < len(self.snapshots):
+            raise HistoryError(
+                f'No snapshot { snapshot_id } in history: { self.path }')
+
+        return self.snapshots[snapshot_id]
+
+    def _full_path(self, snapshot_id: int) -> str:
+        return os.path.join(
+            self.path,
+            _FULL_FNAME.format(str(snapshot_id).zfill(_ID_DIGITS)))
+
+    def _delta_path(self, snapshot_id: int) -> str:
+        return os.path.join(
+            self.path,
+            _DELTA_FNAME.format(str(snapshot_id).zfill(_ID_DIGITS)))
+
+    def _load_manifest(self) -> Tuple[int, List[Snapshot]]:
+        """
+        Returns:
+            Tuple[int, List[Snapshot]]: Checkpoint interval (None for new \
+                stores) and snapshots
+        """
+        manifest = os.path.join(self.path, HISTORY_MANIFEST)
+        if not os.path.exists(manifest):
+            return None, []
+
+        with open(manifest) as manifest_file:
+            content = json.load(manifest_file)
+
+        return (
+            content.get('checkpoint_interval', DEFAULT_CHECKPOINT_INTERVAL),
+            [Snapshot(**snapshot) for snapshot in content['snapshots']])
+
+    def _save_manifest(self) -> None:
+        """Manifest is replaced atomically, so an interrupted add leaves \
+            history as it was before it
+        """
+        manifest = os.path.join(self.path, HISTORY_MANIFEST)
+        tmp_path = f'{ manifest }.tmp'
+        with open(tmp_path, 'w') as manifest_file:
+            json.dump(
+                {
+                    'checkpoint_interval': self.checkpoint_interval,
+                    'snapshots': [asdict(s) for s in self.snapshots]
+                },
+                manifest_file,
+                indent=1)
+            manifest_file.flush()
+            os.fsync(manifest_file.fileno())
+
+        os.replace(tmp_path, manifest)
+
+
+def _read_delta_file(path: str) -> Iterator[Tuple[str, IndexEntry]]:
+    with open_file(path) as delta_file:
+        for line in delta_file:
+            op, _, tsv_line = line.rstrip('\n').partition('\t')
+            if op not in (DELTA_SET, DELTA_REMOVE):
+                raise IndexFormatError(f'Invalid delta line in { path }')
+
+            yield op, parse_tsv_line(tsv_line)
+
+
+def _apply_delta(
+    entries: Iterable[IndexEntry],
+    ops: Iterable[Tuple[str, IndexEntry]]
+) -> Iterator[IndexEntry]:
+    """Merge-joins sorted entries with sorted delta operations"""
+    ops = iter(ops)
+    op = next(ops, None)
+
+    for entry in entries:
+        while op is not None and op[1].name < entry.name:
+            if op[0] == DELTA_SET:
+                yield op[1]
+            op = next(ops, None)
+
+        if op is not None and op[1].name == entry.name:
+            if op[0] == DELTA_SET:
+                yield op[1]
+            op = next(ops, None)
+        else:
+            yield entry
+
+    while op is not None:
+        if op[0] == DELTA_SET:
+            yield op[1]
+        op = next(ops, None)
+
+
+def _write_bloom(path: str, names: Iterable[str], count: int) -> None:
+    bloom = BloomFilter(count, _BLOOM_FP_RATE)
+    for name in names:
+        bloom.add(name)
+
+    bloom.save(bloom_path(path), os.path.getsize(path))
+
+
+def _may_contain(path: str, name: str) -> bool:
+    bloom = load_sidecar(path)
+    return bloom is None or name in bloom
@@ -0,0 +1,431 @@
+"""Index file formats.
+
+Three formats are supported, readers auto-detect them from the first bytes
+of the file:
+
+    plain  Legacy format, one file name per line. Lines starting with '#' \
+           and empty lines are ignored.
+    tsv    Versioned text format, first line is TSV_MAGIC and each entry \
+           is a tab separated line: name, size, mtime_ns, inode, hash.
+    bin    Compact binary format starting with BIN_MAGIC, followed by a   \
+           header block and fixed size records (see _BIN_RECORD).
+
+Any of them can be compressed, compression is chosen by file extension
+(.gz, .xz or .bz2) and files are (de)compressed while streamed.
+"""
+import os
+import struct
+
+from dataclasses import dataclass
+from typing import Iterator, List
+
+from fu.utils.fileio import ENCODING, ENCODING_ERRORS, open_file
+
+
+FORMAT_PLAIN = 'plain'
+FORMAT_TSV = 'tsv'
+FORMAT_BIN = 'bin'
+FORMATS = (FORMAT_PLAIN, FORMAT_TSV, FORMAT_BIN)
+
+#: Default index file extension for each format
+FORMAT_EXTENSIONS = {
+    FORMAT_PLAIN: '.txt',
+    FORMAT_TSV: '.tsv',
+    FORMAT_BIN: '.fuidx'
+}
+
+TSV_MAGIC = '#fu-index v1 tsv'
+TSV_COLUMNS = ('name', 'size', 'mtime_ns', 'inode', 'hash')
+_TSV_HEADER = '\t'.join(TSV_COLUMNS)
+
+BIN_MAGIC = b'FUIDX\x00\x01\n'
+
+# name length, size, mtime_ns, inode, hash algorithm id, digest length.
+# Inode is unsigned (some network and FUSE filesystems use all 64 bits),
+# a missing one is stored as all ones, same bytes as -1 of other fields
+_BIN_RECORD = struct.Struct('<HqqQBB')
+_BIN_NO_INODE = 2 ** 64 - 1
+_BIN_HEADER_LEN = struct.Struct('<I')
+
+#: Hash algorithms that can be stored in binary indexes
+_HASH_ALGORITHM_IDS = {
+    'sha256': 1,
+    'blake2b': 2
+}
+_HASH_ALGORITHM_NAMES = {v: k for k, v in _HASH_ALGORITHM_IDS.items()}
+
+# Entries written to file in a single call
+_WRITE_BATCH_SIZE = 1024
+
+
+class IndexFormatError(Exception):
+    """Index file content doesn't match its format"""
+
+
+class IndexNotSortedError(IndexFormatError):
+    """Index entries are not in ascending order by name"""
+
+
+@dataclass
+class IndexEntry:
+    """A file listed in an index. Only name is available for entries \
+        read from plain indexes.
+
+    Args:
+        name (str): File path relative to indexed directory
+        size (int): File size in bytes
+        mtime_ns (int): Modification time in nanoseconds
+        inode (int): Inode number
+        hash (str): Content hash as '<algorithm>:<hex digest>'
+    """
+
+    name: str
+    size: int = None
+    mtime_ns: int = None
+    inode: int = None
+    hash: str = None
+
+    @classmethod
+    def from_stat(cls, name: str, st: os.stat_result) -> 'IndexEntry':
+        return cls(name, st.st_size, st.st_mtime_ns, st.st_ino)
+
+    def is_rich(self) -> bool:
+        return self.size is not None and self.mtime_ns is not None
+
+    def same_metadata(self, other: 'IndexEntry') -> bool:
+        """Test whether size, mtime and inode of both entries are known \
+            and equal. Meaning file most likely was not modified.
+        """
+        return self.is_rich() \
+            and self.size == other.size \
+            and self.mtime_ns == other.mtime_ns \
+            and self.inode == other.inode
+
+
+def detect_format(path: str) -> str:
+    """Detects format of given index file
+
+    Args:
+        path (str): Path to index file
+
+    Returns:
+        str: One of FORMATS
+    """
+    with open_file(path, 'rb') as idx_file:
+        head = idx_file.read(len(BIN_MAGIC))
+
+        if head == BIN_MAGIC:
+            return FORMAT_BIN
+
+        head += idx_file.read(len(TSV_MAGIC) - len(head))
+        if head == TSV_MAGIC.encode(ENCODING):
+            return FORMAT_TSV
+
+    return FORMAT_PLAIN
+
+
+def read_entries(path: str) -> Iterator[IndexEntry]:
+    """Iterates entries of given index file, in same order as they \
+        appear in file. Format is auto detected.
+
+    Args:
+        path (str): Path to index file
+
+    Returns:
+        Iterator[IndexEntry]: Index entries
+    """
+    fmt = detect_format(path)
+
+    if fmt == FORMAT_BIN:
+        with open_file(path, 'rb') as idx_file:
+            yield from _read_bin_entries(idx_file)
+        return
+
+    with open_file(path, 'r') as idx_file:
+        for line_number, line in enumerate(idx_file, start=1):
+            line = line.strip('\n')
+
+            # Ignore empty lines and comments
+            if not line or line.startswith('#'):
+                continue
+
+            if fmt == FORMAT_TSV:
+                yield parse_tsv_line(line, line_number)
+            else:
+                yield IndexEntry(line)
+
+
+def read_sorted_entries(path: str) -> Iterator[IndexEntry]:
+    """Same as read_entries, but verifies entries are sorted in strictly \
+        ascending order by name while iterating them, as required by     \
+        streaming merge operations.
+
+    Raises:
+        IndexNotSortedError: When an entry is not greater than previous one
+    """
+    prev_name = None
+    for entry in read_entries(path):
+        if prev_name is not None and entry.name <= prev_name:
+            raise IndexNotSortedError(
+                f'Index is not sorted, "{ entry.name }" found after '
+                f'"{ prev_name }" in { path }')
+
+        prev_name = entry.name
+        yield entry
+
+
+def read_names(path: str) -> Iterator[str]:
+    """Iterates file names in given index file. Format is auto detected.
+
+    Args:
+        path (str): Path to index file
+
+    Returns:
+        Iterator[str]: File names in index
+    """
+    for entry in read_entries(path):
+        yield entry.name
+
+
+class IndexWriter:
+    """Writes index entries into a new index file in given format.
+
+    Usage:
+        with IndexWriter(path, FORMAT_TSV, ['Index for /some/dir']) as w:
+            w.write(entry)
+    """
+
+    def __init__(self, path: str, fmt: str, comments: List[str] = None):
+        """
+        Args:
+            path (str): Index file to create
+            fmt (str): One of FORMATS
+            comments (List[str], optional): Header comment lines, \
+                without leading '#'
+        """
+        if fmt not in FORMATS:
+            raise ValueError(f'Invalid index format: { fmt }')
+
+        self.path = path
+        self.fmt = fmt
+        self.comments = comments or []
+        self._file = None
+        self._pending = []
+
+    def __enter__(self) -> 'IndexWriter':
+        if self.fmt == FORMAT_BIN:
+            self._file = open_file(self.path, 'xb')
+            header = '\n'.join(self.comments).encode(
+                ENCODING,
+                ENCODING_ERRORS)
+
+            self._file.write(BIN_MAGIC)
+            self._file.write(_BIN_HEADER_LEN.pack(len(header)))
+            self._file.write(header)
+
+        else:
+            self._file = open_file(self.path, 'x')
+            if self.fmt == FORMAT_TSV:
+                self._file.write(f'{ TSV_MAGIC }\n')
+
+            for comment in self.comments:
+                self._file.write(f'# { comment }\n')
+
+            if self.fmt == FORMAT_TSV:
+                self._file.write(f'# { _TSV_HEADER }\n')
+            self._file.write('\n')
+
+        return self
+
+    def __exit__(self, *exc) -> None:
+        try:
+            self._flush()
+        finally:
+            self._file.close()
+
+    def write(self, entry: IndexEntry) -> None:
+        """Queues given entry to be written. Entries are written in \
+            batches to reduce the number of write calls.
+        """
+        if self.fmt == FORMAT_PLAIN:
+            self._pending.append(f'{ entry.name }\n')
+        elif self.fmt == FORMAT_TSV:
+            self._pending.append(f'{ format_tsv_line(entry) }\n')
+        else:
+            self._pending.append(_pack_bin_entry(entry))
+
+        if len(self._pending) >= _WRITE_BATCH_SIZE:
+            self._flush()
+
+    def _flush(self) -> None:
+        if not self._pending:
+            return
+
+        joiner = b'' if self.fmt == FORMAT_BIN else ''
+        self._file.write(joiner.join(self._pending))
+        self._pending = []
+
+
+def format_tsv_line(entry: IndexEntry) -> str:
+    """Serializes entry as a tsv index line (without line break)"""
+    return '\t'.join((
+        _escape(entry.name),
+        _tsv_field(entry.size),
+        _tsv_field(entry.mtime_ns),
+        _tsv_field(entry.inode),
+        entry.hash or ''
+    ))
+
+
+def parse_tsv_line(line: str, line_number: int = None) -> IndexEntry:
+    """Parses a tsv index line (without line break) into an entry
+
+    Args:
+        line (str): Index line
+        line_number (int, optional): Number of line in index file, only \
+            used in error messages. Defaults to None.
+
+    Raises:
+        IndexFormatError: If line doesn't have all columns or a numeric \
+            column has an invalid value
+    """
+    fields = line.split('\t')
+    if len(fields) != len(TSV_COLUMNS):
+        raise IndexFormatError(_invalid_tsv_line(line, line_number))
+
+    name, size, mtime_ns, inode, content_hash = fields
+    try:
+        return IndexEntry(
+            _unescape(name),
+            int(size) if size else None,
+            int(mtime_ns) if mtime_ns else None,
+            int(inode) if inode else None,
+            content_hash or None
+        )
+    except ValueError as e:
+        raise IndexFormatError(_invalid_tsv_line(line, line_number)) from e
+
+
+def _invalid_tsv_line(line: str, line_number: int = None) -> str:
+    if line_number is None:
+        return f'Invalid tsv index line: { line }'
+
+    return f'Invalid tsv index line { line_number }: { line }'
+
+
+def tsv_line_name(line: str) -> str:
+    """Retrieves entry name from a tsv index line, useful as sort key \
+        of tsv lines without parsing the whole line
+    """
+    return _unescape(line.split('\t', 1)[0])
+
+
+def _tsv_field(value: int) -> str:
+    return '' if value is None else str(value)
+
+
+def _escape(name: str) -> str:
+    if '\\' in name or '\t' in name or '\n' in name or '\r' in name:
+        name = name \
+            .replace('\\', '\\\\') \
+            .replace('\t', '\\t') \
+            .replace('\n', '\\n') \
+            .replace('\r', '\\r')
+
+    # Lines starting with '#' are comments
+    if name.startswith('#'):
+        name = f'\\{ name }'
+
+    return name
+
+
+def _unescape(name: str) -> str:
+    if '\\' not in name:
+        return name
+
+    chars = []
+    escapes = {'\\': '\\', 't': '\t', 'n': '\n', 'r': '\r'}
+    idx = 0
+    while idx < len(name):
+        char = name[idx]
+        if char == '\\' and idx + 1 < len(name):
+            idx += 1
+            char = escapes.get(name[idx], name[idx])
+        chars.append(char)
+        idx += 1
+
+    return ''.join(chars)
+
+
+def _pack_bin_entry(entry: IndexEntry) -> bytes:
+    name = entry.name.encode(ENCODING, ENCODING_ERRORS)
+    algorithm_id = 0
+    digest = b''
+
+    if entry.hash:
+        algorithm, hex_digest = entry.hash.split(':', 1)
+        if algorithm not in _HASH_ALGORITHM_IDS:
+            raise IndexFormatError(
+                f'Hash algorithm not supported in binary index: { algorithm }'
+            )
+
+        algorithm_id = _HASH_ALGORITHM_IDS[algorithm]
+        digest = bytes.fromhex(hex_digest)
+
+    return _BIN_RECORD.pack(
+        len(name),
+        _bin_field(entry.size),
+        _bin_field(entry.mtime_ns),
+        _BIN_NO_INODE if entry.inode is None else entry.inode,
+        algorithm_id,
+        len(digest)
+    ) + name + digest
+
+
+def _read_bin_entries(idx_file) -> Iterator[IndexEntry]:
+    idx_file.read(len(BIN_MAGIC))
+    header_len, = _BIN_HEADER_LEN.unpack(
+        _read_exactly(idx_file, _BIN_HEADER_LEN.size))
+    idx_file.read(header_len)
+
+    while True:
+        record = idx_file.read(_BIN_RECORD.size)
+        if not record:
+            break
+
+        if len(record) < _BIN_RECORD.size:
+            raise IndexFormatError('Truncated binary index record')
+
+        name_len, size, mtime_ns, inode, algorithm_id, digest_len = \
+            _BIN_RECORD.unpack(record)
+        name = _read_exactly(idx_file, name_len)
+        digest = _read_exactly(idx_file, digest_len)
+
+        content_hash = None
+        if algorithm_id:
+            algorithm = _HASH_ALGORITHM_NAMES.get(algorithm_id)
+            if not algorithm:
+                raise IndexFormatError(
+                    f'Unknown hash algorithm id: { algorithm_id }')
+            content_hash = f'{ algorithm }:{ digest.hex() }'
+
+        yield IndexEntry(
+            name.decode(ENCODING, ENCODING_ERRORS),
+            None if size < 0 else size,
+            None if mtime_ns < 0 else mtime_ns,
+            None if inode == _BIN_NO_INODE else inode,
+            content_hash
+        )
+
+
+def _bin_field(value: int) -> int:
+    return -1 if value is None else value
+
+
+def _read_exactly(idx_file, size: int) -> bytes:
+    data = idx_file.read(size)
+    if len(data) != size:
+        raise IndexFormatError('Truncated binary index file')
+
+    return data
+
@@ -1,71 +1,332 @@
+import itertools
 import os
+import stat
+import sys
+import time
+from dataclasses import replace
 from datetime import datetime
+from functools import partial
+from typing import Iterable, Iterator, List
+
+from fu.index.archive import (
+    ARCHIVE_EXTENSIONS,
+    ArchiveStats,
+    archive_entries,
+    is_archive_path,
+    manifest_path
+)
+from fu.index.bloom import BloomFilter, bloom_path
+from fu.index.catalog import DEFAULT_SEARCH_LIMIT, Catalog
+from fu.index.diff import (
+    STATUS_ADDED,
+    STATUS_CHANGED,
+    STATUS_REMOVED,
+    STATUS_MOVED,
+    STATUS_SYMBOLS,
+    collapse_moves,
+    diff_indexes,
+    match_moves
+)
+from fu.index.du import dir_usage, format_size, top_usage
+from fu.index.extsort import DEFAULT_MEM_BUDGET, ExternalSorter
+from fu.index.frontcoded import FrontCodedList
+from fu.index.hashing import (
+    DEFAULT_WORKERS,
+    HashAlgorithmError,
+    ParallelHasher,
+    hash_file,
+    validate_algorithm
+)
+from fu.index.idx_format import (
+    FORMAT_EXTENSIONS,
+    FORMAT_PLAIN,
+    FORMAT_TSV,
+    FORMATS,
+    IndexEntry,
+    IndexFormatError,
+    IndexWriter,
+    format_tsv_line,
+    parse_tsv_line,
+    read_entries,
+    read_names,
+    read_sorted_entries,
+    tsv_line_name
+)
+from fu.index.query import IndexMembership, IndexQuery, QueryFilter
+from fu.index.syscalls import SyscallCounter
+from fu.index.verify import (
+    CHECKPOINT_INTERVAL,
+    STATUS_CORRUPT,
+    STATUS_MISSING,
+    STATUS_MODIFIED,
+    STATUS_OK,
+    STATUS_SKIPPED,
+    STATUS_UNREADABLE,
+    VerifyCheckpoint,
+    checkpoint_path,
+    verify_entries
+)
+from fu.utils.concurrency import bounded_map
 from fu.utils.console import console
+from fu.utils.fileio import open_file
+from fu.utils.ratelimit import TokenBucket
 from fu.utils.path import (
-    get_file_name,
     is_dir,
     is_file,
-    path_files
+    scan_files
 )
+from fu.utils.walk import walk_files
+
+
+DEFAULT_RM_WORKERS = 8
 
+# Status of each file processed by remove_indexed
+_RM_REMOVED = 'removed'
+_RM_MISSING = 'missing'
+_RM_FAILED = 'failed'
 
-def index_dir(path: str, output: str = None) -> None:
+
+def index_dir(
+    path: str,
+    output: str = None,
+    recursive: bool = False,
+    mem_budget: int = DEFAULT_MEM_BUDGET,
+    fmt: str = None,
+    hash_algorithm: str = None,
+    workers: int = DEFAULT_WORKERS,
+    per_device: int = None,
+    update: str = None,
+    catalog: bool = False,
+    bloom_fp_rate: float = None,
+    walk_workers: int = 1
+) -> None:
     """Creates a text file listing all files at given path in     \
         ascending order. Only direct children files are included \
-        in index file.
+        in index file unless recursive is requested.
+
+        File names are sorted with an external merge sort, so     \
+        memory usage stays bounded by mem_budget no matter how    \
+        many files are found.
 
     Args:
         path (str): Path to index
         output (str, optional): Name for generated index file. \
-            Defaults to "idx-<date>-<time>-<microseconds>.txt".
+            Defaults to "idx-<date>-<time>-<microseconds>.<ext>" where \
+            extension depends on format.
+        recursive (bool, optional): If true, files in nested directories \
+            are indexed as well, using its path relative to given path.  \
+            Defaults to False.
+        mem_budget (int, optional): Approx. max bytes of file names kept \
+            in memory while sorting. Defaults to DEFAULT_MEM_BUDGET.
+        fmt (str, optional): Index file format, 'plain' lists only file \
+            names, 'tsv' and 'bin' include size, mtime and inode of each \
+            file. Defaults to 'tsv' if hashes are requested, otherwise   \
+            'plain'.
+        hash_algorithm (str, optional): If given, content hash of each  \
+            file is computed and included in index. Defaults to None.
+        workers (int, optional): Max files hashed at a time. \
+            Defaults to DEFAULT_WORKERS.
+        per_device (int, optional): Max files hashed at a time from the \
+            same device. Defaults to None (no limit).
+        update (str, optional): Previous rich index of same path. Hashes \
+            of files whose inode, size and mtime didn't change are copied \
+            from it, so only new or modified files are hashed. Hash       \
+            algorithm defaults to the one used in previous index.
+        catalog (bool, optional): Also store indexed files in catalog, \
+            replacing any previous content of path. Defaults to False.
+        bloom_fp_rate (float, optional): If given, a bloom filter of \
+            indexed names with this false positive rate is written    \
+            next to index file. Defaults to None.
+        walk_workers (int, optional): Directories listed in parallel, \
+            worth raising on network mounts. Defaults to 1.
     """
-    console.print(
-        f'Scanning contents of: { path } ...',
-        style='info')
+    if update:
+        if not is_file(update):
+            console.print(
+                f'Invalid index file: { update }',
+                style='error')
+            return
+
+        if not hash_algorithm:
+            hash_algorithm = _hash_algorithm_of(update)
 
-    fnames = []
-    for filepath in path_files(path):
-        fname = get_file_name(filepath)
-        fnames.append(fname)
-    fnames.sort()
+        if not hash_algorithm:
+            console.print(
+                f'Previous index has no hashes to reuse: { update }',
+                style='error')
+            return
 
-    if len(fnames) == 0:
+    if not fmt:
+        fmt = FORMAT_TSV if hash_algorithm else FORMAT_PLAIN
+
+    if fmt not in FORMATS:
         console.print(
-            'No files found in specified path',
-            style='warning')
+            f'Invalid index format: { fmt }',
+            style='error')
         return
 
-    # Write found file names to index file
-    if not output:
-        now = datetime.now()
-        output_fname = f'idx-{ now.strftime("%Y%m%d-%H%M%S-%f") }.txt'
-        output = os.path.join(path, output_fname)
+    if hash_algorithm:
+        if fmt == FORMAT_PLAIN:
+            console.print(
+                'Hashes can only be stored in "tsv" or "bin" indexes',
+                style='error')
+            return
 
-    if os.path.exists(output):
+        try:
+            hasher = ParallelHasher(hash_algorithm, workers, per_device)
+        except HashAlgorithmError as e:
+            console.print(str(e), style='error')
+            return
+
+    if not is_dir(path):
         console.print(
-            f'A file with same name already exists: { output }',
-            style='error'
-        )
+            f'Invalid path: { path }',
+            style='error')
         return
 
-    with open(output, 'a') as idx_file:
-        idx_file.write(f'# Index for { path } { os.linesep }')
-        idx_file.write(f'# { len(fnames) } file(s) indexed: { os.linesep }')
-        idx_file.write(os.linesep)
-        for fname in fnames:
-            idx_file.write(f'{ fname }{ os.linesep }')
+    console.print(
+        f'Scanning contents of: { path } ...',
+        style='info')
+
+    # Rich entries are sorted as tsv lines
+    rich = fmt != FORMAT_PLAIN
+    sort_key = tsv_line_name if rich else None
+
+    with ExternalSorter(mem_budget, sort_key) as sorter:
+        root_prefix = os.path.join(path, '')
+        for entry in walk_files(path, recursive, walk_workers, stat=rich):
+            fname = entry.path[len(root_prefix):]
+
+            if rich:
+                try:
+                    idx_entry = IndexEntry.from_stat(fname, entry.stat())
+                except FileNotFoundError:
+                    continue
+                sorter.add(format_tsv_line(idx_entry))
+            else:
+                sorter.add(fname)
+
+        if len(sorter) == 0:
+            console.print(
+                'No files found in specified path',
+                style='warning')
+            return
+
+        # Write found files to index file
+        if not output:
+            now = datetime.now()
+            output_fname = (
+                f'idx-{ now.strftime("%Y%m%d-%H%M%S-%f") }'
+                f'{ FORMAT_EXTENSIONS[fmt] }'
+            )
+            output = os.path.join(path, output_fname)
+
+        if os.path.exists(output):
+            console.print(
+                f'A file with same name already exists: { output }',
+                style='error'
+            )
+            return
+
+        bloom_filter = None
+        if bloom_fp_rate is not None:
+            if os.path.exists(bloom_path(output)):
+                console.print(
+                    'A file with same name already exists: '
+                    f'{ bloom_path(output) }',
+                    style='error'
+                )
+                return
+
+            try:
+                bloom_filter = BloomFilter(len(sorter), bloom_fp_rate)
+            except ValueError as e:
+                console.print(str(e), style='error')
+                return
+
+        comments = [
+            f'Index for { path }',
+            f'{ len(sorter) } file(s) indexed:'
+        ]
+        if rich:
+            entries = (parse_tsv_line(line) for line in sorter.sorted())
+        else:
+            entries = (IndexEntry(line) for line in sorter.sorted())
+
+        reused = [0]
+        if update:
+            entries = _reuse_hashes(
+                entries,
+                read_sorted_entries(update),
+                hash_algorithm,
+                reused)
+
+        if hash_algorithm:
+            console.print(
+                f'Hashing files with { hash_algorithm } ...',
+                style='info')
+            entries = hasher.hash_entries(entries, path)
+
+        with IndexWriter(output, fmt, comments) as idx_writer:
+            for idx_entry in entries:
+                idx_writer.write(idx_entry)
+                if bloom_filter is not None:
+                    bloom_filter.add(idx_entry.name)
+
+        if bloom_filter is not None:
+            bloom_filter.save(bloom_path(output), os.path.getsize(output))
+
+        if update:
+            console.print(
+                f'{ reused[0] } unchanged file hash(es) reused from { update }',
+                style='info')
+
+        if hash_algorithm:
+            console.print(hasher.stats.summary(), style='info')
+            if hasher.stats.errors:
+                console.print(
+                    f'{ hasher.stats.errors } file(s) could not be read',
+                    style='warning')
 
         console.print(f'Index saved at { output }', style='info')
+        if bloom_filter is not None:
+            console.print(
+                f'Bloom filter ({ bloom_filter.nbytes } bytes) saved at '
+                f'{ bloom_path(output) }',
+                style='info')
+
+    if catalog:
+        with Catalog() as files_catalog:
+            cataloged = files_catalog.replace_root(path, read_entries(output))
+
+        console.print(
+            f'{ cataloged } file(s) cataloged at { files_catalog.db_path }',
+            style='info')
+
 
-def index_deleted_from(path: str, idx: str, output: str = None) -> None:
+def index_deleted_from(
+    path: str,
+    idx: str,
+    output: str = None,
+    detect_moves: bool = False
+) -> None:
     """Creates a text file listing all files that are present in a given \
         index but doesn't exists in specified path anymore.
 
+        Path is listed once and sorted, and index names are merge-joined \
+        with such listing in a single pass, instead of verifying          \
+        existence of each file. Only nested names (from recursive         \
+        indexes) are verified one by one.
+
     Args:
         path (str): Where to look for files in index
         idx (str): Index of files to verify in specified path
         output (str, optional): Name for generated index file of not found \
             items. Defaults to "idx-removed-<date>-<time>-<microseconds>.txt".
+        detect_moves (bool, optional): Find removed files that are still \
+            in path under another name (same inode and size), and list   \
+            them as moves instead of removed files. Requires a rich      \
+            index. Defaults to False.
     """
     if not is_file(idx):
         console.print(
@@ -85,69 +346,132 @@ def index_deleted_from(path: str, idx: str, output: str = None) -> None:
         f'Scanning for removed files in: { path } ...',
         style='info')
 
-    removed_fnames = []
-    with open(idx, 'r') as idx_file:
-        for idx_line in idx_file:
-            idx_line = idx_line.strip("\n")
+    syscalls = SyscallCounter()
+    listed_fnames = None
+    nested_names = False
+    rich_index = False
+    removed_entries = []
 
-            # Ignore empty lines and comments
-            if idx_line and not idx_line.startswith('#'):
-                indexed_file = os.path.join(path, idx_line)
+    # Removed names are kept front coded by sorter, so memory stays
+    # bounded even if most files of a huge index are gone
+    with ExternalSorter() as removed_fnames:
+        for entry in read_entries(idx):
+            fname = entry.name
+            rich_index = rich_index or entry.is_rich()
 
-                # If file was removed from path
-                if not os.path.exists(indexed_file):
-                    removed_fnames.append(idx_line)
-    removed_fnames.sort()
+            # Nested paths (recursive indexes) are verified one by one
+            if _is_nested(fname):
+                nested_names = True
+                syscalls.add('stat')
+                removed = not os.path.exists(os.path.join(path, fname))
 
-    if len(removed_fnames) == 0:
-        console.print(
-            'No indexed files has been removed',
-            style='warning')
-        return
+            # Direct children are verified against a single listing of path
+            else:
+                if listed_fnames is None:
+                    listed_fnames = _MergedLookup(
+                        _list_dir_names(path, syscalls))
+                removed = fname not in listed_fnames
 
-    # Create index of removed files
+            if removed:
+                removed_fnames.add(fname)
+                if detect_moves and entry.inode is not None:
+                    removed_entries.append(entry)
 
-    if not output:
-        now = datetime.now()
-        output_fname = f'idx-removed-{ now.strftime("%Y%m%d-%H%M%S-%f") }.txt'
-        output = os.path.join(path, output_fname)
+        moves = []
+        if detect_moves and not rich_index:
+            console.print(
+                'Index has no inode and size of files, moves can\'t be '
+                'detected',
+                style='warning')
+        elif removed_entries:
+            moves = sorted(
+                match_moves(
+                    removed_entries,
+                    _inode_matches(path, removed_entries, nested_names),
+                    partial(_hash_or_none, root=path)),
+                key=lambda move: move[0].name)
+        del removed_entries
 
-    if os.path.exists(output):
-        console.print(
-            f'A file with same name already exists: { output }',
-            style='error'
-        )
-        return
+        moved_fnames = {old.name for old, _ in moves}
+        removed_count = len(removed_fnames) - len(moved_fnames)
 
-    with open(output, 'a') as idx_rm_file:
-        idx_rm_file.write(
-            '# Index of removed files from: '
-            f'{ path }{ os.linesep }'
-        )
-        idx_rm_file.write(f'# Based on index: { idx }{ os.linesep }')
-        idx_rm_file.write(
-            f'# { len(removed_fnames) } file(s) has been '
-            f'removed:{ os.linesep }'
-        )
-        idx_rm_file.write(os.linesep)
+        console.print(syscalls.summary(), style='info')
 
-        for fname in removed_fnames:
-            idx_rm_file.write(f'{ fname }{ os.linesep }')
+        if removed_count == 0 and not moves:
+            console.print(
+                'No indexed files has been removed',
+                style='warning')
+            return
 
+        # Create index of removed files
+
+        if not output:
+            now = datetime.now()
+            output_fname = (
+                f'idx-removed-{ now.strftime("%Y%m%d-%H%M%S-%f") }.txt'
+            )
+            output = os.path.join(path, output_fname)
+
+        if os.path.exists(output):
+            console.print(
+                f'A file with same name already exists: { output }',
+                style='error'
+            )
+            return
+
+        # Moves are written as comments, so that tools reading the index
+        # (e.g. rm-indexed) only see the files that were actually removed
+        comments = [
+            f'Index of removed files from: { path }',
+            f'Based on index: { idx }'
+        ]
+        if moves:
+            comments.append(
+                f'{ len(moves) } file(s) has been moved '
+                '(moved<TAB>old name<TAB>new name):')
+            comments.extend(
+                f'moved\t{ old.name }\t{ new.name }' for old, new in moves)
+        comments.append(f'{ removed_count } file(s) has been removed:')
+
+        with IndexWriter(output, FORMAT_PLAIN, comments) as idx_writer:
+            for fname in removed_fnames.sorted():
+                if fname not in moved_fnames:
+                    idx_writer.write(IndexEntry(fname))
+
+    if moves:
         console.print(
-            f'Index of removed files saved at { output }',
+            f'{ len(moves) } moved and { removed_count } removed file(s) found',
             style='info')
+    console.print(
+        f'Index of removed files saved at { output }',
+        style='info')
 
 
-def remove_indexed(idx: str, path: str, verbose: bool = False) -> None:
+def remove_indexed(
+    idx: str,
+    path: str,
+    verbose: bool = False,
+    dry_run: bool = False,
+    workers: int = DEFAULT_RM_WORKERS
+) -> None:
     """Permanently removes all files listed in a given index
 
+        Path is opened once and files are unlinked relative to it  \
+        (no full path resolution per file) from a bounded pool of  \
+        threads. Files are not verified before removal, missing    \
+        files are just reported as skipped.
+
     Args:
         idx (str): Index of files to remove from path, each line is    \
             considered a different file, empty lines or lines starting \
             with '#' are ignored.
         path (str): Path containing files to delete
         verbose (bool): If true, will log each deleted/skipped file
+        dry_run (bool, optional): If true, nothing is removed, only \
+            counts of files that would be removed are reported.     \
+            Defaults to False.
+        workers (int, optional): Number of files removed in parallel. \
+            Defaults to DEFAULT_RM_WORKERS.
     """
     if not is_file(idx):
         console.print(
@@ -161,30 +485,725 @@ def remove_indexed(idx: str, path: str, verbose: bool = False) -> None:
             style='error')
         return
 
-    with open(idx, 'r') as idx_file:
-        deletes_count = 0
+    dir_fd = None
+    if os.unlink in os.supports_dir_fd:
+        dir_fd = os.open(path, os.O_RDONLY | getattr(os, 'O_DIRECTORY', 0))
+
+    try:
+        remove_fn = partial(
+            _remove_file,
+            path=path,
+            dir_fd=dir_fd,
+            dry_run=dry_run)
+
+        counts = {_RM_REMOVED: 0, _RM_MISSING: 0, _RM_FAILED: 0}
+        for fname, status, error in bounded_map(
+                remove_fn,
+                read_names(idx),
+                workers):
+            counts[status] += 1
+            indexed_file = os.path.join(path, fname)
+
+            if status == _RM_FAILED:
+                console.print(
+                    f'Could not remove { indexed_file }: { error }',
+                    style='error')
+
+            elif verbose and status == _RM_REMOVED:
+                console.print(
+                    f'{ "Would remove" if dry_run else "Removing" }: '
+                    f'{ indexed_file }',
+                    style='info')
+
+            elif verbose and status == _RM_MISSING:
+                console.print(
+                    f'Skipping missing file: { indexed_file }',
+                    style='warning')
+    finally:
+        if dir_fd is not None:
+            os.close(dir_fd)
+
+    if dry_run:
+        console.print(
+            f'{ counts[_RM_REMOVED] } files would be removed, '
+            f'{ counts[_RM_MISSING] } missing files would be skipped',
+            style='info')
+    else:
+        console.print(
+            f'{ counts[_RM_REMOVED] } files were removed, '
+            f'{ counts[_RM_MISSING] } missing files skipped',
+            style='info')
+
+    if counts[_RM_FAILED]:
+        console.print(
+            f'{ counts[_RM_FAILED] } files could not be removed',
+            style='error')
+
+
+def index_diff(
+    idx_paths: List[str],
+    output: str = None,
+    detect_moves: bool = False
+) -> None:
+    """Creates a text file listing files added, removed or changed \
+        between given indexes. All indexes are merge-joined in a     \
+        single streaming pass, so they're never loaded in memory.
+
+        Each line of generated file has 3 tab separated columns:     \
+        status ('+' added, '-' removed, '~' changed), number of the  \
+        index where change was observed (as given in idx_paths,      \
+        starting at 1) and file name. Moved files ('>') have a 4th   \
+        column, lines are: status, index number, old name, new name.
+
+    Args:
+        idx_paths (List[str]): Two or more sorted index files, oldest first
+        output (str, optional): Name for generated diff file. Defaults to \
+            "idx-diff-<date>-<time>-<microseconds>.txt" next to last index.
+        detect_moves (bool, optional): List files removed and added with \
+            same inode and size (and hash, if known) as moves. Changes    \
+            are then held in memory to be matched. Defaults to False.
+    """
+    if len(idx_paths) < 2:
+        console.print(
+            'At least two indexes are required',
+            style='error')
+        return
+
+    for idx in idx_paths:
+        if not is_file(idx):
+            console.print(
+                f'Invalid index file: { idx }',
+                style='error')
+            return
+
+    if not output:
+        now = datetime.now()
+        output_fname = f'idx-diff-{ now.strftime("%Y%m%d-%H%M%S-%f") }.txt'
+        output = os.path.join(os.path.dirname(idx_paths[-1]), output_fname)
+
+    if os.path.exists(output):
+        console.print(
+            f'A file with same name already exists: { output }',
+            style='error'
+        )
+        return
+
+    counts = {status: 0 for status in STATUS_SYMBOLS}
+    try:
+        with open_file(output, 'x') as diff_file:
+            diff_file.write('# Diff of indexes:\n')
+            for idx_number, idx in enumerate(idx_paths, start=1):
+                diff_file.write(f'#  { idx_number }: { idx }\n')
+            diff_file.write('# Columns: status (+ added, - removed, ~ changed)'
+                            ', index number, file name\n')
+            if detect_moves:
+                diff_file.write('# Moves: >, index number, old name, '
+                                'new name\n')
+            diff_file.write('\n')
+
+            changes = diff_indexes(idx_paths)
+            if detect_moves:
+                changes = collapse_moves(changes)
+
+            for change in changes:
+                counts[change.status] += 1
+                old_name = ''
+                if change.status == STATUS_MOVED:
+                    old_name = f'{ change.old.name }\t'
+
+                diff_file.write(
+                    f'{ STATUS_SYMBOLS[change.status] }\t'
+                    f'{ change.snapshot + 1 }\t'
+                    f'{ old_name }{ change.name }\n')
+
+    # Partial output is removed, so it isn't taken for a valid diff
+    except IndexFormatError as e:
+        _remove_partial_outputs(output)
+        console.print(str(e), style='error')
+        return
+    except OSError as e:
+        _remove_partial_outputs(output)
+        console.print(f'Diff could not be completed: { e }', style='error')
+        return
+
+    moved = f'{ counts[STATUS_MOVED] } moved, ' if detect_moves else ''
+    console.print(
+        f'{ counts[STATUS_ADDED] } added, '
+        f'{ counts[STATUS_REMOVED] } removed, '
+        f'{ moved }{ counts[STATUS_CHANGED] } changed file(s)',
+        style='info')
+    console.print(f'Index diff saved at { output }', style='info')
+
+
+def verify_index(
+    idx: str,
+    path: str,
+    output: str = None,
+    workers: int = DEFAULT_WORKERS,
+    per_device: int = None,
+    max_rate: float = None,
+    checkpoint: str = None,
+    restart: bool = False
+) -> None:
+    """Re-reads all files of a hashed index and verifies its content \
+        still matches stored hashes. Files whose content changed but    \
+        size and mtime didn't (silent corruption), as well as missing,  \
+        modified and unreadable files are listed in a report file.
+
+        Reads can be limited to a global rate and a max number of files \
+        per device, and verified files are dropped from page cache, so  \
+        verification can run alongside other workloads. Progress is     \
+        checkpointed periodically (and when interrupted), running it    \
+        again resumes after last verified file.
+
+    Args:
+        idx (str): Sorted index with hashes
+        path (str): Indexed directory
+        output (str, optional): Report file. Defaults to \
+            "idx-verify-<date>-<time>-<microseconds>.txt" next to index.
+        workers (int, optional): Max files verified at a time. \
+            Defaults to DEFAULT_WORKERS.
+        per_device (int, optional): Max files read at a time from the \
+            same device. Defaults to None (no limit).
+        max_rate (float, optional): Max bytes read per second, across \
+            all workers. Defaults to None (no limit).
+        checkpoint (str, optional): Progress checkpoint file. Defaults \
+            to "<index>.verify-checkpoint".
+        restart (bool, optional): Ignore existing checkpoint and verify \
+            from the beginning. Defaults to False.
+    """
+    if not is_file(idx):
+        console.print(f'Invalid index file: { idx }', style='error')
+        return
 
-        for idx_line in idx_file:
-            idx_line = idx_line.strip("\n")
+    if not is_dir(path):
+        console.print(f'Invalid path: { path }', style='error')
+        return
 
-            # Ignore empty lines and comments
-            if idx_line and not idx_line.startswith('#'):
-                indexed_file = os.path.join(path, idx_line)
+    hash_algorithm = _hash_algorithm_of(idx)
+    if not hash_algorithm:
+        console.print(
+            f'Index has no hashes to verify: { idx }',
+            style='error')
+        return
 
-                # Verify file existence and remove
-                if is_file(indexed_file):
-                    if verbose:
-                        console.print(
-                            f'Removing: { indexed_file }',
-                            style='info')
-                    os.remove(indexed_file)
-                    deletes_count += 1
+    checkpoint = checkpoint or checkpoint_path(idx)
+    if os.path.exists(checkpoint) and not restart:
+        try:
+            progress = VerifyCheckpoint.load(checkpoint)
+        except (ValueError, TypeError) as e:
+            console.print(
+                f'Invalid checkpoint file: { checkpoint } ({ e })',
+                style='error')
+            return
 
-                elif verbose:
+        if progress.idx != os.path.abspath(idx):
+            console.print(
+                f'Checkpoint { checkpoint } belongs to another index: '
+                f'{ progress.idx }',
+                style='error')
+            return
+
+        # Discard report lines written after checkpoint was saved
+        if os.path.exists(progress.report):
+            os.truncate(progress.report, progress.report_size)
+
+        console.print(
+            f'Resuming verification after: { progress.last_name }',
+            style='info')
+
+    else:
+        if not output:
+            now = datetime.now()
+            output_fname = (
+                f'idx-verify-{ now.strftime("%Y%m%d-%H%M%S-%f") }.txt'
+            )
+            output = os.path.join(os.path.dirname(idx), output_fname)
+
+        if os.path.exists(output):
+            console.print(
+                f'A file with same name already exists: { output }',
+                style='error'
+            )
+            return
+
+        progress = VerifyCheckpoint(os.path.abspath(idx), output)
+
+    rate_limiter = TokenBucket(max_rate) if max_rate else None
+    hasher = ParallelHasher(
+        hash_algorithm,
+        workers,
+        per_device,
+        rate_limiter=rate_limiter,
+        drop_cache=True)
+
+    entries = read_sorted_entries(idx)
+    if progress.last_name is not None:
+        entries = itertools.dropwhile(
+            lambda entry: entry.name <= progress.last_name,
+            entries)
+
+    console.print(f'Verifying files in: { path } ...', style='info')
+    with open(progress.report, 'a') as report:
+        if report.tell() == 0:
+            report.write(f'# Verification of files in: { path }\n')
+            report.write(f'# Based on index: { idx }\n')
+            report.write('# Columns: status, file name\n\n')
+
+        last_saved = time.monotonic()
+        try:
+            for result in verify_entries(entries, path, hasher):
+                progress.counts[result.status] += 1
+                progress.last_name = result.entry.name
+                if result.status not in (STATUS_OK, STATUS_SKIPPED):
+                    report.write(f'{ result.status }\t{ result.entry.name }\n')
+
+                if time.monotonic() - last_saved >= CHECKPOINT_INTERVAL:
+                    _save_checkpoint(progress, report, checkpoint)
+                    last_saved = time.monotonic()
                     console.print(
-                        f'Skipping missing file: { indexed_file }',
-                        style='warning')
+                        f'{ sum(progress.counts.values()) } file(s) '
+                        f'verified, { hasher.stats.summary() }',
+                        style='info')
+
+        except KeyboardInterrupt:
+            _save_checkpoint(progress, report, checkpoint)
+            console.print(
+                f'Verification interrupted, progress saved at { checkpoint }',
+                style='warning')
+            return
+
+        except IndexFormatError as e:
+            _save_checkpoint(progress, report, checkpoint)
+            console.print(str(e), style='error')
+            return
+
+    if os.path.exists(checkpoint):
+        os.remove(checkpoint)
+
+    counts = progress.counts
+    console.print(
+        f'{ counts[STATUS_OK] } ok, { counts[STATUS_CORRUPT] } corrupt, '
+        f'{ counts[STATUS_MODIFIED] } modified, '
+        f'{ counts[STATUS_MISSING] } missing, '
+        f'{ counts[STATUS_UNREADABLE] } unreadable, '
+        f'{ counts[STATUS_SKIPPED] } skipped file(s)',
+        style='error' if counts[STATUS_CORRUPT] else 'info')
+    console.print(f'Verification report saved at { progress.report }',
+                  style='info')
+
+
+def index_query(
+    idx: str,
+    name: str = None,
+    query_filter: QueryFilter = None,
+    base: str = None,
+    output: str = None
+) -> int:
+    """Prints entries of a sorted index matching given name or filter, \
+        one path per line (paths file format, as used by 'iteratefrom').
+
+    Args:
+        idx (str): Sorted index file
+        name (str, optional): Exact file name to look up. \
+            Defaults to None (filter is used).
+        query_filter (QueryFilter, optional): Predicates entries must \
+            match. Defaults to None (all entries).
+        base (str, optional): Directory joined to printed names. \
+            Defaults to None (names are printed as in index).
+        output (str, optional): File to write paths into. \
+            Defaults to None (paths are written to stdout).
+
+    Returns:
+        int: Number of matching entries
+    """
+    if not is_file(idx):
+        console.print(f'Invalid index file: { idx }', style='error')
+        return 0
+
+    if output and os.path.exists(output):
+        console.print(
+            f'A file with same name already exists: { output }',
+            style='error'
+        )
+        return 0
+
+    matches = 0
+    out_file = open_file(output, 'x') if output else sys.stdout
+    try:
+        with IndexQuery(idx) as query:
+            if name is not None:
+                entry = query.lookup(name)
+                entries = [entry] if entry else []
+            else:
+                entries = query.find(query_filter or QueryFilter())
+
+            for entry in entries:
+                matches += 1
+                fname = os.path.join(base, entry.name) if base else entry.name
+                out_file.write(f'{ fname }\n')
+
+    except IndexFormatError as e:
+        console.print(str(e), style='error')
+    finally:
+        if output:
+            out_file.close()
 
+    if output:
         console.print(
-            f'{ deletes_count } files were removed',
+            f'{ matches } matching file(s) saved at { output }',
             style='info')
+
+    return matches
+
+
+def index_contains(
+    idx: str,
+    names: Iterable[str],
+    missing: bool = False
+) -> int:
+    """Prints which of given names are in a sorted index, one per line. \
+        Names are checked against the bloom filter sidecar of the index \
+        first (see 'index --bloom'), and only names passing it are      \
+        looked up in the index.
+
+    Args:
+        idx (str): Sorted index file
+        names (Iterable[str]): File names to look up
+        missing (bool, optional): Print names that are not in index \
+            instead. Defaults to False.
+
+    Returns:
+        int: Number of printed names
+    """
+    if not is_file(idx):
+        console.print(f'Invalid index file: { idx }', style='error')
+        return 0
+
+    printed = 0
+    try:
+        with IndexMembership(idx) as membership:
+            for name in names:
+                if (name in membership) != missing:
+                    printed += 1
+                    sys.stdout.write(f'{ name }\n')
+
+    except IndexFormatError as e:
+        console.print(str(e), style='error')
+
+    return printed
+
+
+def index_du(
+    idx: str,
+    max_depth: int = None,
+    top: int = None,
+    human: bool = False
+) -> int:
+    """Prints size and files count of every directory in a sorted rich \
+        index, like 'du' but computed from index in a single streaming  \
+        pass, without touching indexed files. Lines are                  \
+        '<size>\\t<files>\\t<dir>', children before parents.
+
+    Args:
+        idx (str): Sorted rich index file ('tsv' or 'bin')
+        max_depth (int, optional): Only print directories up to this \
+            nesting level, 0 prints indexed dir only. \
+            Defaults to None (all directories).
+        top (int, optional): Only print this many largest directories, \
+            largest first. Defaults to None (all directories).
+        human (bool, optional): Print sizes as 1.5G instead of bytes. \
+            Defaults to False.
+
+    Returns:
+        int: Number of printed directories
+    """
+    if not is_file(idx):
+        console.print(f'Invalid index file: { idx }', style='error')
+        return 0
+
+    printed = 0
+    try:
+        usages = dir_usage(read_sorted_entries(idx), max_depth)
+        if top is not None:
+            usages = top_usage(usages, top)
+
+        for usage in usages:
+            size = format_size(usage.size) if human else usage.size
+            sys.stdout.write(f'{ size }\t{ usage.files }\t{ usage.path }\n')
+            printed += 1
+
+    except (IndexFormatError, ValueError) as e:
+        console.print(str(e), style='error')
+
+    return printed
+
+
+def archive_indexed(
+    idx: str,
+    path: str,
+    output: str,
+    hash_algorithm: str = 'blake2b'
+) -> None:
+    """Streams files listed in an index into a tar archive, in index \
+        order, compressed according to output extension. A manifest   \
+        ('<output>.manifest.tsv', a tsv index) with size, mtime and     \
+        content hash of each archived file is written alongside, hashes \
+        are computed while files are copied into the archive.
+
+    Args:
+        idx (str): Index file listing files to archive
+        path (str): Directory index names are relative to
+        output (str): Archive to create, one of ARCHIVE_EXTENSIONS
+        hash_algorithm (str, optional): Manifest hashes algorithm. \
+            Defaults to 'blake2b'.
+    """
+    if not is_file(idx):
+        console.print(f'Invalid index file: { idx }', style='error')
+        return
+
+    if not is_dir(path):
+        console.print(f'Invalid path: { path }', style='error')
+        return
+
+    if not is_archive_path(output):
+        console.print(
+            f'Invalid archive name: { output }. Valid extensions are: '
+            f'{ ", ".join(ARCHIVE_EXTENSIONS) }',
+            style='error')
+        return
+
+    try:
+        validate_algorithm(hash_algorithm)
+    except HashAlgorithmError as e:
+        console.print(str(e), style='error')
+        return
+
+    manifest = manifest_path(output)
+    for out_path in (output, manifest):
+        if os.path.exists(out_path):
+            console.print(
+                f'A file with same name already exists: { out_path }',
+                style='error'
+            )
+            return
+
+    console.print(f'Archiving files of { idx } ...', style='info')
+    stats = ArchiveStats()
+    try:
+        with open_file(output, 'xb') as out_file, \
+                IndexWriter(
+                    manifest,
+                    FORMAT_TSV,
+                    [f'Manifest of { os.path.basename(output) }']
+                ) as manifest_writer:
+            for entry in archive_entries(
+                    read_entries(idx),
+                    path,
+                    out_file,
+                    hash_algorithm,
+                    stats):
+                manifest_writer.write(entry)
+
+    # Partial outputs are removed, so they aren't taken for valid ones
+    except IndexFormatError as e:
+        _remove_partial_outputs(output, manifest)
+        console.print(str(e), style='error')
+        return
+    except OSError as e:
+        _remove_partial_outputs(output, manifest)
+        console.print(f'Archive could not be completed: { e }', style='error')
+        return
+
+    megabytes = '{:.1f}'.format(stats.bytes / 1024 / 1024)
+    console.print(
+        f'{ stats.files } file(s) archived, { megabytes } MB',
+        style='info')
+    if stats.missing:
+        console.print(
+            f'{ stats.missing } file(s) could not be read and were skipped',
+            style='warning')
+    console.print(f'Archive saved at { output }', style='info')
+    console.print(f'Manifest saved at { manifest }', style='info')
+
+
+def search_catalog(term: str, limit: int = DEFAULT_SEARCH_LIMIT) -> int:
+    """Prints absolute path of cataloged files whose name contains \
+        given term (or matches it as a glob pattern), one per line.
+
+    Args:
+        term (str): Substring or glob pattern of file names
+        limit (int, optional): Max files printed. \
+            Defaults to DEFAULT_SEARCH_LIMIT.
+
+    Returns:
+        int: Number of found files
+    """
+    matches = 0
+    with Catalog() as files_catalog:
+        for match in files_catalog.search(term, limit):
+            matches += 1
+            sys.stdout.write(f'{ match.path }\n')
+
+    return matches
+
+
+def _remove_partial_outputs(*paths: str) -> None:
+    for path in paths:
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+
+def _remove_file(
+    fname: str,
+    path: str,
+    dir_fd: int,
+    dry_run: bool
+) -> tuple:
+    """Removes a single indexed file, relative to dir_fd when available
+
+    Returns:
+        tuple: (fname, status, error message)
+    """
+    target = fname if dir_fd is not None else os.path.join(path, fname)
+
+    try:
+        if dry_run:
+            st = os.stat(target, dir_fd=dir_fd, follow_symlinks=False)
+            if stat.S_ISDIR(st.st_mode):
+                return fname, _RM_MISSING, None
+        else:
+            os.unlink(target, dir_fd=dir_fd)
+
+    # Directories are never removed, they're skipped as missing files
+    except (FileNotFoundError, NotADirectoryError, IsADirectoryError):
+        return fname, _RM_MISSING, None
+    except OSError as e:
+        if not dry_run and os.path.isdir(os.path.join(path, fname)):
+            return fname, _RM_MISSING, None
+        return fname, _RM_FAILED, e.strerror
+
+    return fname, _RM_REMOVED, None
+
+
+def _reuse_hashes(
+    entries: Iterator[IndexEntry],
+    prev_entries: Iterator[IndexEntry],
+    hash_algorithm: str,
+    reused: List[int]
+) -> Iterator[IndexEntry]:
+    """Merge-joins sorted entries with sorted entries of a previous \
+        index, copying hash from previous entries whose metadata       \
+        didn't change. Count of reused hashes is stored in reused[0].
+    """
+    prev = next(prev_entries, None)
+
+    for entry in entries:
+        while prev is not None and prev.name < entry.name:
+            prev = next(prev_entries, None)
+
+        if prev is not None \
+                and prev.name == entry.name \
+                and prev.hash \
+                and prev.hash.startswith(f'{ hash_algorithm }:') \
+                and entry.same_metadata(prev):
+            entry = replace(entry, hash=prev.hash)
+            reused[0] += 1
+
+        yield entry
+
+
+def _hash_algorithm_of(idx: str) -> str:
+    """Hash algorithm used in given index, None if it has no hashes"""
+    for entry in read_entries(idx):
+        if entry.hash:
+            return entry.hash.split(':', 1)[0]
+
+    return None
+
+
+def _save_checkpoint(
+    progress: VerifyCheckpoint,
+    report,
+    checkpoint: str
+) -> None:
+    report.flush()
+    progress.report_size = report.tell()
+    progress.save(checkpoint)
+
+
+def _inode_matches(
+    path: str,
+    entries: List[IndexEntry],
+    recursive: bool
+) -> Iterator[IndexEntry]:
+    """Files in path with same inode as any of given entries. Inodes are \
+        known from directory listing, so only matching files are stat'ed.
+    """
+    inodes = {entry.inode for entry in entries}
+    root_prefix = os.path.join(path, '')
+
+    for dir_entry in scan_files(path, recursive):
+        if dir_entry.inode() not in inodes:
+            continue
+
+        try:
+            yield IndexEntry.from_stat(
+                dir_entry.path[len(root_prefix):],
+                dir_entry.stat())
+        except FileNotFoundError:
+            continue
+
+
+def _hash_or_none(entry: IndexEntry, algorithm: str, root: str) -> str:
+    try:
+        return hash_file(os.path.join(root, entry.name), algorithm)
+    except OSError:
+        return None
+
+
+def _is_nested(fname: str) -> bool:
+    return os.sep in fname or (os.altsep and os.altsep in fname)
+
+
+class _MergedLookup:
+    """Membership tests against a sorted list of names. Names looked up \
+        in ascending order (as listed in sorted indexes) are merge-joined \
+        with the list, advancing a single cursor over it. Names out of    \
+        order (e.g. legacy unsorted indexes) fall back to a binary search.
+    """
+
+    def __init__(self, names: FrontCodedList) -> None:
+        self._names = names
+        self._cursor = iter(names)
+        self._current = next(self._cursor, None)
+        self._last = None
+
+    def __contains__(self, name: str) -> bool:
+        if self._last is not None and name < self._last:
+            return name in self._names
+
+        self._last = name
+        while self._current is not None and self._current < name:
+            self._current = next(self._cursor, None)
+
+        return self._current == name
+
+
+def _list_dir_names(
+    path: str,
+    syscalls: SyscallCounter
+) -> FrontCodedList:
+    """Names of all entries (of any type) in given directory, retrieved \
+        with a single directory listing. Names are kept front coded, \
+        which takes a fraction of the memory of a set of strings.
+    """
+    syscalls.add('scandir')
+    with ExternalSorter() as sorter:
+        with os.scandir(path) as entries:
+            for entry in entries:
+                sorter.add(entry.name)
+
+        return FrontCodedList(sorter.sorted())
@@ -0,0 +1,331 @@
+"""Lookups over sorted index files.
+
+Uncompressed text indexes (plain and tsv) are memory-mapped and searched by
+bisecting byte offsets: each probe moves to the start of the line holding
+the middle offset, so only O(log n) lines are ever decoded and no line
+offsets table needs to be built. Other indexes (binary or compressed) are
+streamed, stopping as soon as entries go past the searched names.
+
+Indexes must be sorted by name, as written by 'fu index'.
+"""
+import fnmatch
+import mmap
+import re
+
+from dataclasses import dataclass
+from typing import Callable, Iterator
+
+from fu.index.bloom import BloomFilter, load_sidecar
+from fu.index.idx_format import (
+    ENCODING,
+    ENCODING_ERRORS,
+    FORMAT_BIN,
+    FORMAT_TSV,
+    IndexEntry,
+    detect_format,
+    parse_tsv_line,
+    read_entries,
+    tsv_line_name
+)
+from fu.utils.fileio import is_compressed
+
+
+# Characters with special meaning in glob patterns
+_GLOB_SPECIAL = '*?['
+
+
+@dataclass
+class QueryFilter:
+    """Predicates entries must match. All given predicates must match.
+
+    Args:
+        prefix (str): Name starts with
+        glob (str): Name matches shell style pattern (see fnmatch)
+        regex (str): Regular expression found in name
+        min_size (int): Min size in bytes (entries of unknown size don't match)
+        max_size (int): Max size in bytes (entries of unknown size don't match)
+    """
+
+    prefix: str = None
+    glob: str = None
+    regex: str = None
+    min_size: int = None
+    max_size: int = None
+
+    def search_prefix(self) -> str:
+        """Longest name prefix every matching entry must start with, used \
+            to narrow down the range of entries to scan
+        """
+        prefix = self.prefix or ''
+        if self.glob:
+            glob_prefix = _glob_literal_prefix(self.glob)
+            if glob_prefix.startswith(prefix):
+                prefix = glob_prefix
+            elif not prefix.startswith(glob_prefix):
+                # Prefixes are incompatible, no name can match both. A
+                # prefix of both is still returned to keep scan bounded
+                prefix = _common_prefix(prefix, glob_prefix)
+
+        return prefix
+
+    def matcher(self) -> Callable[[IndexEntry], bool]:
+        """Builds a function testing all predicates on a single entry"""
+        checks = []
+        if self.prefix:
+            checks.append(lambda e: e.name.startswith(self.prefix))
+        if self.glob:
+            glob_re = re.compile(fnmatch.translate(self.glob))
+            checks.append(lambda e: glob_re.match(e.name) is not None)
+        if self.regex:
+            name_re = re.compile(self.regex)
+            checks.append(lambda e: name_re.search(e.name) is not None)
+        if self.min_size is not None:
+            checks.append(
+                lambda e: e.size is not None and e.size >= self.min_size)
+        if self.max_size is not None:
+            checks.append(
+                lambda e: e.size is not None and e.size <= self.max_size)
+
+        return lambda entry: all(check(entry) for check in checks)
+
+
+class IndexQuery:
+    """Answers lookups over a sorted index file.
+
+    Usage:
+        with IndexQuery('idx.tsv') as query:
+            entry = query.lookup('some/file.jpg')
+            for entry in query.find(QueryFilter(glob='*.jpg')):
+                ...
+    """
+
+    def __init__(self, path: str) -> None:
+        """
+        Args:
+            path (str): Sorted index file, in any format
+        """
+        self.path = path
+        self.fmt = detect_format(path)
+
+        self._file = None
+        self._map: mmap.mmap = None
+        self._data_start = 0
+
+    def __enter__(self) -> 'IndexQuery':
+        if self.fmt != FORMAT_BIN and not is_compressed(self.path):
+            self._file = open(self.path, 'rb')
+            try:
+                self._map = mmap.mmap(
+                    self._file.fileno(),
+                    0,
+                    access=mmap.ACCESS_READ)
+            except ValueError:
+                # Empty files can't be mapped, they're just streamed
+                self._map = None
+            else:
+                self._data_start = self._skip_header()
+
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    @property
+    def is_mapped(self) -> bool:
+        """Whether lookups are answered by binary search"""
+        return self._map is not None
+
+    def close(self) -> None:
+        if self._map:
+            self._map.close()
+            self._map = None
+        if self._file:
+            self._file.close()
+            self._file = None
+
+    def lookup(self, name: str) -> IndexEntry:
+        """Finds entry with exactly given name
+
+        Args:
+            name (str): File name, relative to indexed directory
+
+        Returns:
+            IndexEntry: Found entry, or None if name is not in index
+        """
+        for entry in self._entries_from(name):
+            return entry if entry.name == name else None
+
+        return None
+
+    def prefixed(self, prefix: str) -> Iterator[IndexEntry]:
+        """Iterates entries whose name starts with given prefix, in order
+
+        Args:
+            prefix (str): Name prefix, e.g. a directory like 'photos/2020/'
+
+        Returns:
+            Iterator[IndexEntry]: Matching entries
+        """
+        for entry in self._entries_from(prefix):
+            if not entry.name.startswith(prefix):
+                break
+            yield entry
+
+    def find(self, query_filter: QueryFilter) -> Iterator[IndexEntry]:
+        """Iterates entries matching given filter, in order. Only entries \
+            sharing the longest literal prefix of the filter are scanned.
+
+        Args:
+            query_filter (QueryFilter): Predicates to match
+
+        Returns:
+            Iterator[IndexEntry]: Matching entries
+        """
+        matches = query_filter.matcher()
+        for entry in self.prefixed(query_filter.search_prefix()):
+            if matches(entry):
+                yield entry
+
+    def _entries_from(self, name: str) -> Iterator[IndexEntry]:
+        """Iterates entries starting from first one not less than name"""
+        if not self._map:
+            for entry in read_entries(self.path):
+                if entry.name >= name:
+                    yield entry
+            return
+
+        offset = self._lower_bound(name)
+        while offset < len(self._map):
+            line, offset = self._line_at(offset)
+            if line and not line.startswith('#'):
+                yield self._parse(line)
+
+    def _lower_bound(self, name: str) -> int:
+        """Offset of the first data line whose name is not less than given \
+            name. Both bounds are always at the start of a line.
+        """
+        low = self._data_start
+        high = len(self._map)
+
+        while low < high:
+            middle = (low + high) // 2
+            line_start = self._map.rfind(b'\n', low, middle) + 1 or low
+            line, next_start = self._line_at(line_start)
+
+            if self._line_name(line) < name:
+                low = next_start
+            else:
+                high = line_start
+
+        return low
+
+    def _line_at(self, offset: int) -> tuple:
+        """Decodes line starting at given offset
+
+        Returns:
+            tuple: (line without line break, offset of next line)
+        """
+        end = self._map.find(b'\n', offset)
+        if end < 0:
+            end = len(self._map)
+
+        line = self._map[offset:end].decode(ENCODING, ENCODING_ERRORS)
+        return line.rstrip('\r'), end + 1
+
+    def _line_name(self, line: str) -> str:
+        return tsv_line_name(line) if self.fmt == FORMAT_TSV else line
+
+    def _parse(self, line: str) -> IndexEntry:
+        return parse_tsv_line(line) if self.fmt == FORMAT_TSV \
+            else IndexEntry(line)
+
+    def _skip_header(self) -> int:
+        """Offset of first data line, after header comments and empty lines"""
+        offset = 0
+        while offset < len(self._map):
+            line, next_start = self._line_at(offset)
+            if line and not line.startswith('#'):
+                break
+            offset = next_start
+
+        return min(offset, len(self._map))
+
+
+@dataclass
+class MembershipStats:
+    """Counts of lookups answered by each stage of IndexMembership
+
+    Args:
+        checked (int): Names looked up
+        filtered (int): Names ruled out by bloom filter, without I/O
+        confirmed (int): Names found in index
+        false_positives (int): Names passing filter but not in index
+    """
+
+    checked: int = 0
+    filtered: int = 0
+    confirmed: int = 0
+    false_positives: int = 0
+
+
+class IndexMembership:
+    """Tests whether names are in a sorted index. Names are checked first \
+        against the bloom filter sidecar of the index (if there is one),  \
+        so most names not in index are answered in constant memory and    \
+        without I/O. Only names passing the filter are confirmed by a     \
+        lookup in the index itself.
+
+    Usage:
+        with IndexMembership('idx.tsv') as membership:
+            if 'some/file.jpg' in membership:
+                ...
+    """
+
+    def __init__(self, idx: str) -> None:
+        """
+        Args:
+            idx (str): Sorted index file
+        """
+        self.idx = idx
+        self.bloom: BloomFilter = load_sidecar(idx)
+        self.stats = MembershipStats()
+
+        self._query = IndexQuery(idx)
+
+    def __enter__(self) -> 'IndexMembership':
+        self._query.__enter__()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self._query.close()
+
+    def __contains__(self, name: str) -> bool:
+        self.stats.checked += 1
+
+        if self.bloom is not None and name not in self.bloom:
+            self.stats.filtered += 1
+            return False
+
+        if self._query.lookup(name) is None:
+            if self.bloom is not None:
+                self.stats.false_positives += 1
+            return False
+
+        self.stats.confirmed += 1
+        return True
+
+
+def _glob_literal_prefix(pattern: str) -> str:
+    for idx, char in enumerate(pattern):
+        if char in _GLOB_SPECIAL:
+            return pattern[:idx]
+
+    return pattern
+
+
+def _common_prefix(first: str, second: str) -> str:
+    idx = 0
+    while idx < min(len(first), len(second)) and first[idx] == second[idx]:
+        idx += 1
+
+    return first[:idx]
@@ -0,0 +1,33 @@
+from collections import Counter
+
+
+class SyscallCounter:
+    """Counts filesystem calls issued by an operation, so that commands \
+        can report how many round-trips to storage were needed. Useful  \
+        to reason about performance over network mounts.
+    """
+
+    def __init__(self) -> None:
+        self._counts = Counter()
+
+    def add(self, syscall: str, count: int = 1) -> None:
+        self._counts[syscall] += count
+
+    def __getitem__(self, syscall: str) -> int:
+        return self._counts[syscall]
+
+    @property
+    def total(self) -> int:
+        return sum(self._counts.values())
+
+    def summary(self) -> str:
+        """Human readable summary, e.g.: '3 filesystem call(s): scandir=1, \
+            stat=2'
+        """
+        details = ', '.join(
+            f'{ syscall }={ count }'
+            for syscall, count in sorted(self._counts.items())
+        )
+        summary = f'{ self.total } filesystem call(s)'
+
+        return f'{ summary }: { details }' if details else summary
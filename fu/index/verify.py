@@ -0,0 +1,149 @@
+"""Integrity verification of indexed files against their stored hashes.
+
+Files are re-read and hashed in parallel, results are produced in index
+order, so progress can be checkpointed as the name of last verified file
+and an interrupted verification resumed right after it.
+"""
+import json
+import os
+
+from dataclasses import asdict, dataclass, field
+from functools import partial
+from typing import Dict, Iterable, Iterator
+
+from fu.index.hashing import ParallelHasher
+from fu.index.idx_format import IndexEntry
+
+
+#: Seconds between progress checkpoints
+CHECKPOINT_INTERVAL = 30
+
+#: File content matches stored hash
+STATUS_OK = 'ok'
+
+#: Content changed while size and mtime didn't: silent corruption
+STATUS_CORRUPT = 'corrupt'
+
+#: Size or mtime changed since file was indexed, so it was legitimately
+#: modified (file is not read)
+STATUS_MODIFIED = 'modified'
+
+STATUS_MISSING = 'missing'
+STATUS_UNREADABLE = 'unreadable'
+
+#: Index has no hash (with verifier algorithm) for the file
+STATUS_SKIPPED = 'skipped'
+
+VERIFY_STATUSES = (
+    STATUS_OK,
+    STATUS_CORRUPT,
+    STATUS_MODIFIED,
+    STATUS_MISSING,
+    STATUS_UNREADABLE,
+    STATUS_SKIPPED
+)
+
+
+@dataclass
+class VerifyResult:
+    entry: IndexEntry
+    status: str
+    actual_hash: str = None
+
+
+@dataclass
+class VerifyCheckpoint:
+    """Progress of a verification, enough to resume it
+
+    Args:
+        idx (str): Verified index file
+        report (str): Report file problems are written into
+        report_size (int): Size of report when checkpoint was saved, \
+            lines written after it are discarded on resume
+        last_name (str): Name of last verified file, None if none yet
+        counts (Dict[str, int]): Verified files by status
+    """
+
+    idx: str
+    report: str
+    report_size: int = 0
+    last_name: str = None
+    counts: Dict[str, int] = field(
+        default_factory=lambda: {status: 0 for status in VERIFY_STATUSES})
+
+    def save(self, path: str) -> None:
+        """Writes checkpoint atomically, so a crash while saving never \
+            leaves a truncated checkpoint behind
+        """
+        tmp_path = f'{ path }.tmp'
+        with open(tmp_path, 'w') as checkpoint_file:
+            json.dump(asdict(self), checkpoint_file)
+            checkpoint_file.flush()
+            os.fsync(checkpoint_file.fileno())
+
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str) -> 'VerifyCheckpoint':
+        with open(path) as checkpoint_file:
+            return cls(**json.load(checkpoint_file))
+
+
+def checkpoint_path(idx: str) -> str:
+    """Default checkpoint file of a verification of given index"""
+    return f'{ idx }.verify-checkpoint'
+
+
+def verify_entries(
+    entries: Iterable[IndexEntry],
+    root: str,
+    hasher: ParallelHasher
+) -> Iterator[VerifyResult]:
+    """Verifies content of indexed files against its stored hash, on \
+        hasher pool of threads. Results are yielded in same order as  \
+        entries.
+
+    Args:
+        entries (Iterable[IndexEntry]): Entries of a hashed index
+        root (str): Directory entry names are relative to
+        hasher (ParallelHasher): Hasher whose algorithm matches stored \
+            hashes, with desired concurrency and rate limits
+
+    Returns:
+        Iterator[VerifyResult]: Result of each entry
+    """
+    return hasher.map(
+        partial(_verify_entry, root=root, hasher=hasher),
+        entries,
+        lambda entry: os.path.join(root, entry.name))
+
+
+def _verify_entry(
+    entry: IndexEntry,
+    root: str,
+    hasher: ParallelHasher
+) -> VerifyResult:
+    if not entry.hash or not entry.hash.startswith(f'{ hasher.algorithm }:'):
+        return VerifyResult(entry, STATUS_SKIPPED)
+
+    path = os.path.join(root, entry.name)
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return VerifyResult(entry, STATUS_MISSING)
+    except OSError:
+        return VerifyResult(entry, STATUS_UNREADABLE)
+
+    if entry.is_rich() and (
+            st.st_size != entry.size or st.st_mtime_ns != entry.mtime_ns):
+        return VerifyResult(entry, STATUS_MODIFIED)
+
+    try:
+        actual_hash = hasher.hash_path(path)
+    except FileNotFoundError:
+        return VerifyResult(entry, STATUS_MISSING)
+    except OSError:
+        return VerifyResult(entry, STATUS_UNREADABLE)
+
+    status = STATUS_OK if actual_hash == entry.hash else STATUS_CORRUPT
+    return VerifyResult(entry, status, actual_hash)
@@ -1,23 +1,55 @@
+import itertools
+import shlex
+import shutil
+import subprocess
 import typer
 import os
 
+from collections import deque
+from typing import Any, Callable, Iterable, Iterator, List
+
 from rich.prompt import Confirm
-from fu.common.errors import InvalidPathError
+from fu.common import config
+from fu.common.errors import ConfigError, InvalidPathError
 
 from fu.utils.console import console
 from fu.utils.path import (
     is_dir,
     path_files
 )
+from fu.utils.pathsfile import PathsFile
+from fu.utils.prefetch import Prefetcher
+
+
+#: Batches of files warmed up ahead of the one being reviewed
+DEFAULT_PREFETCH = 1
 
 
-def iterate_and_open(path: str, step: int = 1) -> None:
+def iterate_and_open(
+    path: str,
+    step: int = 1,
+    prefetch: int = DEFAULT_PREFETCH,
+    viewer: str = None,
+    batch: bool = False
+) -> None:
     """Will iterate each file found inside given path
     and will open it in default system program
 
     Args:
         path (str): Path to iterate over its files
         step (int): How many files open at a time
+        prefetch (int, optional): Batches of step files loaded into \
+            page cache in background while current batch is reviewed, \
+            0 disables prefetching. Defaults to DEFAULT_PREFETCH.
+        viewer (str, optional): Command line of a program opening each \
+            batch of files with a single process (e.g. 'feh'), paths  \
+            are appended as arguments. Defaults to None.
+        batch (bool, optional): Open each batch in viewer from config \
+            file ('command' of [viewer] section) if no viewer is given. \
+            Defaults to False.
+
+    Raises:
+        ConfigError: If viewer is required but not configured or found
     """
     if not is_dir(path):
         console.print(
@@ -25,52 +57,201 @@ def iterate_and_open(path: str, step: int = 1) -> None:
             style='error'
         )
 
-    currently_open_count = 0
-    for file in path_files(path, ):
-        typer.launch(file)
-        console.print(
-            ' Opening {}'.format(file),
-            style='info'
-        )
-        currently_open_count += 1
+    launch = _launcher(viewer, batch)
+
+    def open_file_paths(files: List[str]) -> None:
+        launch(files)
+        for file in files:
+            console.print(
+                ' Opening {}'.format(file),
+                style='info'
+            )
 
-        if currently_open_count == step:
-            if Confirm.ask('Open next {} file(s)'.format(step)):
-                currently_open_count = 0
-            else:
-                break
+    _open_in_batches(path_files(path, ), step, prefetch, open_file_paths)
 
-def iterate_from_file(path: str, step: int = 1) -> None:
+def iterate_from_file(
+    path: str,
+    step: int = 1,
+    prefetch: int = DEFAULT_PREFETCH,
+    from_line: int = None,
+    resume: bool = False,
+    viewer: str = None,
+    batch: bool = False,
+    save_cursor: bool = False
+) -> None:
     """Will iterate each line of given file as a path \
     and will open it in default system program.       \
                                                       \
-    If line starts with '#' it will be ignored.
+    If line starts with '#' it will be ignored.       \
+                                                      \
+    When resuming or asked to, number of next line is saved as a cursor \
+    next to given file after each opened batch, so that iteration can  \
+    be resumed later.
 
     Args:
         path (str): Path to file containing paths to iterate
         step (int, optional): How many files open at a time. \
             Defaults to 1.
+        prefetch (int, optional): Batches of step files loaded into \
+            page cache in background while current batch is reviewed, \
+            0 disables prefetching. Defaults to DEFAULT_PREFETCH.
+        from_line (int, optional): Line number (starting at 1) to start \
+            from, reached with a seek instead of reading previous lines. \
+            Defaults to None (first line).
+        resume (bool, optional): Start from line saved as cursor by a \
+            previous iteration (first line if there is none), ignored  \
+            if from_line is given, and keep saving cursor. \
+            Defaults to False.
+        viewer (str, optional): Command line of a program opening each \
+            batch of files with a single process (e.g. 'feh'), paths  \
+            are appended as arguments. Defaults to None.
+        batch (bool, optional): Open each batch in viewer from config \
+            file ('command' of [viewer] section) if no viewer is given. \
+            Defaults to False.
+        save_cursor (bool, optional): Save cursor after each batch even \
+            if not resuming. Defaults to False.
+
+    Raises:
+        InvalidPathError: If path is not a file
+        ConfigError: If viewer is required but not configured or found
     """
     if not os.path.isfile(path):
         console.print(f'Path is not a valid file: { path }', style='error')
         raise InvalidPathError()
 
-    with open(path) as pathsfile:
-        curr_open_count = 0
+    launch = _launcher(viewer, batch)
+    paths_file = PathsFile(path)
+    start = paths_file.start_line(from_line, resume)
+
+    def open_file_paths(filepaths: List[str]) -> None:
+        for filepath in filepaths:
+            console.print(f'Opening: "{ filepath }"', style='info')
+        launch(filepaths)
+
+    def save_batch_cursor(batch: List[tuple]) -> None:
+        paths_file.save_cursor(batch[-1][0] + 1)
+
+    _open_in_batches(
+        paths_file.paths(start),
+        step,
+        prefetch,
+        open_file_paths,
+        path_of=lambda line: line[1],
+        opened=save_batch_cursor if resume or save_cursor else None)
+
+
+def viewer_command(viewer: str = None) -> List[str]:
+    """Arguments of viewer command opening batches of files
+
+    Args:
+        viewer (str, optional): Command line, e.g. 'feh --auto-zoom'. \
+            Defaults to None ('command' of [viewer] config section).
+
+    Raises:
+        ConfigError: If no viewer is configured or it is not installed
+
+    Returns:
+        List[str]: Command arguments, paths to open go after them
+    """
+    command = viewer or config.viewer('command')
+    args = shlex.split(command or '')
+    if not args:
+        raise ConfigError(
+            "No viewer configured: set 'command' in [viewer] section")
+
+    if shutil.which(args[0]) is None:
+        raise ConfigError(f'Viewer not found: { args[0] }')
+
+    return args
+
+
+def launch_viewer(command: List[str], paths: List[str]) -> None:
+    """Opens all given paths with a single viewer process, without \
+        waiting for it (as typer.launch does)
+    """
+    subprocess.Popen(
+        command + paths,
+        stdin=subprocess.DEVNULL,
+        start_new_session=True)
+
+
+def _launcher(viewer: str, batch: bool) -> Callable[[List[str]], None]:
+    """Function opening a batch of paths, in its default system program \
+        (a process per path) or in viewer (a process per batch)
+    """
+    if not viewer and not batch:
+        def launch_each(paths: List[str]) -> None:
+            for path in paths:
+                typer.launch(path)
+
+        return launch_each
+
+    command = viewer_command(viewer)
+    return lambda paths: launch_viewer(command, paths)
+
+
+def _open_in_batches(
+    items: Iterable[Any],
+    step: int,
+    prefetch: int,
+    open_paths: Callable[[List[str]], None],
+    path_of: Callable[[Any], str] = None,
+    opened: Callable[[List[Any]], None] = None
+) -> None:
+    """Opens paths step at a time, asking for confirmation before each \
+        batch after the first one. While user reviews a batch, next       \
+        prefetch batches are read into page cache, so that they open      \
+        instantly (e.g. from network shares).
+
+    Args:
+        items (Iterable[Any]): Paths to open, or items holding them
+        step (int): Items opened at a time
+        prefetch (int): Batches warmed up ahead of current one
+        open_paths (Callable[[List[str]], None]): Opens paths of a batch
+        path_of (Callable[[Any], str], optional): Path of an item. \
+            Defaults to None (items are paths).
+        opened (Callable[[List[Any]], None], optional): Called with each \
+            batch once all of its items are open. Defaults to None.
+    """
+    path_of = path_of or (lambda item: item)
+
+    batches = _batches(items, step)
+    upcoming = deque(itertools.islice(batches, prefetch + 1))
+
+    with Prefetcher() as prefetcher:
+        for batch in itertools.islice(upcoming, 1, None):
+            prefetcher.add([path_of(item) for item in batch])
+
+        first = True
+        while upcoming:
+            batch = upcoming.popleft()
+
+            # Pause opening files if step has been reached
+            if not first:
+                console.print()
+                if not Confirm.ask(f'Open next { step } file(s)'):
+                    break
+            first = False
+
+            # Refill look-ahead window, so that exactly prefetch batches
+            # are warmed up while this one is reviewed
+            if len(upcoming) < max(1, prefetch):
+                next_batch = next(batches, None)
+                if next_batch:
+                    upcoming.append(next_batch)
+                    if prefetch > 0:
+                        prefetcher.add([path_of(i) for i in next_batch])
 
-        for filepath in pathsfile:
-            filepath = filepath.strip("\n")
+            open_paths([path_of(item) for item in batch])
 
-            if filepath and not filepath.startswith('#'):
+            if opened:
+                opened(batch)
 
-                # Pause opening files if step has been reached
-                if curr_open_count == step:
-                    console.print()
-                    if Confirm.ask(f'Open next { step } file(s)'):
-                        curr_open_count = 0
-                    else:
-                        break
 
-                console.print(f'Opening: "{ filepath }"', style='info')
-                typer.launch(filepath)
-                curr_open_count += 1
+def _batches(items: Iterable[Any], step: int) -> Iterator[List[Any]]:
+    items = iter(items)
+    while True:
+        batch = list(itertools.islice(items, max(1, step)))
+        if not batch:
+            return
+        yield batch
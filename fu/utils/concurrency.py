@@ -0,0 +1,138 @@
+from collections import defaultdict, deque
+from concurrent.futures import (
+    FIRST_COMPLETED,
+    Future,
+    ThreadPoolExecutor,
+    wait
+)
+from typing import Any, Callable, Dict, Hashable, Iterable, Iterator
+
+
+# Marks end of items
+_END = object()
+
+
+def bounded_map(
+    fn: Callable,
+    items: Iterable,
+    workers: int,
+    window: int = None
+) -> Iterator:
+    """Same as 'ThreadPoolExecutor.map' but consuming given items lazily, \
+        only a bounded number of them is submitted to the pool at a time. \
+        So iterables of any size (e.g. lines of a huge index file) can be \
+        processed in parallel with constant memory. Results are yielded   \
+        in same order as items.
+
+    Args:
+        fn (Callable): Function to apply to each item
+        items (Iterable): Items to process
+        workers (int): Number of threads
+        window (int, optional): Max items in flight. Defaults to 4 times \
+            number of workers.
+
+    Returns:
+        Iterator: fn result for each item
+    """
+    workers = max(1, workers)
+    window = window or workers * 4
+    in_flight = deque()
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        try:
+            for item in items:
+                in_flight.append(executor.submit(fn, item))
+
+                if len(in_flight) >= window:
+                    yield in_flight.popleft().result()
+
+            while in_flight:
+                yield in_flight.popleft().result()
+
+        # If iteration is stopped early (e.g. interrupted), items not yet
+        # started are dropped instead of waited for
+        finally:
+            for future in in_flight:
+                future.cancel()
+
+
+def device_map(
+    fn: Callable,
+    items: Iterable,
+    device_of: Callable[[Any], Hashable],
+    workers: int,
+    per_device: int,
+    window: int = None
+) -> Iterator:
+    """Same as bounded_map, but at most per_device items of the same    \
+        device are processed at a time. Items are queued per device and \
+        only started when its device has a free slot, so workers never   \
+        wait on a busy device while items of other devices are pending.
+
+    Args:
+        fn (Callable): Function to apply to each item
+        items (Iterable): Items to process
+        device_of (Callable[[Any], Hashable]): Device of an item, called \
+            on the dispatching thread. None means no per device limit.
+        workers (int): Number of threads
+        per_device (int): Max items of the same device in flight
+        window (int, optional): Max items read ahead of the oldest one \
+            not yet yielded. Defaults to 4 times number of workers.
+
+    Returns:
+        Iterator: fn result for each item, in same order as items
+    """
+    workers = max(1, workers)
+    per_device = max(1, per_device)
+    window = window or workers * 4
+    items = iter(items)
+
+    # A slot per item in order, holding its future once started
+    slots = deque()
+    queued: Dict[Hashable, deque] = defaultdict(deque)
+    running: Dict[Future, Hashable] = {}
+    busy: Dict[Hashable, int] = defaultdict(int)
+    exhausted = False
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        try:
+            while True:
+                while not exhausted and len(slots) < window:
+                    item = next(items, _END)
+                    if item is _END:
+                        exhausted = True
+                        break
+
+                    slot = [None]
+                    slots.append(slot)
+                    queued[device_of(item)].append((slot, item))
+
+                for device, pending in queued.items():
+                    while pending and len(running) < workers and (
+                            device is None or busy[device] < per_device):
+                        slot, item = pending.popleft()
+                        slot[0] = executor.submit(fn, item)
+                        running[slot[0]] = device
+                        busy[device] += 1
+
+                yielded = False
+                while slots and slots[0][0] is not None \
+                        and slots[0][0].done():
+                    yield slots.popleft()[0].result()
+                    yielded = True
+
+                if not slots and exhausted:
+                    return
+
+                # Refill window before waiting for more results
+                if yielded:
+                    continue
+
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    busy[running.pop(future)] -= 1
+
+        # Items not yet started are dropped, as in bounded_map
+        finally:
+            for future in running:
+                future.cancel()
@@ -0,0 +1,63 @@
+import bz2
+import gzip
+import io
+import lzma
+
+from pathlib import Path
+
+
+#: Compression used for files with these extensions
+COMPRESSED_EXTENSIONS = {
+    '.gz': gzip.open,
+    '.xz': lzma.open,
+    '.bz2': bz2.open
+}
+
+IO_BUFFER_SIZE = 1024 * 1024
+
+ENCODING = 'utf-8'
+ENCODING_ERRORS = 'surrogateescape'
+
+
+def is_compressed(path: str) -> bool:
+    return Path(path).suffix.lower() in COMPRESSED_EXTENSIONS
+
+
+def open_file(path: str, mode: str = 'r', buffer_size: int = IO_BUFFER_SIZE):
+    """Opens given file transparently (de)compressing it when its \
+        extension is one of COMPRESSED_EXTENSIONS. Data is streamed  \
+        through big buffers, so compressed files are never fully     \
+        loaded in memory and writes reach the compressor in large    \
+        blocks.
+
+        Text mode uses utf-8, undecodable bytes (e.g. file names in  \
+        other encodings) are preserved as surrogate escapes.
+
+    Args:
+        path (str): File to open
+        mode (str, optional): 'r', 'w', 'x' or 'a', plus 'b' for binary \
+            mode. Defaults to 'r'.
+        buffer_size (int, optional): Buffer size in bytes. \
+            Defaults to IO_BUFFER_SIZE.
+
+    Returns:
+        File object
+    """
+    binary = 'b' in mode
+    raw_mode = mode.replace('t', '').replace('b', '') + 'b'
+
+    compressed_open = COMPRESSED_EXTENSIONS.get(Path(path).suffix.lower())
+    if compressed_open:
+        stream = compressed_open(path, raw_mode)
+
+        if 'r' in raw_mode:
+            stream = io.BufferedReader(stream, buffer_size)
+        else:
+            stream = io.BufferedWriter(stream, buffer_size)
+    else:
+        stream = open(path, raw_mode, buffering=buffer_size)
+
+    if binary:
+        return stream
+
+    return io.TextIOWrapper(stream, encoding=ENCODING, errors=ENCODING_ERRORS)
@@ -2,6 +2,7 @@ import os
 from pathlib import Path
 
 from fu.common.errors import InvalidPathError
+from fu.utils.console import console
 
 
 def get_file_name(path: str, include_extension=True) -> str:
@@ -83,6 +84,47 @@ def path_files(path: str, extensions = []):
                 if file_ext.lower() in extensions:
                     yield os.path.join(path, file)
 
+def scan_files(path: str, recursive: bool = False):
+    """Creates a generator to iterate each file in provided directory
+    path using 'os.scandir', so file type and stat info comes from
+    directory listing itself whenever filesystem provides it.
+
+    When recursive, nested directories are walked iteratively (no
+    recursion limits) and symbolic links to directories are not
+    followed. Directories that can't be listed (e.g. permission
+    denied) are reported as a warning and skipped.
+
+    :param path: Directory path
+    :param recursive: If true, files in nested directories are
+        yield as well
+    :return: Generator of 'os.DirEntry' for each regular file
+    """
+    if not is_dir(path):
+        raise InvalidPathError()
+
+    pending_dirs = [path]
+    while pending_dirs:
+        dir_path = pending_dirs.pop()
+        try:
+            with os.scandir(dir_path) as entries:
+                for entry in entries:
+                    if entry.is_file():
+                        yield entry
+
+                    elif recursive and entry.is_dir(follow_symlinks=False):
+                        pending_dirs.append(entry.path)
+
+        except OSError as e:
+            warn_unreadable_dir(dir_path, e)
+
+
+def warn_unreadable_dir(path: str, error: OSError) -> None:
+    """Reports a directory skipped while walking a tree"""
+    console.print(
+        f'Skipping unreadable directory { path }: { error.strerror }',
+        style='warning')
+
+
 def count_path_files(path: str, extensions = []) -> int:
     """Counts all files in given directory
 
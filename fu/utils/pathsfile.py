@@ -0,0 +1,240 @@
+"""Random access to lines of big paths files.
+
+A paths file lists a path per line ('#' lines are comments). To start
+reading from any line without scanning all previous ones, a line offsets
+sidecar ('<paths file>.lines') is built once: a header recording size
+and mtime of the paths file (to detect stale sidecars) followed by the
+byte offset of every line as an array of 64 bits integers. Jumping to a
+line reads a single offset from sidecar and seeks to it.
+
+Progress through a paths file can be saved as a cursor
+('<paths file>.cursor') holding the number of next line to read, so that
+long reviews can be resumed later. Cursors are only written on request,
+no file is left next to paths files otherwise.
+"""
+import io
+import os
+import struct
+import sys
+
+from array import array
+from typing import Iterator, Tuple
+
+from fu.utils.fileio import (
+    ENCODING,
+    ENCODING_ERRORS,
+    IO_BUFFER_SIZE,
+    is_compressed,
+    open_file
+)
+from fu.utils.console import console
+
+
+LINES_EXTENSION = '.lines'
+CURSOR_EXTENSION = '.cursor'
+
+LINES_MAGIC = b'FULINES\x01'
+
+# paths file size, paths file mtime (ns), lines count
+_LINES_HEADER = struct.Struct('<QqQ')
+_OFFSET = struct.Struct('<Q')
+
+# Offsets are buffered in memory up to this count before being written
+_OFFSETS_BATCH = 64 * 1024
+
+
+class PathsFile:
+    """Paths file readable from any line.
+
+    Usage:
+        paths_file = PathsFile('paths.txt')
+        for line_number, path in paths_file.paths(paths_file.cursor()):
+            ...
+            paths_file.save_cursor(line_number + 1)
+    """
+
+    def __init__(self, path: str) -> None:
+        """
+        Args:
+            path (str): Paths file, compressed files are supported but \
+                read sequentially up to requested line
+        """
+        self.path = path
+        self.lines_path = f'{ path }{ LINES_EXTENSION }'
+        self.cursor_path = f'{ path }{ CURSOR_EXTENSION }'
+
+    def paths(self, start: int = 1) -> Iterator[Tuple[int, str]]:
+        """Iterates paths from given line on, skipping empty lines and \
+            comments
+
+        Args:
+            start (int, optional): First line number to read, starting \
+                at 1. Defaults to 1.
+
+        Returns:
+            Iterator[Tuple[int, str]]: Line number and path of each line
+        """
+        for line_number, line in self.lines(start):
+            if line and not line.startswith('#'):
+                yield line_number, line
+
+    def lines(self, start: int = 1) -> Iterator[Tuple[int, str]]:
+        """Iterates lines (without line break) from given line on. On \
+            uncompressed files, reading starts with a seek to the line \
+            offset found in sidecar (built the first time a line other \
+            than first one is requested), compressed ones are read     \
+            sequentially up to given line.
+        """
+        start = max(1, start)
+        seekable = not is_compressed(self.path)
+
+        offset = 0
+        if seekable and start > 1:
+            offset = self.line_offset(start)
+            if offset is None:
+                return
+
+        with open_file(self.path, 'rb') as raw_file:
+            first_line = 1
+            if seekable:
+                raw_file.seek(offset)
+                first_line = start
+
+            # Lines are split on '\n' only, same as offsets in sidecar
+            paths_file = io.TextIOWrapper(
+                raw_file,
+                encoding=ENCODING,
+                errors=ENCODING_ERRORS,
+                newline='\n')
+
+            for line_number, line in enumerate(paths_file, start=first_line):
+                if line_number >= start:
+                    yield line_number, line.rstrip('\r\n')
+
+    def line_offset(self, line_number: int) -> int:
+        """Byte offset where given line starts, reading only its entry \
+            in sidecar (sidecar is built first if missing or stale)
+
+        Returns:
+            int: Offset, None if file has less lines
+        """
+        if not self._sidecar_is_fresh():
+            self.build_sidecar()
+
+        with open(self.lines_path, 'rb') as lines_file:
+            lines_file.seek(len(LINES_MAGIC))
+            _, _, lines_count = _LINES_HEADER.unpack(
+                lines_file.read(_LINES_HEADER.size))
+
+            if line_number > lines_count:
+                return None
+
+            lines_file.seek(
+                len(LINES_MAGIC)
+                + _LINES_HEADER.size
+                + _OFFSET.size * (line_number - 1))
+            return _OFFSET.unpack(lines_file.read(_OFFSET.size))[0]
+
+    def build_sidecar(self) -> int:
+        """Scans paths file once, writing offset of every line into \
+            sidecar. Sidecar is written under a temporary name and then \
+            renamed, so readers never see a partial one.
+
+        Returns:
+            int: Number of lines
+        """
+        st = os.stat(self.path)
+        tmp_path = f'{ self.lines_path }.tmp'
+        lines_count = 0
+
+        with open(self.path, 'rb', buffering=IO_BUFFER_SIZE) as raw_file, \
+                open(tmp_path, 'wb') as lines_file:
+            lines_file.write(LINES_MAGIC)
+            lines_file.write(_LINES_HEADER.pack(0, 0, 0))
+
+            offsets = array('Q')
+            offset = 0
+            for line in raw_file:
+                offsets.append(offset)
+                offset += len(line)
+
+                if len(offsets) >= _OFFSETS_BATCH:
+                    lines_count += _write_offsets(lines_file, offsets)
+                    offsets = array('Q')
+
+            lines_count += _write_offsets(lines_file, offsets)
+
+            lines_file.seek(len(LINES_MAGIC))
+            lines_file.write(_LINES_HEADER.pack(
+                st.st_size,
+                st.st_mtime_ns,
+                lines_count))
+
+        os.replace(tmp_path, self.lines_path)
+        return lines_count
+
+    def start_line(self, from_line: int = None, resume: bool = False) -> int:
+        """First line to read: given one, else saved cursor if resuming, \
+            else first line of file
+        """
+        if from_line:
+            return from_line
+
+        if resume:
+            start = self.cursor()
+            console.print(f'Resuming from line { start }', style='info')
+            return start
+
+        return 1
+
+    def cursor(self) -> int:
+        """Number of next line to read, as saved by save_cursor, 1 if \
+            there is no saved cursor
+        """
+        try:
+            with open(self.cursor_path) as cursor_file:
+                return max(1, int(cursor_file.read().strip()))
+        except (FileNotFoundError, ValueError):
+            return 1
+
+    def save_cursor(self, line_number: int) -> bool:
+        """Saves number of next line to read. Failing to save it (e.g. \
+            read-only directory) only prevents resuming, so it is      \
+            reported as a warning.
+
+        Returns:
+            bool: Whether cursor was saved
+        """
+        tmp_path = f'{ self.cursor_path }.tmp'
+        try:
+            with open(tmp_path, 'w') as cursor_file:
+                cursor_file.write(f'{ line_number }\n')
+
+            os.replace(tmp_path, self.cursor_path)
+        except OSError as e:
+            console.print(f'Unable to save cursor: { e }', style='warning')
+            return False
+
+        return True
+
+    def _sidecar_is_fresh(self) -> bool:
+        try:
+            with open(self.lines_path, 'rb') as lines_file:
+                if lines_file.read(len(LINES_MAGIC)) != LINES_MAGIC:
+                    return False
+                size, mtime_ns, _ = _LINES_HEADER.unpack(
+                    lines_file.read(_LINES_HEADER.size))
+        except (FileNotFoundError, struct.error):
+            return False
+
+        st = os.stat(self.path)
+        return (size, mtime_ns) == (st.st_size, st.st_mtime_ns)
+
+
+def _write_offsets(lines_file, offsets: array) -> int:
+    """Writes offsets as little endian, whatever machine byte order is"""
+    if sys.byteorder != 'little':
+        offsets.byteswap()
+
+    lines_file.write(offsets.tobytes())
+    return len(offsets)
@@ -0,0 +1,73 @@
+import os
+
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Iterable, List
+
+from fu.utils.fileio import IO_BUFFER_SIZE
+
+
+class Prefetcher:
+    """Warms up page cache with files expected to be read soon, on a    \
+        background thread. Where supported, kernel is asked to read     \
+        ahead whole files with posix_fadvise(WILLNEED), otherwise files \
+        are read through and its data discarded. Either way, a program  \
+        opening them later finds its data already in memory instead of \
+        waiting on cold reads from disk or network.
+
+    Usage:
+        with Prefetcher() as prefetcher:
+            prefetcher.add(next_paths)
+            ...
+    """
+
+    def __init__(self, workers: int = 1) -> None:
+        """
+        Args:
+            workers (int, optional): Files warmed up at a time. \
+                Defaults to 1 (sequential reads).
+        """
+        self._executor = ThreadPoolExecutor(
+            max_workers=max(1, workers),
+            thread_name_prefix='prefetch')
+        self._pending: List[Future] = []
+
+    def __enter__(self) -> 'Prefetcher':
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def add(self, paths: Iterable[str]) -> None:
+        """Queues files to warm up, in given order"""
+        self._pending = [f for f in self._pending if not f.done()]
+        for path in paths:
+            self._pending.append(self._executor.submit(warm_up, path))
+
+    def close(self) -> None:
+        """Drops queued files without waiting for them"""
+        for future in self._pending:
+            future.cancel()
+
+        self._executor.shutdown(wait=False)
+
+
+def warm_up(path: str) -> None:
+    """Loads given file into page cache, errors are ignored as warming \
+        up is only an optimization
+    """
+    try:
+        with open(path, 'rb', buffering=0) as src_file:
+            if hasattr(os, 'posix_fadvise'):
+                os.posix_fadvise(
+                    src_file.fileno(),
+                    0,
+                    0,
+                    os.POSIX_FADV_WILLNEED)
+                return
+
+            buffer = bytearray(IO_BUFFER_SIZE)
+            while src_file.readinto(buffer):
+                pass
+
+    except OSError:
+        pass
@@ -0,0 +1,68 @@
+import threading
+import time
+
+from typing import Callable
+
+
+class TokenBucket:
+    """Thread safe token bucket, limits the average rate at which a     \
+        resource (e.g. bytes read from disk) is consumed by any number \
+        of threads, allowing bursts of up to capacity tokens.
+
+        Consumers take tokens after using the resource. When there are \
+        not enough tokens, bucket goes into debt and consumer sleeps    \
+        until debt would be paid at given rate, so following consumers \
+        wait in turn and overall rate stays at the limit.
+    """
+
+    def __init__(
+        self,
+        rate: float,
+        capacity: float = None,
+        clock: Callable[[], float] = time.monotonic,
+        sleep: Callable[[float], None] = time.sleep
+    ) -> None:
+        """
+        Args:
+            rate (float): Tokens added per second
+            capacity (float, optional): Max tokens accumulated while idle. \
+                Defaults to rate (one second worth of tokens).
+            clock (Callable, optional): Time source in seconds. \
+                Defaults to time.monotonic.
+            sleep (Callable, optional): Sleep function. \
+                Defaults to time.sleep.
+        """
+        if rate <= 0:
+            raise ValueError(f'Rate must be greater than 0: { rate }')
+
+        self.rate = rate
+        self.capacity = capacity or rate
+        self._clock = clock
+        self._sleep = sleep
+        self._tokens = self.capacity
+        self._updated = clock()
+        self._lock = threading.Lock()
+
+    def consume(self, tokens: float) -> float:
+        """Takes given amount of tokens, blocking while bucket is in debt
+
+        Args:
+            tokens (float): Tokens to take, can exceed capacity
+
+        Returns:
+            float: Seconds waited
+        """
+        with self._lock:
+            now = self._clock()
+            self._tokens = min(
+                self.capacity,
+                self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+
+            self._tokens -= tokens
+            wait = -self._tokens / self.rate if self._tokens < 0 else 0.0
+
+        if wait:
+            self._sleep(wait)
+
+        return wait
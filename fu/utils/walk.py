@@ -0,0 +1,178 @@
+"""Concurrent directory tree walker.
+
+On network mounts (NFS, SMB) every directory listing and stat is a round
+trip to the server, so walking a tree one directory at a time leaves the
+link idle most of the time. Here directories are listed on a pool of
+threads, with a bounded number of listings in flight, and files are
+yielded as soon as the listing of its directory completes. Directories
+that can't be listed are reported as a warning and skipped, as
+scan_files does.
+"""
+import os
+
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Dict, Iterator, List
+
+from fu.common.errors import InvalidPathError
+from fu.utils.path import is_dir, scan_files, warn_unreadable_dir
+
+
+DEFAULT_WALK_WORKERS = 8
+
+
+def walk_files(
+    path: str,
+    recursive: bool = True,
+    workers: int = DEFAULT_WALK_WORKERS,
+    ordered: bool = False,
+    stat: bool = False,
+    window: int = None
+) -> Iterator[os.DirEntry]:
+    """Iterates regular files in given directory (and nested ones when \
+        recursive), listing directories concurrently. Symbolic links to \
+        directories are not followed.
+
+    Args:
+        path (str): Directory path
+        recursive (bool, optional): Include files in nested directories. \
+            Defaults to True.
+        workers (int, optional): Directories listed at a time, 1 walks \
+            on current thread (same as scan_files). \
+            Defaults to DEFAULT_WALK_WORKERS.
+        ordered (bool, optional): Yield files in a deterministic order:   \
+            files of each directory sorted by name, followed by its       \
+            subdirectories (sorted by name) depth first. Otherwise files \
+            are yielded as listings complete. Defaults to False.
+        stat (bool, optional): Also stat each file on the listing thread, \
+            so DirEntry.stat() of yielded entries doesn't hit the \
+            filesystem again. Defaults to False.
+        window (int, optional): Max directory listings in flight. \
+            Defaults to 4 times number of workers.
+
+    Raises:
+        InvalidPathError: If path is not a directory
+
+    Returns:
+        Iterator[os.DirEntry]: Entry of each regular file
+    """
+    if not is_dir(path):
+        raise InvalidPathError()
+
+    if workers <= 1 and not ordered:
+        return scan_files(path, recursive)
+
+    workers = max(1, workers)
+    window = window or workers * 4
+    walk = _walk_ordered if ordered else _walk_unordered
+
+    return walk(path, recursive, workers, window, stat)
+
+
+def _list_dir(path: str, recursive: bool, stat: bool, ordered: bool) -> tuple:
+    """Lists a single directory
+
+    Returns:
+        tuple: (file entries, subdirectory paths, listing error or None). \
+            Error is returned instead of raised, so it is reported from \
+            the walking thread and doesn't stop the walk.
+    """
+    files: List[os.DirEntry] = []
+    dirs: List[str] = []
+
+    try:
+        with os.scandir(path) as entries:
+            for entry in entries:
+                if entry.is_file():
+                    if stat:
+                        try:
+                            entry.stat()
+                        except FileNotFoundError:
+                            continue
+                    files.append(entry)
+
+                elif recursive and entry.is_dir(follow_symlinks=False):
+                    dirs.append(entry.path)
+
+    except OSError as e:
+        # Errors while iterating a listing may not name the directory
+        e.filename = e.filename or path
+        return files, dirs, e
+
+    if ordered:
+        files.sort(key=lambda entry: entry.name)
+        dirs.sort()
+
+    return files, dirs, None
+
+
+def _walk_unordered(
+    path: str,
+    recursive: bool,
+    workers: int,
+    window: int,
+    stat: bool
+) -> Iterator[os.DirEntry]:
+    pending_dirs = [path]
+    in_flight = set()
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        try:
+            while pending_dirs or in_flight:
+                while pending_dirs and len(in_flight) < window:
+                    in_flight.add(executor.submit(
+                        _list_dir,
+                        pending_dirs.pop(),
+                        recursive,
+                        stat,
+                        False))
+
+                done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in done:
+                    files, dirs, error = future.result()
+                    if error:
+                        warn_unreadable_dir(error.filename, error)
+                    pending_dirs.extend(dirs)
+                    yield from files
+
+        # Listings not yet started are dropped if iteration stops early
+        finally:
+            for future in in_flight:
+                future.cancel()
+
+
+def _walk_ordered(
+    path: str,
+    recursive: bool,
+    workers: int,
+    window: int,
+    stat: bool
+) -> Iterator[os.DirEntry]:
+    # Directories still to yield, next one on top. Directories near the
+    # top are listed ahead while files of current one are yielded
+    pending_dirs = [path]
+    listings: Dict[str, Future] = {}
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        try:
+            while pending_dirs:
+                for dir_path in reversed(pending_dirs):
+                    if len(listings) >= window:
+                        break
+                    if dir_path not in listings:
+                        listings[dir_path] = executor.submit(
+                            _list_dir,
+                            dir_path,
+                            recursive,
+                            stat,
+                            True)
+
+                dir_path = pending_dirs.pop()
+                files, dirs, error = listings.pop(dir_path).result()
+                if error:
+                    warn_unreadable_dir(dir_path, error)
+                pending_dirs.extend(reversed(dirs))
+                yield from files
+
+        finally:
+            for future in listings.values():
+                future.cancel()
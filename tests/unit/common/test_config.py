@@ -4,7 +4,7 @@ from unittest import mock
 import pytest
 
 import fu.common.config as config_module
-from fu.common.config import tmdb
+from fu.common.config import tmdb, viewer
 from fu.common.errors import ConfigError
 
 
@@ -89,4 +89,17 @@ class TestTmdbConfigAccess:
 
         assert tmdb("api_key") == "abc123"
         assert tmdb("api_key") == "abc123"
-        assert mock_read_config.call_count == 1
\ No newline at end of file
+        assert mock_read_config.call_count == 1
+
+class TestViewerConfigAccess:
+    @mock.patch("fu.common.config.config_file.read_config")
+    def test_viewer_returns_command(self, mock_read_config):
+        mock_read_config.return_value = {"viewer": {"command": "feh -Z"}}
+
+        assert viewer("command") == "feh -Z"
+
+    @mock.patch("fu.common.config.config_file.read_config")
+    def test_viewer_returns_none_when_key_missing(self, mock_read_config):
+        mock_read_config.return_value = {"viewer": {}}
+
+        assert viewer("command") is None
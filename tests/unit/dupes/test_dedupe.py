@@ -0,0 +1,134 @@
+import os
+import pytest
+
+from unittest import mock
+
+from fu.commands.dupes.dedupe import (
+    METHOD_AUTO,
+    METHOD_HARDLINK,
+    METHOD_REFLINK,
+    STATUS_DIFFERENT,
+    STATUS_FAILED,
+    STATUS_HARDLINKED,
+    STATUS_LINKED,
+    STATUS_MISSING,
+    STATUS_REFLINKED,
+    Deduplicator,
+    ReflinkUnsupportedError,
+    files_equal
+)
+from fu.commands.dupes.dupes import DupeGroup
+
+
+def _write(path, content: bytes):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(content)
+
+
+def _unsupported_reflink(src, dst):
+    raise ReflinkUnsupportedError(95, 'Operation not supported')
+
+
+def test_files_equal(tmp_path):
+    _write(tmp_path / 'a', b'x' * 10)
+    _write(tmp_path / 'b', b'x' * 10)
+    _write(tmp_path / 'c', b'x' * 9 + b'y')
+
+    assert files_equal(str(tmp_path / 'a'), str(tmp_path / 'b'), 3)
+    assert not files_equal(str(tmp_path / 'a'), str(tmp_path / 'c'), 3)
+
+
+class TestDeduplicator:
+    def test_hardlink(self, tmp_path):
+        _write(tmp_path / 'a.txt', b'same')
+        _write(tmp_path / 'sub' / 'b.txt', b'same')
+        group = DupeGroup(4, 'h', ['a.txt', 'sub/b.txt'])
+
+        results = list(Deduplicator(str(tmp_path), METHOD_HARDLINK).apply(
+            [group]))
+
+        assert [(r.name, r.status, r.size) for r in results] == \
+            [('sub/b.txt', STATUS_HARDLINKED, 4)]
+        assert os.path.samefile(tmp_path / 'a.txt', tmp_path / 'sub' / 'b.txt')
+        assert sorted(os.listdir(tmp_path / 'sub')) == ['b.txt']
+
+    def test_auto_falls_back_to_hardlink(self, tmp_path):
+        _write(tmp_path / 'a.txt', b'same')
+        _write(tmp_path / 'b.txt', b'same')
+        _write(tmp_path / 'c.txt', b'same')
+        group = DupeGroup(4, 'h', ['a.txt', 'b.txt', 'c.txt'])
+        deduplicator = Deduplicator(str(tmp_path), METHOD_AUTO)
+
+        with mock.patch(
+                'fu.commands.dupes.dedupe.reflink',
+                side_effect=_unsupported_reflink) as mock_reflink:
+            results = list(deduplicator.apply([group]))
+
+        assert [r.status for r in results] == [STATUS_HARDLINKED] * 2
+
+        # Not tried again on same device
+        assert mock_reflink.call_count == 1
+
+    def test_reflink_only_fails_when_unsupported(self, tmp_path):
+        _write(tmp_path / 'a.txt', b'same')
+        _write(tmp_path / 'b.txt', b'same')
+
+        with mock.patch(
+                'fu.commands.dupes.dedupe.reflink',
+                side_effect=_unsupported_reflink):
+            result = Deduplicator(str(tmp_path), METHOD_REFLINK).replace(
+                'a.txt',
+                'b.txt')
+
+        assert result.status == STATUS_FAILED
+        assert not os.path.samefile(tmp_path / 'a.txt', tmp_path / 'b.txt')
+        assert sorted(os.listdir(tmp_path)) == ['a.txt', 'b.txt']
+
+    def test_reflink_keeps_metadata(self, tmp_path):
+        _write(tmp_path / 'a.txt', b'same')
+        _write(tmp_path / 'b.txt', b'same')
+        os.chmod(tmp_path / 'b.txt', 0o600)
+        os.utime(tmp_path / 'b.txt', ns=(10 ** 9, 10 ** 9))
+
+        def fake_reflink(src, dst):
+            with open(src, 'rb') as src_file, open(dst, 'xb') as dst_file:
+                dst_file.write(src_file.read())
+
+        with mock.patch(
+                'fu.commands.dupes.dedupe.reflink',
+                side_effect=fake_reflink):
+            result = Deduplicator(str(tmp_path)).replace('a.txt', 'b.txt')
+
+        st = os.stat(tmp_path / 'b.txt')
+        assert result.status == STATUS_REFLINKED
+        assert (st.st_mode & 0o777, st.st_mtime_ns) == (0o600, 10 ** 9)
+        assert (tmp_path / 'b.txt').read_bytes() == b'same'
+
+    def test_skips_changed_missing_and_linked(self, tmp_path):
+        _write(tmp_path / 'a.txt', b'same')
+        _write(tmp_path / 'b.txt', b'diff')
+        os.link(tmp_path / 'a.txt', tmp_path / 'c.txt')
+        group = DupeGroup(4, 'h', ['a.txt', 'b.txt', 'c.txt', 'd.txt'])
+
+        results = list(Deduplicator(str(tmp_path), METHOD_HARDLINK).apply(
+            [group]))
+
+        assert [r.status for r in results] == \
+            [STATUS_DIFFERENT, STATUS_LINKED, STATUS_MISSING]
+        assert (tmp_path / 'b.txt').read_bytes() == b'diff'
+        assert sorted(os.listdir(tmp_path)) == ['a.txt', 'b.txt', 'c.txt']
+
+    def test_dry_run(self, tmp_path):
+        _write(tmp_path / 'a.txt', b'same')
+        _write(tmp_path / 'b.txt', b'same')
+
+        result = Deduplicator(str(tmp_path), METHOD_HARDLINK, True).replace(
+            'a.txt',
+            'b.txt')
+
+        assert (result.status, result.size) == (STATUS_HARDLINKED, 4)
+        assert not os.path.samefile(tmp_path / 'a.txt', tmp_path / 'b.txt')
+
+    def test_invalid_method(self, tmp_path):
+        with pytest.raises(ValueError):
+            Deduplicator(str(tmp_path), 'copy')
@@ -0,0 +1,74 @@
+import os
+
+from fu.commands.dupes.dupes import (
+    EDGE_SIZE,
+    find_duplicates,
+    read_dupes_file,
+    write_dupes_file
+)
+from fu.index.idx_format import read_names
+
+
+def _write(path, content: bytes):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(content)
+
+
+class TestFindDuplicates:
+    def test_find_duplicates(self, tmp_path):
+        big = os.urandom(EDGE_SIZE * 3)
+        same_edges = big[:EDGE_SIZE] + b'x' * EDGE_SIZE + big[-EDGE_SIZE:]
+
+        _write(tmp_path / 'a.bin', big)
+        _write(tmp_path / 'sub' / 'b.bin', big)
+        _write(tmp_path / 'c.bin', same_edges)
+        _write(tmp_path / 'd.txt', b'small')
+        _write(tmp_path / 'e.txt', b'small')
+        _write(tmp_path / 'f.txt', b'other')
+        _write(tmp_path / 'empty1', b'')
+        _write(tmp_path / 'empty2', b'')
+
+        stats = find_duplicates(str(tmp_path), recursive=True, workers=2)
+
+        assert [g.names for g in stats.groups] == [
+            ['a.bin', 'sub/b.bin'],
+            ['d.txt', 'e.txt']
+        ]
+        assert stats.scanned_files == 8
+        assert stats.full_files == 3
+        assert stats.reclaimable_bytes == len(big) + len(b'small')
+
+    def test_find_duplicates_non_recursive(self, tmp_path):
+        _write(tmp_path / 'a.txt', b'same')
+        _write(tmp_path / 'sub' / 'b.txt', b'same')
+
+        assert not find_duplicates(str(tmp_path)).groups
+
+    def test_find_duplicates_hard_links(self, tmp_path):
+        _write(tmp_path / 'a.txt', b'same')
+        os.link(tmp_path / 'a.txt', tmp_path / 'b.txt')
+        os.link(tmp_path / 'a.txt', tmp_path / 'c.txt')
+
+        assert not find_duplicates(str(tmp_path)).groups
+
+        _write(tmp_path / 'd.txt', b'same')
+        stats = find_duplicates(str(tmp_path), walk_workers=4)
+
+        assert [g.names for g in stats.groups] == [['a.txt', 'd.txt']]
+        assert stats.reclaimable_bytes == len(b'same')
+
+
+class TestDupesFile:
+    def test_dupes_file_roundtrip(self, tmp_path):
+        _write(tmp_path / 'a.txt', b'same')
+        _write(tmp_path / 'b.txt', b'same')
+        _write(tmp_path / 'c.txt', b'same')
+        groups = find_duplicates(str(tmp_path)).groups
+        output = str(tmp_path / 'dupes.txt')
+
+        write_dupes_file(output, str(tmp_path), groups)
+
+        assert list(read_dupes_file(output)) == groups
+
+        # Only redundant copies are listed for rm-indexed
+        assert list(read_names(output)) == ['b.txt', 'c.txt']
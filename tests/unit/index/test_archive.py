@@ -0,0 +1,61 @@
+import io
+import os
+import pytest
+import tarfile
+
+from fu.index.archive import (
+    ArchiveStats,
+    archive_entries,
+    is_archive_path
+)
+from fu.index.hashing import hash_file
+from fu.index.idx_format import IndexEntry
+
+
+def _write(path, content: bytes):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(content)
+
+
+def test_archive_entries(tmp_path):
+    _write(tmp_path / 'b.bin', os.urandom(3000))
+    _write(tmp_path / 'sub' / 'a.txt', b'a')
+    entries = [
+        IndexEntry('sub/a.txt'),
+        IndexEntry('missing'),
+        IndexEntry('b.bin')
+    ]
+    out_file = io.BytesIO()
+    stats = ArchiveStats()
+
+    archived = list(archive_entries(
+        entries,
+        str(tmp_path),
+        out_file,
+        'sha256',
+        stats))
+
+    assert [e.name for e in archived] == ['sub/a.txt', 'b.bin']
+    assert [e.hash for e in archived] == [
+        hash_file(str(tmp_path / 'sub' / 'a.txt'), 'sha256'),
+        hash_file(str(tmp_path / 'b.bin'), 'sha256')
+    ]
+    assert archived[1].size == 3000
+    assert (stats.files, stats.bytes, stats.missing) == (2, 3001, 1)
+
+    out_file.seek(0)
+    with tarfile.open(fileobj=out_file) as tar:
+        assert tar.getnames() == ['sub/a.txt', 'b.bin']
+        assert tar.extractfile('b.bin').read() == \
+            (tmp_path / 'b.bin').read_bytes()
+
+
+@pytest.mark.parametrize('path, expected', [
+    ('out.tar', True),
+    ('out.tar.gz', True),
+    ('OUT.TAR.XZ', True),
+    ('out.gz', False),
+    ('out.zip', False),
+])
+def test_is_archive_path(path, expected):
+    assert is_archive_path(path) == expected
@@ -0,0 +1,93 @@
+import os
+import pytest
+import tempfile
+
+from fu.index.bloom import (
+    BloomFilter,
+    BloomFormatError,
+    bloom_path,
+    load_sidecar
+)
+
+
+_NAMES = [f'photos/{ n }/img.jpg' for n in range(5000)]
+
+
+@pytest.fixture
+def tmp_dir():
+    """Temporary directory for test files
+    """
+    tmp_dir = tempfile.TemporaryDirectory()
+
+    yield tmp_dir.name
+
+    # Cleanup after usage
+    tmp_dir.cleanup()
+
+
+def _filter(fp_rate=0.01):
+    bloom = BloomFilter(len(_NAMES), fp_rate)
+    for name in _NAMES:
+        bloom.add(name)
+
+    return bloom
+
+
+class TestBloomFilter:
+    def test_no_false_negatives(self):
+        bloom = _filter()
+
+        assert len(bloom) == len(_NAMES)
+        assert all(name in bloom for name in _NAMES)
+
+    def test_false_positive_rate(self):
+        bloom = _filter(0.01)
+        others = [f'other/{ n }.txt' for n in range(20000)]
+
+        false_positives = sum(1 for name in others if name in bloom)
+        assert false_positives / len(others) < 0.02
+
+    def test_size(self):
+        # ~9.6 bits per name at 1% false positives
+        assert _filter(0.01).nbytes < len(_NAMES) * 1.3
+
+    def test_invalid_fp_rate(self):
+        with pytest.raises(ValueError):
+            BloomFilter(10, 1.5)
+
+    def test_save_and_load(self, tmp_dir):
+        path = os.path.join(tmp_dir, 'names.bloom')
+        bloom = _filter()
+        bloom.save(path, idx_size=123)
+
+        loaded, idx_size = BloomFilter.load(path)
+
+        assert idx_size == 123
+        assert len(loaded) == len(bloom)
+        assert all(name in loaded for name in _NAMES)
+
+    def test_load_invalid(self, tmp_dir):
+        path = os.path.join(tmp_dir, 'names.bloom')
+        with open(path, 'wb') as bloom_file:
+            bloom_file.write(b'not a filter')
+
+        with pytest.raises(BloomFormatError):
+            BloomFilter.load(path)
+
+
+class TestSidecar:
+    def test_stale_sidecar_ignored(self, tmp_dir):
+        idx = os.path.join(tmp_dir, 'idx.txt')
+        with open(idx, 'w') as idx_file:
+            idx_file.write('a\n')
+        _filter().save(bloom_path(idx), os.path.getsize(idx))
+
+        assert load_sidecar(idx) is not None
+
+        with open(idx, 'a') as idx_file:
+            idx_file.write('b\n')
+
+        assert load_sidecar(idx) is None
+
+    def test_missing_sidecar(self, tmp_dir):
+        assert load_sidecar(os.path.join(tmp_dir, 'idx.txt')) is None
@@ -0,0 +1,99 @@
+import os
+import pytest
+import tempfile
+
+from unittest import mock
+
+from fu.index import catalog as catalog_module
+from fu.index.catalog import Catalog
+from fu.index.idx_format import IndexEntry
+
+
+_ENTRIES = [
+    IndexEntry('IMG_001.jpg', 10),
+    IndexEntry('docs/report.pdf', 20),
+    IndexEntry('photos/holidays/beach.jpg', 30),
+    IndexEntry('photos/holidays/Holidays 100%.png', 40),
+    IndexEntry('photos/x.jpg', 50)
+]
+
+
+@pytest.fixture
+def catalog():
+    """Catalog backed by a temporary database
+    """
+    tmp_dir = tempfile.TemporaryDirectory()
+
+    with Catalog(os.path.join(tmp_dir.name, 'catalog.db')) as catalog:
+        yield catalog
+
+    # Cleanup after usage
+    tmp_dir.cleanup()
+
+
+def _paths(matches):
+    return sorted(match.path for match in matches)
+
+
+class TestCatalog:
+    def test_replace_root(self, catalog):
+        assert catalog.replace_root('/mnt/disk', _ENTRIES) == len(_ENTRIES)
+        assert catalog.replace_root('/mnt/disk', _ENTRIES[:2]) == 2
+
+        roots = catalog.roots()
+        assert [(r.path, r.files) for r in roots] == [('/mnt/disk', 2)]
+        assert _paths(catalog.search('beach')) == []
+
+    def test_replace_root_batches(self, catalog):
+        with mock.patch.object(catalog_module, 'CATALOG_BATCH_SIZE', 2):
+            assert catalog.replace_root('/mnt/disk', _ENTRIES) == \
+                len(_ENTRIES)
+
+        assert len(_paths(catalog.search('*'))) == len(_ENTRIES)
+
+    def test_search_substring(self, catalog):
+        catalog.replace_root('/mnt/disk', _ENTRIES)
+        catalog.replace_root('/mnt/other', [IndexEntry('a/holidays.txt')])
+
+        assert _paths(catalog.search('HOLIDAY')) == [
+            '/mnt/disk/photos/holidays/Holidays 100%.png',
+            '/mnt/other/a/holidays.txt'
+        ]
+        assert _paths(catalog.search('0%')) == [
+            '/mnt/disk/photos/holidays/Holidays 100%.png'
+        ]
+        assert _paths(catalog.search('x.')) == ['/mnt/disk/photos/x.jpg']
+
+    def test_search_glob(self, catalog):
+        catalog.replace_root('/mnt/disk', _ENTRIES)
+
+        assert _paths(catalog.search('*.jpg')) == [
+            '/mnt/disk/IMG_001.jpg',
+            '/mnt/disk/photos/holidays/beach.jpg',
+            '/mnt/disk/photos/x.jpg'
+        ]
+        assert _paths(catalog.search('?.jpg')) == ['/mnt/disk/photos/x.jpg']
+
+    def test_search_limit(self, catalog):
+        catalog.replace_root('/mnt/disk', _ENTRIES)
+        assert len(list(catalog.search('*', limit=2))) == 2
+
+    def test_remove_root(self, catalog):
+        catalog.replace_root('/mnt/disk', _ENTRIES)
+
+        assert catalog.remove_root('/mnt/disk')
+        assert not catalog.remove_root('/mnt/disk')
+        assert catalog.roots() == []
+        assert _paths(catalog.search('jpg')) == []
+
+    def test_failed_replace_keeps_previous_content(self, catalog):
+        catalog.replace_root('/mnt/disk', _ENTRIES)
+
+        def broken_entries():
+            yield IndexEntry('new.jpg')
+            raise OSError('Index read failed')
+
+        with pytest.raises(OSError):
+            catalog.replace_root('/mnt/disk', broken_entries())
+
+        assert len(_paths(catalog.search('*'))) == len(_ENTRIES)
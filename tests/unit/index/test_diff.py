@@ -0,0 +1,152 @@
+import pytest
+
+from unittest import mock
+
+from fu.index.diff import (
+    STATUS_ADDED,
+    STATUS_CHANGED,
+    STATUS_MOVED,
+    STATUS_REMOVED,
+    IndexChange,
+    collapse_moves,
+    diff_entries,
+    diff_indexes,
+    match_moves
+)
+from fu.index.idx_format import (
+    FORMAT_PLAIN,
+    FORMAT_TSV,
+    IndexEntry,
+    IndexNotSortedError,
+    IndexWriter
+)
+
+
+def _entries(*specs):
+    return [IndexEntry(name, size, mtime, 1) for name, size, mtime in specs]
+
+
+class TestDiffEntries:
+    def test_diff_two_snapshots(self):
+        old = _entries(('a', 1, 1), ('b', 1, 1), ('c', 1, 1))
+        new = _entries(('b', 1, 1), ('c', 2, 1), ('d', 1, 1))
+
+        changes = [(c.status, c.name, c.snapshot) for c in diff_entries(old, new)]
+
+        assert changes == [
+            (STATUS_REMOVED, 'a', 1),
+            (STATUS_CHANGED, 'c', 1),
+            (STATUS_ADDED, 'd', 1)
+        ]
+
+    def test_diff_many_snapshots(self):
+        day1 = _entries(('a', 1, 1), ('b', 1, 1))
+        day2 = _entries(('a', 1, 2), ('c', 1, 1))
+        day3 = _entries(('b', 1, 1), ('c', 1, 1))
+
+        changes = [
+            (c.status, c.name, c.snapshot)
+            for c in diff_entries(day1, day2, day3)
+        ]
+
+        assert changes == [
+            (STATUS_CHANGED, 'a', 1),
+            (STATUS_REMOVED, 'a', 2),
+            (STATUS_REMOVED, 'b', 1),
+            (STATUS_ADDED, 'b', 2),
+            (STATUS_ADDED, 'c', 1)
+        ]
+
+    def test_diff_plain_entries_never_changed(self):
+        changes = list(diff_entries([IndexEntry('a')], [IndexEntry('a')]))
+        assert changes == []
+
+    def test_diff_prefers_hash(self):
+        old = [IndexEntry('a', 1, 1, 1, 'sha256:00')]
+        new = [IndexEntry('a', 1, 2, 1, 'sha256:00')]
+
+        assert list(diff_entries(old, new)) == []
+
+    def test_diff_consumes_iterators(self):
+        old = iter(_entries(('a', 1, 1)))
+        new = iter(_entries(('b', 1, 1)))
+
+        assert [c.status for c in diff_entries(old, new)] == \
+            [STATUS_REMOVED, STATUS_ADDED]
+
+
+class TestMoves:
+    def test_match_moves_by_inode_and_size(self):
+        removed = [IndexEntry('a', 10, 1, 1), IndexEntry('b', 10, 1, 2)]
+        added = [
+            IndexEntry('x/b', 10, 1, 2),
+            IndexEntry('x/a', 11, 1, 1),
+            IndexEntry('plain')
+        ]
+
+        assert [(o.name, n.name) for o, n in match_moves(removed, added)] \
+            == [('b', 'x/b')]
+
+    def test_match_moves_hash_tie_break(self):
+        removed = [
+            IndexEntry('a', 10, 1, 1, 'sha256:aa'),
+            IndexEntry('b', 10, 1, 1, 'sha256:bb')
+        ]
+        added = [IndexEntry('x/b', 10, 1, 1)]
+        hash_of = mock.Mock(return_value='sha256:bb')
+
+        moves = list(match_moves(removed, added, hash_of))
+
+        assert [(o.name, n.name) for o, n in moves] == [('b', 'x/b')]
+        hash_of.assert_called_once_with(added[0], 'sha256')
+
+    def test_match_moves_different_hash(self):
+        removed = [IndexEntry('a', 10, 1, 1, 'sha256:aa')]
+        added = [IndexEntry('x/a', 10, 1, 1, 'sha256:bb')]
+
+        assert list(match_moves(removed, added)) == []
+
+    def test_collapse_moves(self):
+        old = [IndexEntry('a', 1, 1, 7), IndexEntry('b', 1, 1, 8)]
+        new = [IndexEntry('c', 2, 1, 9), IndexEntry('z/a', 1, 1, 7)]
+
+        changes = [
+            (c.status, c.name, c.old and c.old.name)
+            for c in collapse_moves(diff_entries(old, new))
+        ]
+
+        assert changes == [
+            (STATUS_REMOVED, 'b', 'b'),
+            (STATUS_ADDED, 'c', None),
+            (STATUS_MOVED, 'z/a', 'a')
+        ]
+
+
+class TestDiffIndexes:
+    def _write(self, path, fmt, entries):
+        with IndexWriter(str(path), fmt) as idx_writer:
+            for entry in entries:
+                idx_writer.write(entry)
+
+    def test_diff_indexes_mixed_formats(self, tmp_path):
+        self._write(tmp_path / 'old.txt', FORMAT_PLAIN, _entries(('a', 1, 1)))
+        self._write(tmp_path / 'new.tsv', FORMAT_TSV, _entries(('b', 1, 1)))
+
+        changes = list(diff_indexes(
+            [str(tmp_path / 'old.txt'), str(tmp_path / 'new.tsv')]))
+
+        assert changes == [
+            IndexChange(STATUS_REMOVED, 'a', 1, IndexEntry('a'), None),
+            IndexChange(STATUS_ADDED, 'b', 1, None, IndexEntry('b', 1, 1, 1))
+        ]
+
+    def test_diff_indexes_not_sorted(self, tmp_path):
+        self._write(tmp_path / 'a.txt', FORMAT_PLAIN, _entries(('a', 1, 1)))
+        self._write(
+            tmp_path / 'b.txt',
+            FORMAT_PLAIN,
+            _entries(('b', 1, 1), ('a', 1, 1)))
+
+        with pytest.raises(IndexNotSortedError):
+            list(diff_indexes(
+                [str(tmp_path / 'a.txt'), str(tmp_path / 'b.txt')]))
@@ -0,0 +1,59 @@
+import pytest
+
+from fu.index.du import DirUsage, dir_usage, format_size, top_usage
+from fu.index.idx_format import IndexEntry
+
+
+_ENTRIES = [
+    IndexEntry('a.txt', 1),
+    IndexEntry('b/c/d.txt', 10),
+    IndexEntry('b/c/e.txt', 20),
+    IndexEntry('b/f.txt', 100),
+    IndexEntry('b-c/g.txt', 1000),
+    IndexEntry('b.txt', 2),
+    IndexEntry('x/y/z/w.txt', 5),
+]
+
+
+def _sorted_entries():
+    return sorted(_ENTRIES, key=lambda e: e.name)
+
+
+def test_dir_usage():
+    assert list(dir_usage(_sorted_entries())) == [
+        DirUsage('b-c', 1000, 1, 1),
+        DirUsage('b/c', 30, 2, 2),
+        DirUsage('b', 130, 3, 1),
+        DirUsage('x/y/z', 5, 1, 3),
+        DirUsage('x/y', 5, 1, 2),
+        DirUsage('x', 5, 1, 1),
+        DirUsage('.', 1138, 7, 0),
+    ]
+
+
+def test_dir_usage_max_depth():
+    usages = dir_usage(_sorted_entries(), max_depth=1)
+
+    assert [(u.path, u.size) for u in usages] == \
+        [('b-c', 1000), ('b', 130), ('x', 5), ('.', 1138)]
+
+
+def test_top_usage():
+    usages = top_usage(dir_usage(_sorted_entries()), 2)
+
+    assert [u.path for u in usages] == ['.', 'b-c']
+
+
+def test_dir_usage_requires_sizes():
+    with pytest.raises(ValueError):
+        list(dir_usage([IndexEntry('a.txt')]))
+
+
+@pytest.mark.parametrize('size, expected', [
+    (0, '0B'),
+    (1023, '1023B'),
+    (1536, '1.5K'),
+    (3 * 1024 ** 3, '3.0G'),
+])
+def test_format_size(size, expected):
+    assert format_size(size) == expected
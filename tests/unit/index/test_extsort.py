@@ -0,0 +1,63 @@
+import random
+
+from fu.index.extsort import ExternalSorter
+
+
+class TestExternalSorter:
+    def test_sorted_in_memory(self):
+        lines = ['c', 'a', 'b']
+
+        with ExternalSorter() as sorter:
+            for line in lines:
+                sorter.add(line)
+
+            assert list(sorter.sorted()) == ['a', 'b', 'c']
+            assert sorter.runs_count == 0
+            assert len(sorter) == 3
+
+    def test_sorted_spilling_runs(self):
+        lines = [f'file-{ i }.jpg' for i in range(5000)]
+        random.shuffle(lines)
+
+        with ExternalSorter(mem_budget=4096) as sorter:
+            for line in lines:
+                sorter.add(line)
+
+            assert sorter.runs_count > 1
+            assert list(sorter.sorted()) == sorted(lines)
+
+    def test_sorted_packed_in_memory_runs(self):
+        lines = [f'photos/2020/file-{ i }.jpg' for i in range(5000)]
+        random.shuffle(lines)
+
+        # Raw strings exceed budget, front coded runs don't
+        with ExternalSorter(mem_budget=200 * 1024) as sorter:
+            for line in lines:
+                sorter.add(line)
+
+            assert sorter.runs_count == 0
+            assert list(sorter.sorted()) == sorted(lines)
+
+    def test_sorted_many_runs_multi_pass_merge(self, monkeypatch):
+        monkeypatch.setattr('fu.index.extsort.MAX_FAN_IN', 3)
+        lines = [str(i) for i in range(1000)]
+        random.shuffle(lines)
+
+        with ExternalSorter(mem_budget=512) as sorter:
+            for line in lines:
+                sorter.add(line)
+
+            assert list(sorter.sorted()) == sorted(lines)
+
+    def test_sorted_with_key_and_special_chars(self):
+        lines = ['b\tx', 'line\nbreak\t1', 'a\t2', 'ñandú\t3']
+
+        with ExternalSorter(
+            mem_budget=1,
+            key=lambda line: line.split('\t', 1)[0]
+        ) as sorter:
+            for line in lines:
+                sorter.add(line)
+
+            assert list(sorter.sorted()) == \
+                ['a\t2', 'b\tx', 'line\nbreak\t1', 'ñandú\t3']
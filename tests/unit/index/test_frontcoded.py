@@ -0,0 +1,64 @@
+import bisect
+import pytest
+
+from fu.index.frontcoded import FrontCodedList
+
+
+_NAMES = sorted(
+    [f'photos/{ year }/img_{ n }.jpg' for year in range(2000, 2010)
+        for n in range(40)]
+    + ['', 'a', 'ñandú/x.mp4', 'raw-\udcff.bin', 'z' * 300]
+)
+
+
+class TestFrontCodedList:
+    def test_iter_and_len(self):
+        names = FrontCodedList(_NAMES)
+
+        assert len(names) == len(_NAMES)
+        assert list(names) == _NAMES
+
+    def test_getitem(self):
+        names = FrontCodedList(_NAMES, block_size=7)
+
+        for idx, name in enumerate(_NAMES):
+            assert names[idx] == name
+        assert names[-1] == _NAMES[-1]
+
+        with pytest.raises(IndexError):
+            names[len(_NAMES)]
+
+    @pytest.mark.parametrize('block_size', [1, 4, 16])
+    def test_bisect_and_contains(self, block_size):
+        names = FrontCodedList(_NAMES, block_size=block_size)
+        queries = _NAMES + [
+            'photos/', 'photos/2005/img_3', 'b', 'zz', '~', 'photos/2009/z'
+        ]
+
+        for query in queries:
+            assert names.bisect_left(query) == \
+                bisect.bisect_left(_NAMES, query)
+            assert (query in names) == (query in _NAMES)
+
+    def test_empty(self):
+        names = FrontCodedList()
+
+        assert len(names) == 0
+        assert list(names) == []
+        assert 'a' not in names
+        assert names.bisect_left('a') == 0
+
+    def test_unsorted_names(self):
+        with pytest.raises(ValueError):
+            FrontCodedList(['b', 'a'])
+
+    def test_key(self):
+        lines = ['a\tz', 'b\ta', 'c\t0']
+        names = FrontCodedList(lines, key=lambda line: line.split('\t')[0])
+
+        assert list(names) == lines
+        assert names.bisect_left('b\t') == 1
+
+    def test_smaller_than_strings(self):
+        names = FrontCodedList(_NAMES)
+        assert names.nbytes < sum(len(name) for name in _NAMES)
@@ -0,0 +1,62 @@
+import hashlib
+import pytest
+
+from fu.index.hashing import (
+    HashAlgorithmError,
+    ParallelHasher,
+    hash_file
+)
+from fu.index.idx_format import IndexEntry
+
+
+@pytest.fixture
+def files_dir(tmp_path):
+    """Directory with a few files of different sizes
+    """
+    for idx in range(10):
+        (tmp_path / f'{ idx }.bin').write_bytes(bytes([idx]) * (idx * 5000))
+
+    return tmp_path
+
+
+class TestHashFile:
+    @pytest.mark.parametrize('algorithm', ['blake2b', 'sha256'])
+    def test_hash_file(self, files_dir, algorithm):
+        content = (files_dir / '3.bin').read_bytes()
+        expected = hashlib.new(algorithm, content).hexdigest()
+
+        assert hash_file(str(files_dir / '3.bin'), algorithm, 1024) == \
+            f'{ algorithm }:{ expected }'
+
+    def test_hash_file_invalid_algorithm(self, files_dir):
+        with pytest.raises(HashAlgorithmError):
+            hash_file(str(files_dir / '3.bin'), 'md5')
+
+
+class TestParallelHasher:
+    def test_hash_entries_keeps_order(self, files_dir):
+        entries = [IndexEntry(f'{ idx }.bin') for idx in range(10)]
+        hasher = ParallelHasher('sha256', workers=3, per_device=1)
+
+        hashed = list(hasher.hash_entries(iter(entries), str(files_dir)))
+
+        assert [e.name for e in hashed] == [e.name for e in entries]
+        for entry in hashed:
+            assert entry.hash == hash_file(
+                str(files_dir / entry.name), 'sha256')
+
+        assert hasher.stats.files == 10
+        assert hasher.stats.bytes == sum(idx * 5000 for idx in range(10))
+
+    def test_hash_entries_skips_hashed_and_missing(self, files_dir):
+        entries = [
+            IndexEntry('1.bin', hash='sha256:00'),
+            IndexEntry('missing.bin')
+        ]
+        hasher = ParallelHasher('sha256')
+
+        hashed = list(hasher.hash_entries(entries, str(files_dir)))
+
+        assert hashed == entries
+        assert hasher.stats.files == 0
+        assert hasher.stats.errors == 1
@@ -0,0 +1,141 @@
+import os
+import pytest
+
+from unittest import mock
+
+from fu.commands.history.commands import HistoryShowCmd
+from fu.index import history
+from fu.index.diff import STATUS_ADDED, STATUS_CHANGED, STATUS_REMOVED
+from fu.index.history import HistoryError, HistoryStore
+from fu.index.idx_format import IndexEntry
+
+
+_SNAPSHOTS = [
+    ['a.txt', 'b.txt', 'c.txt'],
+    ['a.txt', 'c.txt', 'd.txt'],
+    ['a.txt', 'b.txt', 'c.txt', 'd.txt'],
+    ['b.txt', 'c.txt'],
+    ['b.txt', 'c.txt', 'e.txt'],
+]
+
+
+def _entries(names, size=1):
+    return [IndexEntry(name, size, 1, 1) for name in names]
+
+
+def _names(entries):
+    return [entry.name for entry in entries]
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = HistoryStore(str(tmp_path / 'history'), checkpoint_interval=3)
+    for names in _SNAPSHOTS:
+        store.add(_entries(names), f'{ len(store.snapshots) }')
+
+    return store
+
+
+class TestHistoryStore:
+    def test_rebuild_snapshots(self, store):
+        for snapshot_id, names in enumerate(_SNAPSHOTS):
+            assert _names(store.entries(snapshot_id)) == names
+
+    def test_snapshots_stored_as_deltas(self, store):
+        assert [s.full for s in store.snapshots] == \
+            [True, False, False, True, False]
+        assert [(s.added, s.removed, s.files) for s in store.snapshots] == \
+            [(3, 0, 3), (1, 1, 3), (1, 0, 4), (0, 2, 2), (1, 0, 3)]
+        assert sorted(os.listdir(store.path)) == [
+            'delta-00001.tsv.gz',
+            'delta-00001.tsv.gz.bloom',
+            'delta-00002.tsv.gz',
+            'delta-00002.tsv.gz.bloom',
+            'delta-00003.tsv.gz',
+            'delta-00003.tsv.gz.bloom',
+            'delta-00004.tsv.gz',
+            'delta-00004.tsv.gz.bloom',
+            'full-00000.tsv.gz',
+            'full-00000.tsv.gz.bloom',
+            'full-00003.tsv.gz',
+            'full-00003.tsv.gz.bloom',
+            'history.json'
+        ]
+
+    def test_reopen(self, store):
+        reopened = HistoryStore(store.path)
+
+        assert reopened.snapshots == store.snapshots
+        assert _names(reopened.entries(4)) == _SNAPSHOTS[4]
+
+    def test_reopen_keeps_checkpoint_interval(self, store):
+        # Second add without interval, as 'index-history add' does
+        reopened = HistoryStore(store.path)
+        reopened.add(_entries(['a.txt']), '5')
+        reopened.add(_entries(['a.txt', 'b.txt']), '6')
+
+        assert reopened.checkpoint_interval == 3
+        assert [s.full for s in reopened.snapshots[5:]] == [False, True]
+
+    def test_reopen_with_other_checkpoint_interval(self, store):
+        with pytest.raises(HistoryError):
+            HistoryStore(store.path, checkpoint_interval=10)
+
+        assert HistoryStore(store.path, 3).checkpoint_interval == 3
+
+    def test_changed_entries(self, store):
+        store.add(_entries(['b.txt', 'c.txt', 'e.txt'], size=2), 'changed')
+
+        assert store.snapshots[-1].changed == 3
+        assert [e.size for e in store.entries(5)] == [2, 2, 2]
+        assert list(store.file_log('e.txt'))[-1].status == STATUS_CHANGED
+
+    def test_file_log(self, store):
+        events = list(store.file_log('b.txt'))
+
+        assert [(e.snapshot.id, e.status) for e in events] == [
+            (0, STATUS_ADDED),
+            (1, STATUS_REMOVED),
+            (2, STATUS_ADDED),
+        ]
+
+    def test_metadata_only_change(self, tmp_path):
+        store = HistoryStore(str(tmp_path / 'history'))
+        store.add([IndexEntry('a', 1, 100, 5, 'sha256:aa')], '0')
+        store.add([IndexEntry('a', 1, 999, 7, 'sha256:aa')], '1')
+
+        assert list(store.entries(1)) == \
+            [IndexEntry('a', 1, 999, 7, 'sha256:aa')]
+        assert store.snapshots[1].changed == 0
+        assert [e.status for e in store.file_log('a')] == [STATUS_ADDED]
+
+    def test_file_log_skips_filtered_deltas(self, store):
+        with mock.patch(
+                'fu.index.history._read_delta_file',
+                wraps=history._read_delta_file) as mock_read:
+            events = list(store.file_log('e.txt'))
+
+        assert [(e.snapshot.id, e.status) for e in events] == \
+            [(4, STATUS_ADDED)]
+        assert mock_read.call_count < len(store.snapshots) - 1
+
+    def test_missing_snapshot(self, store):
+        with pytest.raises(HistoryError):
+            store.entries(5)
+
+
+class TestHistoryShowCmd:
+    def test_removes_partial_output(self, store, tmp_path):
+        output = str(tmp_path / 'snapshot.tsv')
+        logger = mock.Mock()
+
+        def entries_then_fail(snapshot_id):
+            yield from _entries(['a.txt'])
+            raise HistoryError('Corrupt delta')
+
+        with mock.patch.object(
+                HistoryStore, 'entries', side_effect=entries_then_fail):
+            HistoryShowCmd(store.path, 1, output, logger).execute()
+
+        assert not os.path.exists(output)
+        logger.error.assert_called_once_with('Corrupt delta')
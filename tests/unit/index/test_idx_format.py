@@ -0,0 +1,129 @@
+import os
+import pytest
+import tempfile
+
+from fu.index.idx_format import (
+    FORMAT_BIN,
+    FORMAT_PLAIN,
+    FORMAT_TSV,
+    IndexEntry,
+    IndexFormatError,
+    IndexWriter,
+    detect_format,
+    format_tsv_line,
+    parse_tsv_line,
+    read_entries,
+    read_names
+)
+
+
+_ENTRIES = [
+    IndexEntry('#hash.txt', 10, 1700000000000000000, 11),
+    IndexEntry('a\tb\\c.jpg', 0, 1, 12, 'sha256:' + 'ab' * 32),
+    IndexEntry('sub/ñandú.mp4', 2 ** 40, 2, 13, 'blake2b:' + 'cd' * 64)
+]
+
+
+@pytest.fixture
+def tmp_idx():
+    """Path for a temporary index file
+    """
+    tmp_dir = tempfile.TemporaryDirectory()
+
+    yield os.path.join(tmp_dir.name, 'idx')
+
+    # Cleanup after usage
+    tmp_dir.cleanup()
+
+
+class TestTsvLine:
+    def test_tsv_line_roundtrip(self):
+        for entry in _ENTRIES:
+            assert parse_tsv_line(format_tsv_line(entry)) == entry
+
+    def test_tsv_line_name_only(self):
+        entry = IndexEntry('file.txt')
+        assert format_tsv_line(entry) == 'file.txt\t\t\t\t'
+        assert parse_tsv_line(format_tsv_line(entry)) == entry
+
+    def test_tsv_line_invalid(self):
+        with pytest.raises(IndexFormatError):
+            parse_tsv_line('file.txt\t10')
+
+    def test_tsv_line_invalid_number(self):
+        with pytest.raises(IndexFormatError, match='line 7'):
+            parse_tsv_line('file.txt\tten\t1\t1\t', 7)
+
+
+class TestIndexFiles:
+    @pytest.mark.parametrize('fmt', [FORMAT_TSV, FORMAT_BIN])
+    def test_rich_formats_roundtrip(self, tmp_idx, fmt):
+        with IndexWriter(tmp_idx, fmt, ['Index for /tmp']) as idx_writer:
+            for entry in _ENTRIES:
+                idx_writer.write(entry)
+
+        assert detect_format(tmp_idx) == fmt
+        assert list(read_entries(tmp_idx)) == _ENTRIES
+
+    def test_bin_format_64_bits_inode(self, tmp_idx):
+        entries = [
+            IndexEntry('a.txt', 1, 1, 2 ** 64 - 2),
+            IndexEntry('b.txt', 1, 1, 2 ** 63),
+            IndexEntry('c.txt')
+        ]
+        with IndexWriter(tmp_idx, FORMAT_BIN, ['Index']) as idx_writer:
+            for entry in entries:
+                idx_writer.write(entry)
+
+        assert list(read_entries(tmp_idx)) == entries
+
+    def test_tsv_index_invalid_number(self, tmp_idx):
+        with IndexWriter(tmp_idx, FORMAT_TSV, ['Index']) as idx_writer:
+            idx_writer.write(IndexEntry('a.txt', 1, 1, 1))
+        with open(tmp_idx, 'a') as idx_file:
+            idx_file.write('b.txt\t1\tnot-a-time\t1\t\n')
+
+        with pytest.raises(IndexFormatError, match='b.txt'):
+            list(read_entries(tmp_idx))
+
+    def test_plain_format(self, tmp_idx):
+        with IndexWriter(tmp_idx, FORMAT_PLAIN, ['Index']) as idx_writer:
+            idx_writer.write(IndexEntry('a.txt', 1, 1, 1))
+
+        assert detect_format(tmp_idx) == FORMAT_PLAIN
+        assert list(read_entries(tmp_idx)) == [IndexEntry('a.txt')]
+
+    def test_legacy_plain_index(self, tmp_idx):
+        with open(tmp_idx, 'w') as idx_file:
+            idx_file.write('# Index for /tmp \n# 2 file(s) indexed: \n\n')
+            idx_file.write('a.txt\n\nb.txt\n')
+
+        assert list(read_names(tmp_idx)) == ['a.txt', 'b.txt']
+
+    def test_writer_does_not_overwrite(self, tmp_idx):
+        open(tmp_idx, 'w').close()
+
+        with pytest.raises(FileExistsError):
+            with IndexWriter(tmp_idx, FORMAT_TSV):
+                pass
+
+
+class TestCompressedIndex:
+    @pytest.mark.parametrize('ext', ['.gz', '.xz', '.bz2'])
+    @pytest.mark.parametrize('fmt', [FORMAT_TSV, FORMAT_BIN])
+    def test_compressed_roundtrip(self, tmp_idx, fmt, ext):
+        idx = tmp_idx + ext
+        with IndexWriter(idx, fmt, ['Compressed']) as writer:
+            for entry in _ENTRIES:
+                writer.write(entry)
+
+        assert detect_format(idx) == fmt
+        assert list(read_names(idx)) == [e.name for e in _ENTRIES]
+
+    def test_compressed_on_disk(self, tmp_idx):
+        idx = tmp_idx + '.gz'
+        with IndexWriter(idx, FORMAT_TSV) as writer:
+            writer.write(_ENTRIES[0])
+
+        with open(idx, 'rb') as idx_file:
+            assert idx_file.read(2) == b'\x1f\x8b'
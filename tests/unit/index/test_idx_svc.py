@@ -0,0 +1,458 @@
+import os
+import pytest
+import shutil
+import tarfile
+import tempfile
+import uuid
+
+from dataclasses import replace
+from pathlib import Path
+from unittest import mock
+
+from fu.index import idx_svc
+from fu.index.hashing import hash_file
+from fu.index.idx_format import (
+    FORMAT_TSV,
+    IndexEntry,
+    IndexWriter,
+    read_entries
+)
+from fu.index.query import QueryFilter
+from fu.index.verify import VerifyCheckpoint
+
+
+@pytest.fixture
+def tmp_dir():
+    """Creates a temporary unique directory
+    """
+    tmp_dir = os.path.join(tempfile.gettempdir(), str(uuid.uuid4()))
+    Path(tmp_dir).mkdir(parents=True, exist_ok=True)
+
+    yield tmp_dir
+
+    # Cleanup after usage
+    shutil.rmtree(tmp_dir)
+
+
+def _create_files(base_dir, rel_paths):
+    for rel_path in rel_paths:
+        file_path = os.path.join(base_dir, rel_path)
+        Path(file_path).parent.mkdir(parents=True, exist_ok=True)
+        Path(file_path).write_text(rel_path)
+
+
+def _index_lines(idx_path):
+    with open(idx_path) as idx_file:
+        return [
+            line.strip('\n') for line in idx_file
+            if line.strip() and not line.startswith('#')
+        ]
+
+
+class TestIndexDir:
+    def test_index_dir_direct_children(self, tmp_dir):
+        _create_files(tmp_dir, ['b.txt', 'a.txt', 'sub/c.txt'])
+        output = os.path.join(tmp_dir, 'out', 'idx.txt')
+        os.makedirs(os.path.dirname(output))
+
+        idx_svc.index_dir(tmp_dir, output)
+
+        assert _index_lines(output) == ['a.txt', 'b.txt']
+
+    def test_index_dir_recursive(self, tmp_dir):
+        src_dir = os.path.join(tmp_dir, 'src')
+        _create_files(src_dir, ['b.txt', 'a.txt', 'sub/c.txt', 'sub/x/d.txt'])
+        output = os.path.join(tmp_dir, 'idx.txt')
+
+        idx_svc.index_dir(src_dir, output, recursive=True, mem_budget=128)
+
+        assert _index_lines(output) == \
+            ['a.txt', 'b.txt', 'sub/c.txt', 'sub/x/d.txt']
+
+    def test_index_dir_parallel_walk(self, tmp_dir):
+        src_dir = os.path.join(tmp_dir, 'src')
+        _create_files(src_dir, ['b.txt', 'a.txt', 'sub/c.txt', 'sub/x/d.txt'])
+        output = os.path.join(tmp_dir, 'idx.tsv')
+
+        idx_svc.index_dir(
+            src_dir,
+            output,
+            recursive=True,
+            fmt='tsv',
+            walk_workers=4)
+
+        assert [e.name for e in read_entries(output)] == \
+            ['a.txt', 'b.txt', 'sub/c.txt', 'sub/x/d.txt']
+
+    def test_index_dir_existent_output(self, tmp_dir):
+        _create_files(tmp_dir, ['a.txt'])
+        output = os.path.join(tmp_dir, 'a.txt')
+
+        idx_svc.index_dir(tmp_dir, output)
+
+        assert Path(output).read_text() == 'a.txt'
+
+
+class TestIndexDeletedFrom:
+    def _write_index(self, idx_path, names):
+        with open(idx_path, 'w') as idx_file:
+            idx_file.write('# Index\n\n')
+            for name in names:
+                idx_file.write(f'{ name }\n')
+
+    def test_index_deleted_from(self, tmp_dir):
+        src_dir = os.path.join(tmp_dir, 'src')
+        _create_files(src_dir, ['a.txt', 'c.txt', 'sub/d.txt'])
+        idx = os.path.join(tmp_dir, 'idx.txt')
+        output = os.path.join(tmp_dir, 'removed.txt')
+        self._write_index(
+            idx,
+            ['a.txt', 'b.txt', 'c.txt', 'sub/d.txt', 'sub/e.txt'])
+
+        with mock.patch('fu.index.idx_svc.os.path.exists',
+                        wraps=os.path.exists) as mock_exists:
+            idx_svc.index_deleted_from(src_dir, idx, output)
+
+            # Only nested names are verified one by one
+            verified = [
+                c.args[0] for c in mock_exists.call_args_list
+                if c.args[0].startswith(os.path.join(src_dir, ''))
+            ]
+            assert verified == [
+                os.path.join(src_dir, 'sub/d.txt'),
+                os.path.join(src_dir, 'sub/e.txt')
+            ]
+
+        assert _index_lines(output) == ['b.txt', 'sub/e.txt']
+
+    def test_index_deleted_from_merges_sorted_listing(self, tmp_dir):
+        _create_files(tmp_dir, ['b.txt', 'd.txt', 'e.txt'])
+        idx = os.path.join(tmp_dir, 'idx.txt')
+        output = os.path.join(tmp_dir, 'removed.txt')
+        self._write_index(idx, ['a.txt', 'b.txt', 'c.txt', 'e.txt', 'f.txt'])
+
+        # Sorted names never fall back to a search of the listing
+        with mock.patch(
+                'fu.index.idx_svc.FrontCodedList.__contains__',
+                side_effect=AssertionError):
+            idx_svc.index_deleted_from(tmp_dir, idx, output)
+
+        assert _index_lines(output) == ['a.txt', 'c.txt', 'f.txt']
+
+    def test_index_deleted_from_unsorted_index(self, tmp_dir):
+        _create_files(tmp_dir, ['b.txt', 'd.txt'])
+        idx = os.path.join(tmp_dir, 'idx.txt')
+        output = os.path.join(tmp_dir, 'removed.txt')
+        self._write_index(idx, ['d.txt', 'c.txt', 'b.txt', 'a.txt'])
+
+        idx_svc.index_deleted_from(tmp_dir, idx, output)
+
+        assert _index_lines(output) == ['a.txt', 'c.txt']
+
+    def test_index_deleted_from_nothing_removed(self, tmp_dir):
+        _create_files(tmp_dir, ['a.txt'])
+        idx = os.path.join(tmp_dir, 'idx.txt')
+        output = os.path.join(tmp_dir, 'removed.txt')
+        self._write_index(idx, ['a.txt'])
+
+        idx_svc.index_deleted_from(tmp_dir, idx, output)
+
+        assert not os.path.exists(output)
+
+    def test_index_deleted_from_detect_moves(self, tmp_dir):
+        src_dir = os.path.join(tmp_dir, 'src')
+        _create_files(src_dir, ['a.txt', 'b.txt', 'sub/c.txt'])
+        idx = os.path.join(tmp_dir, 'idx.tsv')
+        output = os.path.join(tmp_dir, 'removed.txt')
+        idx_svc.index_dir(src_dir, idx, recursive=True, fmt=FORMAT_TSV)
+
+        os.rename(
+            os.path.join(src_dir, 'a.txt'),
+            os.path.join(src_dir, 'sub', 'a.txt'))
+        os.remove(os.path.join(src_dir, 'b.txt'))
+
+        idx_svc.index_deleted_from(src_dir, idx, output, detect_moves=True)
+
+        assert _index_lines(output) == ['b.txt']
+        with open(output) as idx_file:
+            assert '# moved\ta.txt\tsub/a.txt\n' in idx_file.readlines()
+
+
+class TestIndexDirHashes:
+    def test_index_dir_hashes(self, tmp_dir):
+        src_dir = os.path.join(tmp_dir, 'src')
+        _create_files(src_dir, ['a.txt', 'sub/b.txt'])
+        output = os.path.join(tmp_dir, 'idx.tsv')
+
+        idx_svc.index_dir(
+            src_dir,
+            output,
+            recursive=True,
+            hash_algorithm='sha256')
+
+        entries = list(read_entries(output))
+        assert [e.name for e in entries] == ['a.txt', 'sub/b.txt']
+        assert entries[0].hash == \
+            hash_file(os.path.join(src_dir, 'a.txt'), 'sha256')
+
+    def test_index_dir_update_reuses_unchanged_hashes(self, tmp_dir):
+        src_dir = os.path.join(tmp_dir, 'src')
+        _create_files(src_dir, ['a.txt', 'b.txt'])
+        prev_idx = os.path.join(tmp_dir, 'prev.tsv')
+        output = os.path.join(tmp_dir, 'idx.tsv')
+
+        # Previous index with fake hashes, reused ones will be kept
+        with IndexWriter(prev_idx, FORMAT_TSV) as idx_writer:
+            for name in ['a.txt', 'b.txt']:
+                st = os.stat(os.path.join(src_dir, name))
+                idx_writer.write(replace(
+                    IndexEntry.from_stat(name, st),
+                    hash='sha256:fake'))
+
+        Path(os.path.join(src_dir, 'b.txt')).write_text('modified')
+        idx_svc.index_dir(src_dir, output, update=prev_idx)
+
+        entries = list(read_entries(output))
+        assert entries[0].hash == 'sha256:fake'
+        assert entries[1].hash == \
+            hash_file(os.path.join(src_dir, 'b.txt'), 'sha256')
+
+
+class TestRemoveIndexed:
+    def _write_index(self, idx_path, names):
+        with open(idx_path, 'w') as idx_file:
+            idx_file.write('# Index\n\n')
+            for name in names:
+                idx_file.write(f'{ name }\n')
+
+    def test_remove_indexed(self, tmp_dir):
+        src_dir = os.path.join(tmp_dir, 'src')
+        _create_files(src_dir, ['a.txt', 'b.txt', 'keep.txt', 'sub/c.txt'])
+        idx = os.path.join(tmp_dir, 'idx.txt')
+        self._write_index(idx, ['a.txt', 'missing.txt', 'sub', 'sub/c.txt'])
+
+        idx_svc.remove_indexed(idx, src_dir, workers=2)
+
+        assert sorted(os.listdir(src_dir)) == ['b.txt', 'keep.txt', 'sub']
+        assert os.listdir(os.path.join(src_dir, 'sub')) == []
+
+    def test_remove_indexed_dry_run(self, tmp_dir):
+        src_dir = os.path.join(tmp_dir, 'src')
+        _create_files(src_dir, ['a.txt', 'b.txt'])
+        idx = os.path.join(tmp_dir, 'idx.txt')
+        self._write_index(idx, ['a.txt', 'b.txt', 'missing.txt'])
+
+        with mock.patch('fu.index.idx_svc.console.print') as mock_print:
+            idx_svc.remove_indexed(idx, src_dir, dry_run=True)
+
+        assert sorted(os.listdir(src_dir)) == ['a.txt', 'b.txt']
+        mock_print.assert_called_with(
+            '2 files would be removed, 1 missing files would be skipped',
+            style='info')
+
+
+class TestIndexDiff:
+    def test_index_diff_detect_moves(self, tmp_dir):
+        src_dir = os.path.join(tmp_dir, 'src')
+        _create_files(src_dir, ['a.txt', 'b.txt'])
+        old_idx = os.path.join(tmp_dir, 'old.tsv')
+        new_idx = os.path.join(tmp_dir, 'new.tsv')
+        output = os.path.join(tmp_dir, 'diff.txt')
+
+        idx_svc.index_dir(src_dir, old_idx, recursive=True, fmt=FORMAT_TSV)
+        os.rename(
+            os.path.join(src_dir, 'a.txt'),
+            os.path.join(src_dir, 'c.txt'))
+        idx_svc.index_dir(src_dir, new_idx, recursive=True, fmt=FORMAT_TSV)
+
+        idx_svc.index_diff([old_idx, new_idx], output, detect_moves=True)
+
+        assert _index_lines(output) == ['>\t2\ta.txt\tc.txt']
+
+    def test_index_diff_removes_partial_output(self, tmp_dir):
+        src_dir = os.path.join(tmp_dir, 'src')
+        _create_files(src_dir, ['a.txt', 'b.txt'])
+        old_idx = os.path.join(tmp_dir, 'old.tsv')
+        new_idx = os.path.join(tmp_dir, 'new.tsv')
+        output = os.path.join(tmp_dir, 'diff.txt')
+        idx_svc.index_dir(src_dir, old_idx, recursive=True, fmt=FORMAT_TSV)
+        idx_svc.index_dir(src_dir, new_idx, recursive=True, fmt=FORMAT_TSV)
+
+        diff_indexes = idx_svc.diff_indexes
+
+        def diff_then_fail(idx_paths):
+            yield from diff_indexes(idx_paths)
+            raise OSError('No space left on device')
+
+        with mock.patch(
+                'fu.index.idx_svc.diff_indexes',
+                side_effect=diff_then_fail):
+            idx_svc.index_diff([old_idx, new_idx], output)
+
+        assert not os.path.exists(output)
+
+
+class TestVerifyIndex:
+    def test_verify_index_resumes_from_checkpoint(self, tmp_dir):
+        src_dir = os.path.join(tmp_dir, 'src')
+        _create_files(src_dir, ['a.txt', 'b.txt', 'c.txt'])
+        idx = os.path.join(tmp_dir, 'idx.tsv')
+        report = os.path.join(tmp_dir, 'report.txt')
+        checkpoint = idx + '.verify-checkpoint'
+        idx_svc.index_dir(src_dir, idx, hash_algorithm='sha256')
+
+        for name in ('a.txt', 'c.txt'):
+            os.remove(os.path.join(src_dir, name))
+
+        # A previous run verified 'a.txt' and was interrupted
+        progress = VerifyCheckpoint(os.path.abspath(idx), report)
+        progress.last_name = 'a.txt'
+        progress.counts['ok'] = 1
+        progress.save(checkpoint)
+
+        with mock.patch('fu.index.idx_svc.console.print') as mock_print:
+            idx_svc.verify_index(idx, src_dir, workers=2)
+
+        assert _index_lines(report) == ['missing\tc.txt']
+        assert not os.path.exists(checkpoint)
+        mock_print.assert_any_call(
+            '2 ok, 0 corrupt, 0 modified, 1 missing, 0 unreadable, '
+            '0 skipped file(s)',
+            style='info')
+
+
+class TestIndexContains:
+    def test_index_contains_with_bloom(self, tmp_dir, capsys):
+        _create_files(tmp_dir, ['a.jpg', 'b.png'])
+        idx = os.path.join(tmp_dir, 'idx.txt')
+        idx_svc.index_dir(tmp_dir, idx, bloom_fp_rate=0.01)
+        capsys.readouterr()
+
+        assert os.path.exists(idx + '.bloom')
+        assert idx_svc.index_contains(idx, ['b.png', 'c.png', 'a.jpg']) == 2
+        assert capsys.readouterr().out == 'b.png\na.jpg\n'
+
+        assert idx_svc.index_contains(idx, ['b.png', 'c.png'], True) == 1
+        assert capsys.readouterr().out == 'c.png\n'
+
+
+class TestIndexDu:
+    def test_index_du(self, tmp_dir, capsys):
+        src_dir = os.path.join(tmp_dir, 'src')
+        _create_files(src_dir, ['a.txt', 'sub/b.txt', 'sub/x/c.txt'])
+        idx = os.path.join(tmp_dir, 'idx.tsv')
+        idx_svc.index_dir(src_dir, idx, recursive=True, fmt='tsv')
+        capsys.readouterr()
+
+        assert idx_svc.index_du(idx) == 3
+        assert capsys.readouterr().out == \
+            '11\t1\tsub/x\n20\t2\tsub\n25\t3\t.\n'
+
+        assert idx_svc.index_du(idx, max_depth=1, top=1) == 1
+        assert capsys.readouterr().out == '25\t3\t.\n'
+
+    def test_index_du_plain_index(self, tmp_dir, capsys):
+        _create_files(tmp_dir, ['a.txt'])
+        idx = os.path.join(tmp_dir, 'idx.txt')
+        idx_svc.index_dir(tmp_dir, idx)
+
+        with mock.patch('fu.index.idx_svc.console.print') as mock_print:
+            assert idx_svc.index_du(idx) == 0
+
+        assert mock_print.call_args[1] == {'style': 'error'}
+
+
+class TestArchiveIndexed:
+    def test_archive_indexed(self, tmp_dir):
+        src_dir = os.path.join(tmp_dir, 'src')
+        _create_files(src_dir, ['a.txt', 'sub/b.txt', 'c.txt'])
+        idx = os.path.join(tmp_dir, 'idx.txt')
+        output = os.path.join(tmp_dir, 'out.tar.gz')
+        with open(idx, 'w') as idx_file:
+            idx_file.write('sub/b.txt\na.txt\n')
+
+        idx_svc.archive_indexed(idx, src_dir, output)
+
+        with tarfile.open(output) as tar:
+            assert tar.getnames() == ['sub/b.txt', 'a.txt']
+
+        manifest = list(read_entries(output + '.manifest.tsv'))
+        assert [e.name for e in manifest] == ['sub/b.txt', 'a.txt']
+        assert manifest[1].hash == \
+            hash_file(os.path.join(src_dir, 'a.txt'), 'blake2b')
+
+    def test_archive_indexed_removes_partial_outputs(self, tmp_dir):
+        src_dir = os.path.join(tmp_dir, 'src')
+        _create_files(src_dir, ['a.txt', 'b.txt'])
+        idx = os.path.join(tmp_dir, 'idx.txt')
+        output = os.path.join(tmp_dir, 'out.tar')
+        with open(idx, 'w') as idx_file:
+            idx_file.write('a.txt\nb.txt\n')
+
+        def archive_then_fail(entries, *args):
+            yield next(iter(entries))
+            raise OSError('No space left on device')
+
+        with mock.patch(
+                'fu.index.idx_svc.archive_entries',
+                side_effect=archive_then_fail):
+            idx_svc.archive_indexed(idx, src_dir, output)
+
+        assert not os.path.exists(output)
+        assert not os.path.exists(output + '.manifest.tsv')
+
+    def test_archive_indexed_invalid_extension(self, tmp_dir):
+        _create_files(tmp_dir, ['a.txt'])
+        idx = os.path.join(tmp_dir, 'idx.txt')
+        idx_svc.index_dir(tmp_dir, idx)
+
+        idx_svc.archive_indexed(idx, tmp_dir, os.path.join(tmp_dir, 'a.zip'))
+
+        assert not os.path.exists(os.path.join(tmp_dir, 'a.zip'))
+
+
+class TestIndexQuery:
+    def test_index_query_prints_paths(self, tmp_dir, capsys):
+        _create_files(tmp_dir, ['a.jpg', 'b.png', 'c.jpg'])
+        idx = os.path.join(tmp_dir, 'idx.txt')
+        idx_svc.index_dir(tmp_dir, idx)
+        capsys.readouterr()
+
+        matches = idx_svc.index_query(
+            idx,
+            query_filter=QueryFilter(glob='*.jpg'),
+            base='/base')
+
+        assert matches == 2
+        assert capsys.readouterr().out == '/base/a.jpg\n/base/c.jpg\n'
+
+    def test_index_query_name_to_output(self, tmp_dir):
+        _create_files(tmp_dir, ['a.jpg', 'b.png'])
+        idx = os.path.join(tmp_dir, 'idx.txt')
+        idx_svc.index_dir(tmp_dir, idx)
+        output = os.path.join(tmp_dir, 'found.txt')
+
+        assert idx_svc.index_query(idx, 'b.png', output=output) == 1
+        assert _index_lines(output) == ['b.png']
+        assert idx_svc.index_query(idx, 'missing.png') == 0
+
+
+class TestCatalog:
+    def test_index_dir_into_catalog(self, tmp_dir, capsys):
+        src_dir = os.path.join(tmp_dir, 'src')
+        _create_files(src_dir, ['a.jpg', 'sub/b.jpg', 'c.txt'])
+        idx = os.path.join(tmp_dir, 'idx.tsv')
+        db_path = os.path.join(tmp_dir, 'catalog.db')
+
+        with mock.patch(
+                'fu.index.catalog.catalog_path',
+                return_value=db_path):
+            idx_svc.index_dir(src_dir, idx, recursive=True, catalog=True)
+            capsys.readouterr()
+
+            assert idx_svc.search_catalog('.jpg') == 2
+
+        assert sorted(capsys.readouterr().out.splitlines()) == [
+            os.path.join(src_dir, 'a.jpg'),
+            os.path.join(src_dir, 'sub', 'b.jpg')
+        ]
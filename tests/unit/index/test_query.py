@@ -0,0 +1,142 @@
+import os
+import pytest
+import tempfile
+
+from fu.index.idx_format import (
+    FORMAT_BIN,
+    FORMAT_PLAIN,
+    FORMAT_TSV,
+    IndexEntry,
+    IndexWriter
+)
+from fu.index.bloom import BloomFilter, bloom_path
+from fu.index.query import IndexMembership, IndexQuery, QueryFilter
+
+
+_NAMES = sorted(
+    [f'photos/{ year }/img_{ str(n).zfill(3) }.jpg' for year in (2019, 2020)
+        for n in range(50)]
+    + [f'docs/report_{ n }.pdf' for n in range(5)]
+    + ['a\tb.txt', 'readme.md', 'zz/ñandú.mp4']
+)
+
+
+@pytest.fixture
+def tmp_dir():
+    """Temporary directory for test indexes
+    """
+    tmp_dir = tempfile.TemporaryDirectory()
+
+    yield tmp_dir.name
+
+    # Cleanup after usage
+    tmp_dir.cleanup()
+
+
+def _write_index(tmp_dir: str, fmt: str, ext: str = '') -> str:
+    idx = os.path.join(tmp_dir, f'idx-{ fmt }{ ext }')
+    with IndexWriter(idx, fmt, ['Test index', 'Sorted']) as writer:
+        for size, name in enumerate(_NAMES):
+            if fmt == FORMAT_PLAIN:
+                writer.write(IndexEntry(name))
+            else:
+                writer.write(IndexEntry(name, size, size, size))
+
+    return idx
+
+
+_INDEXES = [
+    (FORMAT_PLAIN, ''),
+    (FORMAT_TSV, ''),
+    (FORMAT_TSV, '.gz'),
+    (FORMAT_BIN, '')
+]
+
+
+@pytest.mark.parametrize('fmt, ext', _INDEXES)
+class TestIndexQuery:
+    def test_lookup(self, tmp_dir, fmt, ext):
+        with IndexQuery(_write_index(tmp_dir, fmt, ext)) as query:
+            for name in _NAMES:
+                assert query.lookup(name).name == name
+
+            assert query.lookup('') is None
+            assert query.lookup('photos/2019') is None
+            assert query.lookup('zzz') is None
+
+    def test_prefixed(self, tmp_dir, fmt, ext):
+        with IndexQuery(_write_index(tmp_dir, fmt, ext)) as query:
+            for prefix in ('photos/2020/', 'docs/', 'a\t', 'x', ''):
+                assert [e.name for e in query.prefixed(prefix)] == \
+                    [n for n in _NAMES if n.startswith(prefix)]
+
+    def test_find(self, tmp_dir, fmt, ext):
+        with IndexQuery(_write_index(tmp_dir, fmt, ext)) as query:
+            names = [e.name for e in query.find(QueryFilter(
+                glob='photos/*/img_01?.jpg',
+                regex=r'2020'))]
+
+        assert names == [f'photos/2020/img_01{ n }.jpg' for n in range(10)]
+
+    def test_mapped(self, tmp_dir, fmt, ext):
+        with IndexQuery(_write_index(tmp_dir, fmt, ext)) as query:
+            assert query.is_mapped == (fmt != FORMAT_BIN and not ext)
+
+
+def test_find_size_range(tmp_dir):
+    with IndexQuery(_write_index(tmp_dir, FORMAT_TSV)) as query:
+        sizes = [e.size for e in query.find(QueryFilter(
+            min_size=10,
+            max_size=12))]
+
+    assert sizes == [10, 11, 12]
+
+
+def test_size_filter_on_plain_index(tmp_dir):
+    with IndexQuery(_write_index(tmp_dir, FORMAT_PLAIN)) as query:
+        assert list(query.find(QueryFilter(min_size=0))) == []
+
+
+def test_search_prefix():
+    assert QueryFilter(glob='photos/20*/x.jpg').search_prefix() == \
+        'photos/20'
+    assert QueryFilter('photos/', 'photos/2020/*').search_prefix() == \
+        'photos/2020/'
+    assert QueryFilter('photos/2020/', 'photos/*').search_prefix() == \
+        'photos/2020/'
+    assert QueryFilter(regex='.*').search_prefix() == ''
+
+
+def test_empty_index(tmp_dir):
+    idx = os.path.join(tmp_dir, 'empty.txt')
+    open(idx, 'w').close()
+
+    with IndexQuery(idx) as query:
+        assert query.lookup('a') is None
+        assert list(query.prefixed('')) == []
+
+
+class TestIndexMembership:
+    def test_membership_with_bloom(self, tmp_dir):
+        idx = _write_index(tmp_dir, FORMAT_TSV)
+        bloom = BloomFilter(len(_NAMES))
+        for name in _NAMES:
+            bloom.add(name)
+        bloom.save(bloom_path(idx), os.path.getsize(idx))
+
+        others = [f'other/{ n }' for n in range(1000)]
+        with IndexMembership(idx) as membership:
+            assert membership.bloom is not None
+            assert all(name in membership for name in _NAMES)
+            assert not any(name in membership for name in others)
+
+        stats = membership.stats
+        assert stats.confirmed == len(_NAMES)
+        assert stats.filtered + stats.false_positives == len(others)
+        assert stats.filtered > len(others) * 0.9
+
+    def test_membership_without_bloom(self, tmp_dir):
+        with IndexMembership(_write_index(tmp_dir, FORMAT_PLAIN)) as membership:
+            assert membership.bloom is None
+            assert _NAMES[3] in membership
+            assert 'missing' not in membership
@@ -0,0 +1,87 @@
+import os
+import pytest
+import tempfile
+
+from dataclasses import replace
+
+from fu.index.hashing import ParallelHasher, hash_file
+from fu.index.idx_format import IndexEntry
+from fu.index.verify import (
+    STATUS_CORRUPT,
+    STATUS_MISSING,
+    STATUS_MODIFIED,
+    STATUS_OK,
+    STATUS_SKIPPED,
+    VerifyCheckpoint,
+    verify_entries
+)
+
+
+@pytest.fixture
+def tmp_dir():
+    """Temporary directory for test files
+    """
+    tmp_dir = tempfile.TemporaryDirectory()
+
+    yield tmp_dir.name
+
+    # Cleanup after usage
+    tmp_dir.cleanup()
+
+
+def _hashed_entry(root, name, content):
+    path = os.path.join(root, name)
+    with open(path, 'wb') as test_file:
+        test_file.write(content)
+
+    entry = IndexEntry.from_stat(name, os.stat(path))
+    return replace(entry, hash=hash_file(path, 'blake2b'))
+
+
+class TestVerifyEntries:
+    def test_statuses(self, tmp_dir):
+        ok = _hashed_entry(tmp_dir, 'ok', b'ok')
+        corrupt = _hashed_entry(tmp_dir, 'corrupt', b'abc')
+        modified = _hashed_entry(tmp_dir, 'modified', b'abc')
+        missing = _hashed_entry(tmp_dir, 'missing', b'abc')
+        unhashed = IndexEntry('ok', 2, 1, 1)
+
+        # Same size and mtime, different content
+        corrupt_path = os.path.join(tmp_dir, 'corrupt')
+        with open(corrupt_path, 'wb') as test_file:
+            test_file.write(b'abd')
+        os.utime(corrupt_path, ns=(corrupt.mtime_ns, corrupt.mtime_ns))
+
+        with open(os.path.join(tmp_dir, 'modified'), 'ab') as test_file:
+            test_file.write(b'more')
+        os.remove(os.path.join(tmp_dir, 'missing'))
+
+        hasher = ParallelHasher('blake2b', workers=2, drop_cache=True)
+        results = list(verify_entries(
+            [ok, corrupt, modified, missing, unhashed],
+            tmp_dir,
+            hasher))
+
+        assert [r.status for r in results] == [
+            STATUS_OK,
+            STATUS_CORRUPT,
+            STATUS_MODIFIED,
+            STATUS_MISSING,
+            STATUS_SKIPPED
+        ]
+        assert results[1].actual_hash != corrupt.hash
+
+        # Only ok and corrupt files are read
+        assert hasher.stats.files == 2
+
+
+class TestVerifyCheckpoint:
+    def test_save_and_load(self, tmp_dir):
+        path = os.path.join(tmp_dir, 'checkpoint')
+        checkpoint = VerifyCheckpoint('/idx.tsv', '/report.txt', 10, 'a/b')
+        checkpoint.counts[STATUS_OK] = 3
+
+        checkpoint.save(path)
+
+        assert VerifyCheckpoint.load(path) == checkpoint
+        assert os.listdir(tmp_dir) == ['checkpoint']
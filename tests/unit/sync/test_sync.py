@@ -0,0 +1,146 @@
+import os
+
+from unittest import mock
+
+from fu.commands.sync.commands import SyncCmd
+from fu.commands.sync.sync import (
+    ACTION_COPY,
+    ACTION_DELETE,
+    ACTION_UPDATE,
+    SyncAction,
+    apply_sync,
+    copy_data,
+    copy_file,
+    plan_sync
+)
+
+
+def _write(path, content: bytes, mtime_ns: int = None):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(content)
+    if mtime_ns is not None:
+        os.utime(path, ns=(mtime_ns, mtime_ns))
+
+
+def _trees(tmp_path):
+    src = tmp_path / 'src'
+    dst = tmp_path / 'dst'
+    _write(src / 'new.txt', b'new')
+    _write(src / 'sub' / 'same.txt', b'same', 10 ** 9)
+    _write(dst / 'sub' / 'same.txt', b'same', 10 ** 9)
+    _write(src / 'sub' / 'touched.txt', b'v2', 2 * 10 ** 9)
+    _write(dst / 'sub' / 'touched.txt', b'v1', 10 ** 9)
+    _write(dst / 'extra.txt', b'extra')
+
+    return str(src), str(dst)
+
+
+class TestPlanSync:
+    def test_plan(self, tmp_path):
+        src, dst = _trees(tmp_path)
+
+        assert list(plan_sync(src, dst)) == [
+            SyncAction(ACTION_COPY, 'new.txt', 3),
+            SyncAction(ACTION_UPDATE, 'sub/touched.txt', 2)
+        ]
+
+    def test_plan_delete(self, tmp_path):
+        src, dst = _trees(tmp_path)
+
+        actions = list(plan_sync(src, dst, delete=True, walk_workers=2))
+
+        assert [(a.action, a.name) for a in actions] == [
+            (ACTION_DELETE, 'extra.txt'),
+            (ACTION_COPY, 'new.txt'),
+            (ACTION_UPDATE, 'sub/touched.txt')
+        ]
+
+    def test_plan_by_hash(self, tmp_path):
+        src, dst = _trees(tmp_path)
+
+        # Same content, only mtime differs
+        _write(tmp_path / 'dst' / 'sub' / 'touched.txt', b'v2', 10 ** 9)
+
+        actions = list(plan_sync(src, dst, hash_algorithm='blake2b'))
+
+        assert actions == [SyncAction(ACTION_COPY, 'new.txt', 3)]
+
+
+class TestApplySync:
+    def test_apply(self, tmp_path):
+        src, dst = _trees(tmp_path)
+
+        results = list(apply_sync(
+            plan_sync(src, dst, delete=True),
+            src,
+            dst,
+            workers=2))
+
+        assert [r.error for r in results] == [None] * 3
+        assert sorted(
+            os.path.relpath(os.path.join(root, name), dst)
+            for root, _, names in os.walk(dst)
+            for name in names
+        ) == ['new.txt', 'sub/same.txt', 'sub/touched.txt']
+        assert (tmp_path / 'dst' / 'sub' / 'touched.txt').read_bytes() == b'v2'
+
+        # Times are copied, so trees are now in sync
+        assert list(plan_sync(src, dst, delete=True)) == []
+
+    def test_apply_failure(self, tmp_path):
+        src, dst = _trees(tmp_path)
+        action = SyncAction(ACTION_COPY, 'missing.txt')
+
+        results = list(apply_sync([action], src, dst))
+
+        assert results[0].error
+        assert not os.path.exists(os.path.join(dst, 'missing.txt'))
+
+
+class TestCopy:
+    def test_copy_file_keeps_metadata(self, tmp_path):
+        _write(tmp_path / 'a.bin', os.urandom(100000), 5 * 10 ** 9)
+        os.chmod(tmp_path / 'a.bin', 0o640)
+        _write(tmp_path / 'b.bin', b'old')
+
+        copy_file(str(tmp_path / 'a.bin'), str(tmp_path / 'b.bin'))
+
+        st = os.stat(tmp_path / 'b.bin')
+        assert (tmp_path / 'b.bin').read_bytes() == \
+            (tmp_path / 'a.bin').read_bytes()
+        assert (st.st_mode & 0o777, st.st_mtime_ns) == (0o640, 5 * 10 ** 9)
+        assert sorted(os.listdir(tmp_path)) == ['a.bin', 'b.bin']
+
+    def test_copy_data_fallback(self, tmp_path):
+        content = os.urandom(10000)
+        _write(tmp_path / 'a.bin', content)
+
+        unsupported = OSError(18, 'Invalid cross-device link')
+        with mock.patch(
+                'fu.commands.sync.sync._copy_file_range',
+                side_effect=unsupported), \
+                mock.patch(
+                    'fu.commands.sync.sync._sendfile',
+                    side_effect=unsupported), \
+                open(tmp_path / 'a.bin', 'rb') as src_file, \
+                open(tmp_path / 'b.bin', 'wb') as dst_file:
+            assert copy_data(src_file, dst_file) == len(content)
+
+        assert (tmp_path / 'b.bin').read_bytes() == content
+
+
+class TestSyncCmd:
+    def test_rejects_nested_trees(self, tmp_path):
+        src, dst = _trees(tmp_path)
+        nested = os.path.join(src, 'backup')
+        os.mkdir(nested)
+        logger = mock.Mock()
+
+        with mock.patch('fu.commands.sync.commands.plan_sync') as mock_plan:
+            for src_dir, dst_dir in (
+                    (src, nested), (nested, src), (src, src)):
+                SyncCmd(src_dir, dst_dir, logger=logger).execute()
+
+        assert not mock_plan.called
+        assert logger.error.call_count == 3
+        assert os.listdir(nested) == []
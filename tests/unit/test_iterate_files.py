@@ -1,10 +1,11 @@
+import os
 import pytest
 import tempfile
 
 from unittest import mock
 from unittest.mock import call
 
-from fu.common.errors import InvalidPathError
+from fu.common.errors import ConfigError, InvalidPathError
 from fu.iterate_files import iterate_from_file
 
 @pytest.fixture
@@ -20,6 +21,9 @@ def tmp_file():
 
     # Cleanup after usage
     tmp_file.close()
+    for sidecar in ('.cursor', '.lines'):
+        if os.path.exists(tmp_file.name + sidecar):
+            os.remove(tmp_file.name + sidecar)
 
 def test_iterate_from_file_invalid_path():
     filepath = '/invalid/path/to/file'
@@ -60,3 +64,116 @@ def test_iterate_from_file_step_same_as_paths_count(
 
     assert not mock_ask.called
     mock_launch.assert_has_calls(expected_launch_calls)
+
+@mock.patch('fu.iterate_files.Prefetcher')
+@mock.patch('fu.iterate_files.typer.launch')
+@mock.patch('fu.iterate_files.Confirm.ask')
+def test_iterate_from_file_prefetches_next_batches(
+    mock_ask,
+    mock_launch,
+    mock_prefetcher,
+    tmp_file
+):
+    tmp_file.seek(0, 2)
+    tmp_file.write(b"test/path/3\ntest/path/4\ntest/path/5\n")
+    tmp_file.flush()
+    mock_ask.side_effect = [True, False]
+    prefetcher = mock_prefetcher.return_value.__enter__.return_value
+
+    iterate_from_file(tmp_file.name, step=2, prefetch=1)
+
+    # Stopped after second batch, third one was already prefetched
+    assert mock_launch.call_count == 4
+    prefetcher.add.assert_has_calls([
+        call(['test/path/3', 'test/path/4']),
+        call(['test/path/5'])
+    ])
+
+@mock.patch('fu.iterate_files.Prefetcher')
+@mock.patch('fu.iterate_files.typer.launch')
+@mock.patch('fu.iterate_files.Confirm.ask')
+def test_iterate_from_file_prefetch_window(
+    mock_ask,
+    mock_launch,
+    mock_prefetcher,
+    tmp_file
+):
+    tmp_file.seek(0, 2)
+    tmp_file.write(b"test/path/3\ntest/path/4\ntest/path/5\n")
+    tmp_file.flush()
+    prefetcher = mock_prefetcher.return_value.__enter__.return_value
+
+    # Paths warmed up so far, each time user is asked for next batch
+    warmed = []
+    def ask(prompt):
+        warmed.append([c.args[0][0] for c in prefetcher.add.call_args_list])
+        return True
+    mock_ask.side_effect = ask
+
+    iterate_from_file(tmp_file.name, step=1, prefetch=2)
+
+    assert warmed == [
+        ['test/path/2', 'test/path/3'],
+        ['test/path/2', 'test/path/3', 'test/path/4'],
+        ['test/path/2', 'test/path/3', 'test/path/4', 'test/path/5'],
+        ['test/path/2', 'test/path/3', 'test/path/4', 'test/path/5']
+    ]
+    assert mock_launch.call_count == 5
+
+@mock.patch('fu.iterate_files.typer.launch')
+@mock.patch('fu.iterate_files.Confirm.ask')
+def test_iterate_from_file_resume(mock_ask, mock_launch, tmp_file):
+    tmp_file.seek(0, 2)
+    tmp_file.write(b"# comment\ntest/path/3\n")
+    tmp_file.flush()
+    mock_ask.return_value = False
+
+    # Cursor is only saved when resuming or asked to
+    iterate_from_file(tmp_file.name)
+    assert not os.path.exists(tmp_file.name + '.cursor')
+
+    iterate_from_file(tmp_file.name, resume=True)
+    iterate_from_file(tmp_file.name, resume=True)
+    iterate_from_file(tmp_file.name, from_line=3)
+
+    assert mock_launch.call_args_list == [
+        call('test/path/1'),
+        call('test/path/1'),
+        call('test/path/2'),
+        call('test/path/3')
+    ]
+
+@mock.patch('fu.iterate_files.shutil.which')
+@mock.patch('fu.iterate_files.subprocess.Popen')
+@mock.patch('fu.iterate_files.typer.launch')
+@mock.patch('fu.iterate_files.Confirm.ask')
+def test_iterate_from_file_batch_viewer(
+    mock_ask,
+    mock_launch,
+    mock_popen,
+    mock_which,
+    tmp_file
+):
+    mock_which.return_value = '/usr/bin/feh'
+
+    iterate_from_file(tmp_file.name, step=2, viewer='feh --auto-zoom')
+
+    assert not mock_launch.called
+    mock_popen.assert_called_once_with(
+        ['feh', '--auto-zoom', 'test/path/1', 'test/path/2'],
+        stdin=mock.ANY,
+        start_new_session=True)
+
+@mock.patch('fu.iterate_files.config.viewer')
+@mock.patch('fu.iterate_files.typer.launch')
+def test_iterate_from_file_batch_without_viewer(
+    mock_launch,
+    mock_viewer,
+    tmp_file
+):
+    mock_viewer.return_value = None
+
+    with pytest.raises(ConfigError):
+        iterate_from_file(tmp_file.name, batch=True)
+
+    assert not mock_launch.called
@@ -0,0 +1,126 @@
+import io
+import os
+import pytest
+import shutil
+import tempfile
+import uuid
+
+from PIL import Image
+from unittest import mock
+from pathlib import Path
+
+from fu.commands.thumbs.thumbnails import (
+    STATUS_CREATED,
+    STATUS_FAILED,
+    STATUS_FRESH,
+    file_uri,
+    is_fresh,
+    make_thumbnails,
+    thumbnail_path
+)
+
+
+@pytest.fixture
+def tmp_dir():
+    """Creates a temporary unique directory
+    """
+    tmp_dir = os.path.join(tempfile.gettempdir(), str(uuid.uuid4()))
+    Path(tmp_dir).mkdir(parents=True, exist_ok=True)
+
+    yield tmp_dir
+
+    # Cleanup after usage
+    shutil.rmtree(tmp_dir)
+
+
+def _create_image(dst_dir, width, height, name='img.jpg') -> str:
+    img_file = os.path.join(dst_dir, name)
+    Image.new('RGB', (width, height), color='black').save(img_file)
+
+    return img_file
+
+
+class TestThumbnailPath:
+    def test_thumbnail_path_is_md5_of_uri(self):
+        thumb = thumbnail_path('/home/jim/tests/test.png', 'normal', Path('/t'))
+
+        assert file_uri('/home/jim/tests/test.png') == \
+            'file:///home/jim/tests/test.png'
+        assert thumb == Path('/t/normal/a8d110ce8589a5a652059b95d4919f62.png')
+
+    def test_thumbnail_path_escapes_uri(self):
+        assert file_uri('/tmp/some dir/a#b.jpg') == \
+            'file:///tmp/some%20dir/a%23b.jpg'
+
+
+class TestMakeThumbnails:
+    def test_make_thumbnails(self, tmp_dir):
+        img_file = _create_image(tmp_dir, 1000, 500)
+        cache_dir = os.path.join(tmp_dir, 'cache')
+
+        results = make_thumbnails(img_file, ('normal', 'large'), cache_dir)
+
+        assert [r.status for r in results] == [STATUS_CREATED] * 2
+        for size_name, size in (('normal', 128), ('large', 256)):
+            thumb_file = thumbnail_path(img_file, size_name, Path(cache_dir))
+
+            with Image.open(thumb_file) as thumb:
+                assert thumb.size == (size, size // 2)
+                assert thumb.info['Thumb::URI'] == file_uri(img_file)
+                assert thumb.info['Thumb::MTime'] == \
+                    str(int(os.stat(img_file).st_mtime))
+
+            assert is_fresh(img_file, thumb_file)
+
+    def test_make_thumbnails_skips_fresh(self, tmp_dir):
+        img_file = _create_image(tmp_dir, 400, 400)
+        cache_dir = os.path.join(tmp_dir, 'cache')
+
+        make_thumbnails(img_file, ('normal',), cache_dir)
+        results = make_thumbnails(img_file, ('normal',), cache_dir)
+
+        assert results[0].status == STATUS_FRESH
+
+    def test_make_thumbnails_stale_after_modification(self, tmp_dir):
+        img_file = _create_image(tmp_dir, 400, 400)
+        cache_dir = os.path.join(tmp_dir, 'cache')
+
+        make_thumbnails(img_file, ('normal',), cache_dir)
+        st = os.stat(img_file)
+        os.utime(img_file, (st.st_atime, st.st_mtime + 10))
+        results = make_thumbnails(img_file, ('normal',), cache_dir)
+
+        assert results[0].status == STATUS_CREATED
+
+    def test_make_thumbnails_invalid_image(self, tmp_dir):
+        img_file = os.path.join(tmp_dir, 'broken.jpg')
+        with open(img_file, 'wb') as broken:
+            broken.write(b'not an image')
+
+        results = make_thumbnails(img_file, ('normal', 'large'), tmp_dir)
+
+        assert [r.status for r in results] == [STATUS_FAILED] * 2
+
+    @mock.patch('fu.commands.thumbs.thumbnails.ExifImage')
+    def test_make_thumbnails_truncated_embedded_thumbnail(
+        self,
+        mock_exif,
+        tmp_dir
+    ):
+        img_file = _create_image(tmp_dir, 600, 300)
+        embedded = io.BytesIO()
+        Image.new('RGB', (300, 300), color='white').save(embedded, 'JPEG')
+        exif_img = mock_exif.return_value
+        exif_img.has_exif = True
+        exif_img.get.return_value = None
+        exif_img.get_thumbnail.return_value = \
+            embedded.getvalue()[:len(embedded.getvalue()) // 2]
+        cache_dir = os.path.join(tmp_dir, 'cache')
+
+        results = make_thumbnails(img_file, ('normal', 'large'), cache_dir)
+
+        # Thumbnails are made from full image, not embedded one
+        assert [r.status for r in results] == [STATUS_CREATED] * 2
+        thumb_file = thumbnail_path(img_file, 'large', Path(cache_dir))
+        with Image.open(thumb_file) as thumb:
+            assert thumb.size == (256, 128)
@@ -0,0 +1,57 @@
+import threading
+import time
+
+from collections import defaultdict
+
+from fu.utils.concurrency import bounded_map, device_map
+
+
+def test_bounded_map_keeps_order():
+    assert list(bounded_map(lambda x: x * 2, range(20), 3, 2)) == \
+        [x * 2 for x in range(20)]
+
+
+def test_device_map_limits_each_device():
+    lock = threading.Lock()
+    active = defaultdict(int)
+    peak = defaultdict(int)
+
+    def work(item):
+        device, value = item
+        with lock:
+            active[device] += 1
+            peak[device] = max(peak[device], active[device])
+        time.sleep(0.01)
+        with lock:
+            active[device] -= 1
+        return value
+
+    items = [('hdd', i) if i % 4 else ('ssd', i) for i in range(24)]
+    results = device_map(work, items, lambda item: item[0], 4, 1)
+
+    assert list(results) == list(range(24))
+    assert peak['hdd'] == 1
+    assert peak['ssd'] == 1
+
+
+def test_device_map_other_devices_not_blocked():
+    release = threading.Event()
+    started = []
+
+    def work(item):
+        started.append(item)
+        if item == 'slow':
+            release.wait(5)
+        return item
+
+    # Second item of busy device 'a' waits for a slot instead of taking
+    # a worker, so items of other devices go ahead
+    items = ['slow', 'slow2', 'fast1', 'fast2']
+    devices = {'slow': 'a', 'slow2': 'a', 'fast1': 'b', 'fast2': None}
+    threading.Timer(0.2, release.set).start()
+
+    results = device_map(work, items, devices.get, 2, 1)
+
+    assert list(results) == items
+    assert started.index('fast1') < started.index('slow2')
+    assert started.index('fast2') < started.index('slow2')
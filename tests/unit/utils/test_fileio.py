@@ -0,0 +1,45 @@
+import os
+import pytest
+import tempfile
+
+from fu.utils.fileio import is_compressed, open_file
+
+
+@pytest.fixture
+def tmp_dir():
+    """Temporary directory for test files
+    """
+    tmp_dir = tempfile.TemporaryDirectory()
+
+    yield tmp_dir.name
+
+    # Cleanup after usage
+    tmp_dir.cleanup()
+
+
+def test_is_compressed():
+    assert is_compressed('idx.txt.gz')
+    assert is_compressed('idx.tsv.XZ')
+    assert is_compressed('idx.bz2')
+    assert not is_compressed('idx.tsv')
+
+
+@pytest.mark.parametrize('name', ['f.txt', 'f.txt.gz', 'f.txt.xz', 'f.bz2'])
+def test_text_roundtrip(tmp_dir, name):
+    path = os.path.join(tmp_dir, name)
+    lines = ['plain.txt\n', 'ñandú.jpg\n', 'raw-\udcff.bin\n']
+
+    with open_file(path, 'x') as out_file:
+        out_file.writelines(lines)
+
+    with open_file(path) as in_file:
+        assert list(in_file) == lines
+
+
+def test_exclusive_create(tmp_dir):
+    path = os.path.join(tmp_dir, 'f.gz')
+    with open_file(path, 'x') as out_file:
+        out_file.write('a\n')
+
+    with pytest.raises(FileExistsError):
+        open_file(path, 'x')
@@ -1,5 +1,11 @@
+import os
+import pytest
+
+from unittest import mock
+
 from fu.utils.path import (
-    get_file_name
+    get_file_name,
+    scan_files
 )
 
 def test_file_name():
@@ -24,4 +30,41 @@ def test_file_name_multiple_dots():
     file = 'some/path/file.tar.gz'
     name = get_file_name(file, False)
 
-    assert name == 'file.tar'
\ No newline at end of file
+    assert name == 'file.tar'
+
+def _tree_with_subdir(tmp_path):
+    (tmp_path / 'a.txt').write_text('a')
+    (tmp_path / 'sub').mkdir()
+    (tmp_path / 'sub' / 'b.txt').write_text('b')
+    (tmp_path / 'other').mkdir()
+    (tmp_path / 'other' / 'c.txt').write_text('c')
+    return str(tmp_path / 'sub')
+
+
+@mock.patch('fu.utils.path.console')
+def test_scan_files_skips_unreadable_dir(mock_console, tmp_path):
+    unreadable = _tree_with_subdir(tmp_path)
+    scandir = os.scandir
+
+    def fake_scandir(path):
+        if path == unreadable:
+            raise PermissionError(13, 'Permission denied', path)
+        return scandir(path)
+
+    with mock.patch('os.scandir', side_effect=fake_scandir):
+        names = sorted(e.name for e in scan_files(str(tmp_path), True))
+
+    assert names == ['a.txt', 'c.txt']
+    assert mock_console.print.call_args[1]['style'] == 'warning'
+
+
+@pytest.mark.skipif(os.geteuid() == 0, reason='root can read any directory')
+def test_scan_files_skips_chmod_000_dir(tmp_path):
+    unreadable = _tree_with_subdir(tmp_path)
+    os.chmod(unreadable, 0)
+    try:
+        names = sorted(e.name for e in scan_files(str(tmp_path), True))
+    finally:
+        os.chmod(unreadable, 0o755)
+
+    assert names == ['a.txt', 'c.txt']
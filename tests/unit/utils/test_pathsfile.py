@@ -0,0 +1,83 @@
+import gzip
+import os
+
+from fu.utils.pathsfile import PathsFile
+
+
+def _write_paths(path, lines):
+    with open(path, 'w') as paths_file:
+        paths_file.write(''.join(f'{ line }\n' for line in lines))
+
+
+def test_paths_skip_comments_and_empty_lines(tmp_path):
+    paths_txt = str(tmp_path / 'paths.txt')
+    _write_paths(paths_txt, ['# header', 'a/1', '', 'a/2'])
+
+    assert list(PathsFile(paths_txt).paths()) == [(2, 'a/1'), (4, 'a/2')]
+
+
+def test_paths_jump_to_line(tmp_path):
+    paths_txt = str(tmp_path / 'paths.txt')
+    _write_paths(paths_txt, [f'dir/{ i }' for i in range(1, 1001)])
+    paths_file = PathsFile(paths_txt)
+
+    assert list(paths_file.paths(998)) == [
+        (998, 'dir/998'),
+        (999, 'dir/999'),
+        (1000, 'dir/1000')
+    ]
+    assert os.path.exists(paths_file.lines_path)
+    assert list(paths_file.paths(1001)) == []
+
+
+def test_paths_rebuild_stale_sidecar(tmp_path):
+    paths_txt = str(tmp_path / 'paths.txt')
+    _write_paths(paths_txt, ['a', 'b', 'c'])
+    paths_file = PathsFile(paths_txt)
+    assert list(paths_file.paths(3)) == [(3, 'c')]
+
+    _write_paths(paths_txt, ['long/a', 'long/b', 'long/c', 'long/d'])
+
+    assert list(paths_file.paths(3)) == [(3, 'long/c'), (4, 'long/d')]
+
+
+def test_paths_from_compressed_file(tmp_path):
+    paths_gz = str(tmp_path / 'paths.txt.gz')
+    with gzip.open(paths_gz, 'wt') as paths_file:
+        paths_file.write('a\nb\nc\n')
+    paths_file = PathsFile(paths_gz)
+
+    assert list(paths_file.paths(2)) == [(2, 'b'), (3, 'c')]
+    assert not os.path.exists(paths_file.lines_path)
+
+
+def test_cursor(tmp_path):
+    paths_txt = str(tmp_path / 'paths.txt')
+    _write_paths(paths_txt, ['a', 'b'])
+    paths_file = PathsFile(paths_txt)
+
+    assert paths_file.cursor() == 1
+
+    paths_file.save_cursor(2)
+
+    assert PathsFile(paths_txt).cursor() == 2
+
+
+def test_paths_from_compressed_file_first_line_and_cursor(tmp_path):
+    paths_gz = str(tmp_path / 'paths.txt.gz')
+    with gzip.open(paths_gz, 'wt') as paths_file:
+        paths_file.write('# header\na\nb\nc\n')
+    paths_file = PathsFile(paths_gz)
+
+    assert list(paths_file.paths()) == [(2, 'a'), (3, 'b'), (4, 'c')]
+
+    paths_file.save_cursor(3)
+
+    assert list(paths_file.paths(paths_file.cursor())) == [(3, 'b'), (4, 'c')]
+
+
+def test_save_cursor_failure_is_a_warning(tmp_path):
+    paths_file = PathsFile(str(tmp_path / 'missing-dir' / 'paths.txt'))
+
+    assert not paths_file.save_cursor(2)
+    assert paths_file.cursor() == 1
@@ -0,0 +1,23 @@
+from unittest import mock
+
+from fu.utils.prefetch import Prefetcher, warm_up
+
+
+def test_prefetcher_warms_up_files(tmp_path):
+    paths = []
+    for name in ('a', 'b'):
+        (tmp_path / name).write_bytes(b'data')
+        paths.append(str(tmp_path / name))
+
+    with mock.patch('fu.utils.prefetch.warm_up') as mock_warm_up:
+        with Prefetcher() as prefetcher:
+            prefetcher.add(paths)
+            prefetcher._executor.shutdown(wait=True)
+
+    assert [c.args[0] for c in mock_warm_up.call_args_list] == paths
+
+
+def test_warm_up_ignores_errors(tmp_path):
+    warm_up(str(tmp_path / 'missing'))
+    warm_up(str(tmp_path))
+
@@ -0,0 +1,61 @@
+import pytest
+
+from fu.utils.ratelimit import TokenBucket
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+        self.sleeps = []
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+def _bucket(rate, capacity=None):
+    clock = FakeClock()
+    return TokenBucket(rate, capacity, clock, clock.sleep), clock
+
+
+def test_burst_within_capacity():
+    bucket, clock = _bucket(100)
+
+    assert bucket.consume(60) == 0
+    assert bucket.consume(40) == 0
+    assert clock.sleeps == []
+
+
+def test_waits_for_debt():
+    bucket, clock = _bucket(100)
+
+    bucket.consume(100)
+    assert bucket.consume(50) == pytest.approx(0.5)
+    assert bucket.consume(100) == pytest.approx(1.0)
+
+
+def test_refills_while_idle():
+    bucket, clock = _bucket(100, capacity=200)
+
+    bucket.consume(200)
+    clock.now += 1
+    assert bucket.consume(100) == 0
+    assert bucket.consume(50) == pytest.approx(0.5)
+
+
+def test_average_rate():
+    bucket, clock = _bucket(1000)
+
+    for _ in range(100):
+        bucket.consume(100)
+
+    # 10000 tokens, first 1000 are burst capacity
+    assert clock.now == pytest.approx(9.0)
+
+
+def test_invalid_rate():
+    with pytest.raises(ValueError):
+        TokenBucket(0)
@@ -0,0 +1,115 @@
+import os
+import pytest
+import tempfile
+
+from unittest import mock
+
+from fu.common.errors import InvalidPathError
+from fu.utils.walk import walk_files
+
+
+_FILES = [
+    'b.txt',
+    'a.txt',
+    'sub/z.txt',
+    'sub/deep/er/x.txt',
+    'sub/a.txt',
+    'other/c.txt',
+    'empty/',
+]
+
+
+@pytest.fixture
+def tree():
+    """Temporary directory with a few nested files
+    """
+    tmp_dir = tempfile.TemporaryDirectory()
+    for name in _FILES:
+        path = os.path.join(tmp_dir.name, name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        if not name.endswith('/'):
+            with open(path, 'w') as test_file:
+                test_file.write(name)
+
+    yield tmp_dir.name
+
+    # Cleanup after usage
+    tmp_dir.cleanup()
+
+
+def _names(root, entries):
+    return [os.path.relpath(entry.path, root) for entry in entries]
+
+
+@pytest.mark.parametrize('workers', [1, 4])
+def test_finds_all_files(tree, workers):
+    names = _names(tree, walk_files(tree, workers=workers, window=2))
+
+    assert sorted(names) == sorted(n for n in _FILES if not n.endswith('/'))
+
+
+def test_not_recursive(tree):
+    names = _names(tree, walk_files(tree, recursive=False, workers=4))
+
+    assert sorted(names) == ['a.txt', 'b.txt']
+
+
+@pytest.mark.parametrize('workers', [1, 4])
+def test_ordered(tree, workers):
+    names = _names(tree, walk_files(
+        tree,
+        workers=workers,
+        ordered=True,
+        window=3))
+
+    assert names == [
+        'a.txt',
+        'b.txt',
+        'other/c.txt',
+        'sub/a.txt',
+        'sub/z.txt',
+        'sub/deep/er/x.txt',
+    ]
+
+
+def test_stat_prefetched(tree):
+    entries = list(walk_files(tree, workers=2, stat=True))
+
+    assert all(entry.stat().st_size > 0 for entry in entries)
+
+
+def test_invalid_path(tree):
+    with pytest.raises(InvalidPathError):
+        walk_files(os.path.join(tree, 'a.txt'))
+
+
+@pytest.mark.parametrize('workers,ordered', [(1, False), (4, False), (4, True)])
+@mock.patch('fu.utils.walk.warn_unreadable_dir')
+def test_skips_unreadable_dirs(mock_warn, tree, workers, ordered):
+    scandir = os.scandir
+    unreadable = os.path.join(tree, 'sub')
+
+    def fake_scandir(path):
+        if path == unreadable:
+            raise PermissionError(13, 'Permission denied', path)
+        return scandir(path)
+
+    with mock.patch('os.scandir', side_effect=fake_scandir), \
+            mock.patch('fu.utils.path.warn_unreadable_dir', mock_warn):
+        names = _names(tree, walk_files(tree, workers=workers, ordered=ordered))
+
+    assert sorted(names) == ['a.txt', 'b.txt', 'other/c.txt']
+    mock_warn.assert_called_once()
+    assert mock_warn.call_args[0][0] == unreadable
+
+
+@pytest.mark.skipif(os.geteuid() == 0, reason='root can read any directory')
+def test_skips_chmod_000_dir(tree):
+    unreadable = os.path.join(tree, 'sub')
+    os.chmod(unreadable, 0)
+    try:
+        names = _names(tree, walk_files(tree, workers=4))
+    finally:
+        os.chmod(unreadable, 0o755)
+
+    assert sorted(names) == ['a.txt', 'b.txt', 'other/c.txt']